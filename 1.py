@@ -1,13 +1,19 @@
-import cv2, time, csv, os
+import cv2, time, os
 import numpy as np
 from picamera2 import Picamera2
 import board, busio, adafruit_tsl2591
 
+import gamma_lut
+from bev_geometry import BevGeometry
+from lux_sampler import LuxSampler
+from recorder import Recorder
+
 # ========================== SETUP SISTEM ==========================
 durasi = int(input("Durasi logging (detik): "))
 
 i2c = busio.I2C(board.SCL, board.SDA)
 tsl = adafruit_tsl2591.TSL2591(i2c)
+lux_sampler = LuxSampler(tsl).start()
 
 cam = Picamera2()
 cam.configure(cam.create_video_configuration(main={"size": (640,480)}))
@@ -19,9 +25,13 @@ IS_RGB = np.mean(test[:,:,0]) > np.mean(test[:,:,2])
 out = "/home/mbasis/output_integrated_fast"
 os.makedirs(out, exist_ok=True)
 ts = int(time.time())
-csv_path = f"{out}/log_{ts}.csv"
+log_path = f"{out}/log_{ts}.tlog"   # CSV: python telemetry_log.py to-csv
 vid_path = f"{out}/vid_{ts}.mp4"
-writer = cv2.VideoWriter(vid_path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (640,480))
+# video + log biner ditulis thread recorder (write-behind), bukan di loop capture
+rec = Recorder()
+rec.add_video("bev", vid_path, 30, (640,480))
+# offset f4: None (garis tidak ketemu) jadi NaN
+rec.add_telemetry("log", log_path, [("lux","f4"), ("gamma","f4"), ("offset","f4")])
 
 # ========================== FUNGI UTAMA ==========================
 def fuzzy_gamma(lux, b):
@@ -31,16 +41,19 @@ def fuzzy_gamma(lux, b):
     return float(np.clip(g,0.4,1.6))
 
 def gamma_corr(f, g):
-    inv = 1/g
-    lut = np.array([((i/255)**inv)*255 for i in range(256)],dtype="uint8")
-    return cv2.LUT(f,lut)
+    # LUT diambil dari bank (precomputed), gamma ~1.0 di-skip
+    return gamma_lut.apply_gamma(f, g)
+
+geometries = {}
 
 def bird_eye(frame):
+    # matrix + map remap cuma dihitung sekali per resolusi
     h,w,_ = frame.shape
-    src = np.float32([[0,h],[w,h],[w*0.2,h*0.3],[w*0.8,h*0.3]])
-    dst = np.float32([[0,h],[w,h],[0,0],[w,0]])
-    M = cv2.getPerspectiveTransform(src,dst)
-    return cv2.warpPerspective(frame,M,(w,h))
+    if (w,h) not in geometries:
+        src = np.float32([[0,h],[w,h],[w*0.2,h*0.3],[w*0.8,h*0.3]])
+        dst = np.float32([[0,h],[w,h],[0,0],[w,0]])
+        geometries[(w,h)] = BevGeometry(w, h, src, dst)
+    return geometries[(w,h)].warp(frame)
 
 def lane_offset(frame):
     h,w,_ = frame.shape
@@ -63,11 +76,9 @@ fps = 0.0
 start=time.time()
 fps_t = time.time(); fps_c=0
 
-with open(csv_path,"w",newline="") as f:
-    log = csv.writer(f); log.writerow(["time","lux","gamma","offset"])
-
+try:
     while time.time()-start < durasi:
-        lux = tsl.lux or 0
+        lux = lux_sampler.read().lux
         frm = cam.capture_array()
         if IS_RGB: frm=cv2.cvtColor(frm,cv2.COLOR_RGB2BGR)
 
@@ -95,15 +106,15 @@ with open(csv_path,"w",newline="") as f:
                     cv2.FONT_HERSHEY_SIMPLEX,0.6,(255,0,0),2)
 
         cv2.imshow("FAST Lane + Gamma + BEV", bev)
-        writer.write(bev)
-        log.writerow([time.strftime("%H:%M:%S"), lux, g, off])
-        f.flush()
+        rec.write("bev", bev)
+        rec.row("log", [lux, g, off])
 
         if cv2.waitKey(1)&0xFF==ord('q'): break
-
-writer.release()
-cv2.destroyAllWindows()
-cam.stop()
+finally:
+    rec.close()
+    lux_sampler.stop()
+    cv2.destroyAllWindows()
+    cam.stop()
 
 print("\n[DONE] Video:", vid_path)
-print("      CSV  :", csv_path)
+print("      Log  :", log_path)
@@ -1,8 +1,14 @@
-import time, cv2, csv, os
+import time, cv2, os
 import numpy as np
 from picamera2 import Picamera2
 import board, busio, adafruit_tsl2591
 
+import gamma_lut
+from bev_geometry import BevGeometry
+from lux_sampler import LuxSampler
+from recorder import Recorder
+from telemetry_log import ARAH
+
 # =====================================================================
 # 0. INPUT MANUAL DURASI LOGGING
 # =====================================================================
@@ -16,6 +22,7 @@ i2c = busio.I2C(board.SCL, board.SDA)
 tsl = adafruit_tsl2591.TSL2591(i2c)
 tsl.integration_time = adafruit_tsl2591.INTEGRATIONTIME_300MS
 tsl.gain = adafruit_tsl2591.GAIN_MED
+lux_sampler = LuxSampler(tsl).start()
 
 # =====================================================================
 # 2. SETUP KAMERA PICAMERA2
@@ -47,7 +54,7 @@ out_dir = "/home/mbasis/output_gamma_lane"
 os.makedirs(out_dir, exist_ok=True)
 
 timestamp = int(time.time())
-csv_file = os.path.join(out_dir, f"log_gamma_lane_{timestamp}.csv")
+log_file = os.path.join(out_dir, f"log_gamma_lane_{timestamp}.tlog")   # CSV: python telemetry_log.py to-csv
 video_file_lane = os.path.join(out_dir, f"video_lane_detection_{timestamp}.mp4")
 video_file_bev = os.path.join(out_dir, f"video_bird_eye_{timestamp}.mp4")
 
@@ -75,9 +82,8 @@ def measure_brightness(frame):
     return np.mean(gray)
 
 def apply_gamma(frame, gamma):
-    inv = 1.0 / gamma
-    lut = np.array([((i / 255.0) ** inv) * 255 for i in np.arange(256)]).astype("uint8")
-    return cv2.LUT(frame, lut)
+    # LUT diambil dari bank (precomputed), gamma ~1.0 di-skip
+    return gamma_lut.apply_gamma(frame, gamma)
 
 # =====================================================================
 # 7. SETUP BIRD'S EYE VIEW TRANSFORMATION
@@ -101,6 +107,9 @@ dst_points = np.float32([
 # Hitung transformation matrix
 M = cv2.getPerspectiveTransform(src_points, dst_points)
 
+# map remap fixed-point dihitung sekali (di-cache ke disk)
+geometry = BevGeometry(frame_width, frame_height, src_points, dst_points)
+
 # =====================================================================
 # 8. FUNGSI LANE DETECTION
 # =====================================================================
@@ -124,7 +133,7 @@ def detect_lane(frame_input, with_bev=True):
     """
     if with_bev:
         # Terapkan Bird Eye View transformation
-        frame_processed = cv2.warpPerspective(frame_input, M, (frame_width, frame_height))
+        frame_processed = geometry.warp(frame_input)
     else:
         frame_processed = frame_input.copy()
     
@@ -221,9 +230,16 @@ def detect_lane(frame_input, with_bev=True):
 # 9. SETUP VIDEO WRITER
 # =====================================================================
 fps = 30
-fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-writer_lane = cv2.VideoWriter(video_file_lane, fourcc, fps, (frame_width, frame_height))
-writer_bev = cv2.VideoWriter(video_file_bev, fourcc, fps, (frame_width, frame_height))
+# encode mp4v + tulis log biner di thread writer masing-masing (write-behind),
+# loop capture tidak ikut menunggu SD card
+rec = Recorder()
+rec.add_video("lane", video_file_lane, fps, (frame_width, frame_height))
+rec.add_video("bev", video_file_bev, fps, (frame_width, frame_height))
+rec.add_telemetry("log", log_file, [
+    ("lux", "f4"), ("brightness", "f4"), ("gamma", "f4"),
+    ("offset_normal", "i2"), ("arah_normal", "i1", ARAH),
+    ("offset_bev", "i2"), ("arah_bev", "i1", ARAH),
+])
 
 print("[OK] VideoWriter aktif")
 print("     Lane Detection:", video_file_lane)
@@ -237,15 +253,12 @@ fps_counter = 0
 fps_start = time.time()
 fps_value = 0
 
-with open(csv_file, "w", newline="") as f:
-    writer_csv = csv.writer(f)
-    writer_csv.writerow(["timestamp", "lux", "brightness", "gamma", "offset_normal", "arah_normal", "offset_bev", "arah_bev"])
-
-    print("[START] Recording + logging dimulai...\n")
+print("[START] Recording + logging dimulai...\n")
 
+try:
     while (time.time() - start) < durasi:
-        # === BACA SENSOR LUX ===
-        lux = tsl.lux or 0
+        # === BACA SENSOR LUX (nilai terakhir dari sampler) ===
+        lux = lux_sampler.read().lux
         
         # === CAPTURE FRAME ===
         frame = cam.capture_array()
@@ -270,4 +283,41 @@ with open(csv_file, "w", newline="") as f:
         gamma_text = f"Lux:{lux:.1f} Bright:{brightness:.1f} Gamma:{gamma:.2f}"
         
         # Hitung FPS
-  
\ No newline at end of file
+        fps_counter += 1
+        if time.time() - fps_start >= 1:
+            fps_value = fps_counter / (time.time() - fps_start)
+            fps_counter = 0
+            fps_start = time.time()
+        fps_text = f"FPS:{fps_value:.1f}"
+
+        for hasil in (hasil_normal, hasil_bev):
+            cv2.putText(hasil, gamma_text, (10, 25),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.putText(hasil, fps_text, (10, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+
+        # === SIMPAN (antri ke recorder, tidak menunggu disk) ===
+        rec.write("lane", hasil_normal)
+        rec.write("bev", hasil_bev)
+        rec.row("log", [
+            lux, brightness, gamma,
+            offset_normal, arah_normal, offset_bev, arah_bev
+        ])
+
+        # === SHOW LIVE PREVIEW ===
+        cv2.imshow("Lane Detection (Normal)", hasil_normal)
+        cv2.imshow("Lane Detection (Bird's Eye View)", hasil_bev)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            print("[STOP] Dihentikan manual oleh user\n")
+            break
+finally:
+    # tunggu sisa queue ditulis, lalu release video + fsync log
+    rec.close()
+    lux_sampler.stop()
+    cv2.destroyAllWindows()
+    cam.stop()
+
+print("\n[DONE] Logging selesai.")
+print("Log  :", log_file)
+print("Video:", video_file_lane)
+print("      ", video_file_bev)
@@ -0,0 +1,440 @@
+"""
+Async MJPEG / SSE server yang aman untuk client lambat
+======================================================
+
+Dengan Flask threaded=True, viewer lewat ngrok yang membaca lambat
+menahan satu thread di dalam `yield`. Di sini semua koneksi streaming
+dilayani satu event loop asyncio:
+- tiap client punya mailbox satu slot ("frame terbaru"); frame baru
+  menimpa frame yang belum terkirim dan dihitung sebagai drop
+- client lambat cuma menunggu di drain() miliknya sendiri, producer dan
+  client lain tidak ikut menunggu
+- tiap client video punya AdaptiveQuality (?quality=auto|high|...):
+  kalau delivered jauh di bawah frame yang tersedia, turun anak tangga
+- /mask_feed (mask biner, mask_codec) lewat jalur yang sama
+- delivered/dropped fps per client bisa dilihat di /api/clients
+
+Route lain (/api/status, /api/stats, /) tetap dilayani app Flask lewat
+adapter WSGI kecil di thread pool, jadi cukup satu port.
+
+Cara pakai (lihat stream_server.py):
+    python stream_server.py --async
+
+Demo satu client lambat + satu client normal:
+    python async_stream.py
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+from mask_codec import MaskEncoder
+from quality_ladder import make_quality
+
+STREAM_HEADERS = (
+    "HTTP/1.1 200 OK\r\n"
+    "Content-Type: {content_type}\r\n"
+    "Cache-Control: no-cache\r\n"
+    "Connection: close\r\n"
+    "Access-Control-Allow-Origin: *\r\n"
+    "X-Accel-Buffering: no\r\n"
+    "\r\n"
+)
+
+
+class Mailbox:
+    """Satu slot: put() menimpa isi lama yang belum diambil (dihitung drop)"""
+
+    def __init__(self):
+        self._item = None
+        self._event = asyncio.Event()
+        self.dropped = 0
+        self.drop_times = deque(maxlen=512)
+
+    def put(self, item):
+        if self._item is not None:
+            self.dropped += 1
+            self.drop_times.append(time.monotonic())
+        self._item = item
+        self._event.set()
+
+    async def get(self):
+        await self._event.wait()
+        item, self._item = self._item, None
+        self._event.clear()
+        return item
+
+
+class StreamClient:
+    """Satu koneksi streaming + statistiknya"""
+
+    def __init__(self, kind, variant, peer, quality=None, source=None):
+        self.kind = kind
+        self.source = source or kind   # hub asal item untuk mailbox ini
+        self.variant = variant
+        self.peer = peer
+        self.quality = quality
+        self.mailbox = Mailbox()
+        self.connected_at = time.monotonic()
+        self.delivered = 0
+        self.deliver_times = deque(maxlen=512)
+
+    def stats(self, window=2.0):
+        now = time.monotonic()
+        umur = now - self.connected_at
+        span = min(window, umur) or 1e-9
+        stats = {
+            "kind": self.kind,
+            "variant": self.variant,
+            "peer": self.peer,
+            "connected_s": round(umur, 1),
+            "delivered": self.delivered,
+            "dropped": self.mailbox.dropped,
+            "delivered_fps": round(sum(1 for t in self.deliver_times if now - t <= window) / span, 1),
+            "dropped_fps": round(sum(1 for t in self.mailbox.drop_times if now - t <= window) / span, 1),
+        }
+        if self.quality is not None:
+            stats["quality"] = self.quality.stats()
+        return stats
+
+
+def _encode_mask(frame, variant, encoder):
+    packed = frame.packed_mask(variant)
+    if packed is None:
+        return None
+    return encoder.encode(packed, frame.meta.get("frame_id", 0))
+
+
+class AsyncStreamServer:
+    """
+    - hub        : FrameHub berisi HubFrame (video)
+    - telemetry  : FrameHub berisi dict telemetry (SSE), boleh None
+    - wsgi_app   : app Flask untuk route selain streaming, boleh None
+    - parse_variant(query) -> variant atau None (query tidak valid)
+    - part_headers(frame, length, rung) -> bytes header part MJPEG
+    - parse_mask(query) -> variant mask /mask_feed atau None
+    - event_payload(data, overlay) -> teks event SSE (overlay=True untuk ?overlay=1)
+    """
+
+    def __init__(self, hub, telemetry=None, wsgi_app=None, parse_variant=None,
+                 part_headers=None, parse_mask=None, event_payload=None, host="0.0.0.0",
+                 port=5000, stall_timeout=30.0):
+        self.hub = hub
+        self.telemetry = telemetry
+        self.wsgi_app = wsgi_app
+        self.parse_variant = parse_variant or (lambda query: "detection/bev")
+        self.part_headers = part_headers or (
+            lambda frame, length, rung=None: f"Content-Type: image/jpeg\r\nContent-Length: {length}\r\n\r\n".encode()
+        )
+        self.parse_mask = parse_mask or (lambda query: None)
+        self.event_payload = event_payload or (
+            lambda data, overlay=False: f"id: {data['frame_id']}\nevent: telemetry\ndata: {json.dumps(data)}\n\n"
+        )
+        self.host = host
+        self.port = port
+        self.stall_timeout = stall_timeout
+        self.clients = set()
+        self.loop = None
+        self._server = None
+
+    # ---------- pump: hub (thread) → mailbox (event loop) ----------
+
+    def _pump(self, source, kind):
+        """Thread yang menunggu frame baru di hub lalu menyebarkan ke mailbox"""
+        last_id = 0
+        while self.loop is not None and not self.loop.is_closed():
+            last_id, item = source.wait_for(last_id, timeout=1.0)
+            if item is None:
+                continue
+            try:
+                self.loop.call_soon_threadsafe(self._dispatch, kind, item)
+            except RuntimeError:
+                break  # loop sudah ditutup
+
+    def _dispatch(self, kind, item):
+        for client in self.clients:
+            if client.source == kind:
+                if client.quality is not None:
+                    client.quality.on_source()
+                client.mailbox.put(item)
+
+    # ---------- HTTP ----------
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        body = b""
+        if int(headers.get("content-length", 0) or 0):
+            body = await reader.readexactly(int(headers["content-length"]))
+        path, _, query = target.partition("?")
+        return method, path, query, headers, body
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        peer = f"{peer[0]}:{peer[1]}" if peer else "?"
+        try:
+            try:
+                method, path, query, headers, body = await self._read_request(reader)
+            except asyncio.LimitOverrunError:
+                # request line / header lebih panjang dari limit StreamReader (64 KB)
+                await self._send_json(writer, {"error": "request header terlalu besar"},
+                                      "431 Request Header Fields Too Large")
+                return
+            except ValueError:
+                # request line / Content-Length rusak
+                await self._send_json(writer, {"error": "request tidak valid"}, "400 Bad Request")
+                return
+            if path == "/video_feed":
+                params = parse_qs(query)
+                variant = self.parse_variant(params)
+                quality = make_quality(params.get("quality", ["auto"])[0])
+                if variant is None or quality is None:
+                    # biar app Flask yang menjawab 400
+                    await self._send_wsgi(writer, method, path, query, headers, body)
+                else:
+                    await self._stream_video(writer, variant, peer, quality)
+            elif path == "/mask_feed" and self.parse_mask(parse_qs(query)) is not None:
+                params = parse_qs(query)
+                encoder = MaskEncoder(delta=params.get("delta", ["1"])[0] != "0")
+                await self._stream_masks(writer, self.parse_mask(params), peer, encoder)
+            elif path == "/api/events" and self.telemetry is not None:
+                overlay = parse_qs(query).get("overlay", ["0"])[0] == "1"
+                await self._stream_events(writer, peer, overlay)
+            elif path == "/api/clients":
+                await self._send_json(writer, self.client_stats())
+            else:
+                await self._send_wsgi(writer, method, path, query, headers, body)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.TimeoutError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, data):
+        writer.write(data)
+        # Cuma coroutine client ini yang menunggu; kalau macet terlalu lama, putus
+        await asyncio.wait_for(writer.drain(), timeout=self.stall_timeout)
+
+    async def _stream_video(self, writer, variant, peer, quality=None):
+        quality = quality or make_quality("auto")
+        client = StreamClient("video", variant, peer, quality)
+        self.clients.add(client)
+        loop = asyncio.get_running_loop()
+        try:
+            with self.hub.subscribe(variant) as sub:
+                await self._write(writer, STREAM_HEADERS.format(
+                    content_type="multipart/x-mixed-replace; boundary=frame").encode())
+                while True:
+                    frame = await client.mailbox.get()
+                    if not quality.due():
+                        continue
+                    rung = quality.rung
+                    sub.set_rung(rung)
+                    # encode (kalau belum di-cache) di thread pool, bukan di event loop
+                    data = await loop.run_in_executor(None, frame.jpeg, variant, rung)
+                    if data is None:
+                        continue
+                    await self._write(writer, b"--frame\r\n" + self.part_headers(frame, len(data), rung)
+                                      + data + b"\r\n")
+                    quality.on_sent()
+                    client.delivered += 1
+                    client.deliver_times.append(time.monotonic())
+        finally:
+            self.clients.discard(client)
+
+    async def _stream_masks(self, writer, variant, peer, encoder):
+        client = StreamClient("mask", variant, peer, source="video")
+        self.clients.add(client)
+        loop = asyncio.get_running_loop()
+        try:
+            with self.hub.subscribe(variant, "mask"):
+                await self._write(writer, STREAM_HEADERS.format(
+                    content_type="application/octet-stream").encode())
+                while True:
+                    frame = await client.mailbox.get()
+                    # pack + delta (XOR, RLE) di thread pool, bukan di event loop
+                    data = await loop.run_in_executor(None, _encode_mask, frame, variant, encoder)
+                    if data is None:
+                        continue
+                    await self._write(writer, data)
+                    client.delivered += 1
+                    client.deliver_times.append(time.monotonic())
+        finally:
+            self.clients.discard(client)
+
+    async def _stream_events(self, writer, peer, overlay=False):
+        client = StreamClient("events", "overlay" if overlay else None, peer)
+        self.clients.add(client)
+        # subscriber overlay di hub video: detector baru hitung geometri kalau ada yang minta
+        subscription = self.hub.subscribe("overlay", "json") if overlay else contextlib.nullcontext()
+        try:
+            with subscription:
+                await self._write(writer, STREAM_HEADERS.format(content_type="text/event-stream").encode())
+                while True:
+                    try:
+                        data = await asyncio.wait_for(client.mailbox.get(), timeout=15.0)
+                    except asyncio.TimeoutError:
+                        await self._write(writer, b": keepalive\n\n")
+                        continue
+                    await self._write(writer, self.event_payload(data, overlay).encode())
+                    client.delivered += 1
+                    client.deliver_times.append(time.monotonic())
+        finally:
+            self.clients.discard(client)
+
+    async def _send_json(self, writer, payload, status="200 OK"):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nAccess-Control-Allow-Origin: *\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _send_wsgi(self, writer, method, path, query, headers, body):
+        """Route non-streaming: jalankan app Flask di thread pool"""
+        if self.wsgi_app is None:
+            await self._send_json(writer, {"error": "not found"}, "404 Not Found")
+            return
+        loop = asyncio.get_running_loop()
+        status, response_headers, payload = await loop.run_in_executor(
+            None, self._call_wsgi, method, path, query, headers, body
+        )
+        head = f"HTTP/1.1 {status}\r\n"
+        for k, v in response_headers:
+            if k.lower() not in ("connection", "content-length"):
+                head += f"{k}: {v}\r\n"
+        head += f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n"
+        await self._write(writer, head.encode("latin-1") + payload)
+
+    def _call_wsgi(self, method, path, query, headers, body):
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "CONTENT_TYPE": headers.get("content-type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for k, v in headers.items():
+            if k not in ("content-type", "content-length"):
+                environ["HTTP_" + k.upper().replace("-", "_")] = v
+
+        hasil = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            hasil["status"] = status
+            hasil["headers"] = response_headers
+
+        chunks = self.wsgi_app(environ, start_response)
+        try:
+            payload = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        return hasil["status"], hasil["headers"], payload
+
+    # ---------- run ----------
+
+    def client_stats(self):
+        return {"clients": [c.stats() for c in list(self.clients)]}
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        sources = [(self.hub, "video")]
+        if self.telemetry is not None:
+            sources.append((self.telemetry, "events"))
+        for source, kind in sources:
+            threading.Thread(target=self._pump, args=(source, kind), daemon=True).start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    def start_in_thread(self):
+        """Jalankan event loop di daemon thread (untuk test / demo)"""
+        t = threading.Thread(target=self.run, daemon=True)
+        t.start()
+        return t
+
+
+# ===================== DEMO =====================
+
+if __name__ == "__main__":
+    import socket
+
+    import numpy as np
+
+    from frame_hub import FrameHub, HubFrame
+
+    hub = FrameHub()
+    produced = [0]
+
+    def producer():
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (360, 640, 3), dtype=np.uint8)
+        while True:
+            frame = HubFrame({"detection/bev": image})
+            frame.jpeg("detection/bev")
+            hub.publish(frame)
+            produced[0] += 1
+            time.sleep(1 / 30)
+
+    threading.Thread(target=producer, daemon=True).start()
+    server = AsyncStreamServer(hub, host="127.0.0.1", port=5055)
+    server.start_in_thread()
+    time.sleep(0.5)
+
+    def client(delay, hasil, key):
+        s = socket.socket()
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16384)  # sebelum connect
+        s.connect(("127.0.0.1", 5055))
+        s.sendall(b"GET /video_feed HTTP/1.1\r\nHost: x\r\n\r\n")
+        total = 0
+        t_end = time.time() + 4.0
+        while time.time() < t_end:
+            total += len(s.recv(4096))
+            if delay:
+                time.sleep(delay)
+        hasil[key] = total
+        s.close()
+
+    hasil = {}
+    threads = [
+        threading.Thread(target=client, args=(0, hasil, "cepat")),
+        threading.Thread(target=client, args=(0.005, hasil, "lambat")),  # ~800 KB/s
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(3.0)
+    start = produced[0]
+    stats = server.client_stats()["clients"]
+    time.sleep(1.0)
+    print(f"producer: {produced[0] - start:.0f} fps")
+    for c in sorted(stats, key=lambda c: c["delivered_fps"], reverse=True):
+        print(f"  client {c['peer']}: delivered {c['delivered_fps']} fps, dropped {c['dropped_fps']} fps, "
+              f"quality {c['quality']['rung']}")
+    for t in threads:
+        t.join()
@@ -0,0 +1,220 @@
+"""
+Analisis batch video (headless, paralel per potongan frame)
+===========================================================
+
+Dulu analisis video jam-jaman harus diputar lewat player Tk
+(core_vision_video.LaneDetectionApp) dengan kecepatan asli. Di sini video
+dibagi jadi potongan frame [start, end), tiap potongan diproses di worker
+process (LaneDetector yang sama dengan stream server: gamma, BEV, deteksi),
+lalu hasil per frame digabung berurutan ke satu file .tlog
+(telemetry_log.py, bisa `to-csv`).
+
+Kolom per frame: lux, brightness, gamma, offset, arah, posisi garis
+kiri / tengah / kanan (-1 = tidak ada), jumlah blob, piksel putih mask BEV.
+- input mp4: frame di-resize ke 640x360, lux = brightness * 10 (sama
+  dengan player, mp4 tidak punya lux); t_ns = posisi di video
+- input folder rekaman capture_file.py: lux + t_ns asli
+Tracking (Kalman) tidak dipakai: tiap frame independen, jadi hasil paralel
+sama persis dengan serial.
+
+Cara pakai:
+    python batch_analysis.py "video 3 november.mp4"               # semua core
+    python batch_analysis.py capture/jalan1 --workers 4 --csv
+    python batch_analysis.py video.mp4 -o hasil.tlog --chunk 500
+    python batch_analysis.py video.mp4 --scaling                  # 1..N worker, cek hasil identik
+    python batch_analysis.py video.mp4 --mask-first               # threshold dulu, warp mask saja
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from telemetry_log import ARAH, TelemetryLog, read_log, to_csv
+
+RESULT_FIELDS = [
+    ("lux", "f4"), ("brightness", "f4"), ("gamma", "f4"),
+    ("offset", "i2"), ("arah", "i1", ARAH),
+    ("kiri", "i2"), ("tengah", "i2"), ("kanan", "i2"),
+    ("blobs", "u2"), ("white_px", "u4"),
+]
+
+FRAME_SIZE = (640, 360)
+
+# State per worker process (dibuat sekali di _init_worker)
+_worker = {}
+
+
+class _VideoInput:
+    """Baca potongan frame dari mp4 atau folder capture_file.py (sama-sama BGR 640x360)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_capture = os.path.isdir(path)
+        if self.is_capture:
+            from capture_file import CaptureReader
+            self.reader = CaptureReader(path)
+            self.count = len(self.reader)
+            self.fps = self.reader.fps
+        else:
+            self.cap = cv2.VideoCapture(path)
+            if not self.cap.isOpened():
+                raise ValueError(f"Video tidak bisa dibuka: {path}")
+            self.count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pos = 0
+
+    def frames(self, start, end):
+        """Yields (index, frame BGR, lux atau None, t_ns)"""
+        if self.is_capture:
+            for i in range(start, end):
+                lux, stale = self.reader.lux_at(i)
+                yield i, self.reader.image(i), None if stale else lux, int(self.reader.log["t_ns"][i])
+            return
+        if self.pos != start:
+            # potongan berurutan di worker yang sama tidak perlu seek
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        self.pos = start
+        while self.pos < end:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            i = self.pos
+            self.pos += 1
+            yield i, cv2.resize(frame, FRAME_SIZE), None, int(i * 1e9 / self.fps)
+
+    def close(self):
+        if not self.is_capture:
+            self.cap.release()
+
+
+def _init_worker(path, mask_first=False):
+    from capture_file import ReplayLux
+    from lane_detector import LaneDetector
+
+    # satu thread OpenCV per proses, paralelnya dari jumlah worker
+    cv2.setNumThreads(1)
+    lux = ReplayLux()
+    # batch cuma butuh mask + posisi, mask_first bisa dinyalakan (--mask-first)
+    # tanpa capture thread, frame dari file
+    detector = LaneDetector(source=False, lux_sampler=lux, mask_first=mask_first)
+    _worker.update(input=_VideoInput(path), detector=detector, lux=lux)
+
+
+def _analyze_range(task):
+    """Satu potongan [start, end) → list (index, t_ns, values) berurutan"""
+    start, end = task
+    detector = _worker["detector"]
+    lux = _worker["lux"]
+    rows = []
+    for i, frame, lux_value, t_ns in _worker["input"].frames(start, end):
+        if lux_value is None:
+            lux_value = detector.measure_brightness(frame) * 10.0
+        lux.set(lux_value)
+        views, offset, arah = detector.detect_lane(frame, ("mask/bev", "overlay"))
+        lanes = detector.overlay["lanes"]
+        telemetry = detector.telemetry
+        rows.append((i, t_ns, [
+            lux_value, telemetry["brightness"], telemetry["gamma"], offset, arah,
+            *(-1 if lanes[k] is None else lanes[k] for k in ("kiri", "tengah", "kanan")),
+            len(detector.overlay["contours"]), cv2.countNonZero(views["mask/bev"]),
+        ]))
+    return rows
+
+
+def analyze(path, out_path, workers=None, chunk=None, max_frames=None, verbose=True,
+            mask_first=False):
+    """
+    Analisis seluruh video ke out_path (.tlog).
+    Returns: (jumlah frame, detik)
+    """
+    from bev_geometry import BevGeometry
+
+    workers = workers or os.cpu_count() or 1
+    source = _VideoInput(path)
+    count = source.count if max_frames is None else min(source.count, max_frames)
+    source.close()
+    # ~4 potongan per worker supaya worker yang cepat selesai tidak menganggur
+    chunk = chunk or max(100, -(-count // (workers * 4)))
+    tasks = [(s, min(s + chunk, count)) for s in range(0, count, chunk)]
+
+    # cache geometri BEV ditulis sekali di sini, bukan rebutan antar worker
+    BevGeometry(*FRAME_SIZE)
+
+    log = TelemetryLog(out_path, RESULT_FIELDS, meta={
+        "source": os.path.abspath(path), "fps": source.fps, "frames": count,
+        "lux": "recorded" if source.is_capture else "brightness*10",
+    })
+    t0 = time.perf_counter()
+    done = 0
+    if workers == 1:
+        _init_worker(path, mask_first)
+        results = map(_analyze_range, tasks)
+        pool = None
+    else:
+        pool = mp.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(path, mask_first))
+        # imap: hasil tetap urut walau potongan selesai tidak berurutan
+        results = pool.imap(_analyze_range, tasks)
+    try:
+        for rows in results:
+            for i, t_ns, values in rows:
+                log.append(values, frame_id=i, t_ns=t_ns)
+            done += len(rows)
+            if verbose:
+                elapsed = time.perf_counter() - t0
+                print(f"\r{done}/{count} frame, {done / elapsed:.0f} fps", end="", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        log.close()
+    elapsed = time.perf_counter() - t0
+    if verbose:
+        print(file=sys.stderr)
+    return done, elapsed
+
+
+def _arg(name, default):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+if __name__ == "__main__":
+    args = [a for i, a in enumerate(sys.argv[1:], 1)
+            if not a.startswith("-") and sys.argv[i - 1] not in ("-o", "--workers", "--chunk", "--max-frames")]
+    path = args[0] if args else "video 3 november.mp4"
+    out_path = _arg("-o", os.path.splitext(os.path.basename(path.rstrip("/")))[0] + "_analysis.tlog")
+    workers = int(_arg("--workers", os.cpu_count() or 1))
+    chunk = int(_arg("--chunk", 0)) or None
+    max_frames = int(_arg("--max-frames", 0)) or None
+    mask_first = "--mask-first" in sys.argv
+
+    if "--scaling" in sys.argv:
+        # 1, 2, 4, ... worker: fps, speedup, dan hasil harus identik dengan 1 worker
+        base = None
+        n = 1
+        while n <= workers:
+            tmp = f"{out_path}.{n}"
+            frames, elapsed = analyze(path, tmp, n, chunk, max_frames, verbose=False,
+                                     mask_first=mask_first)
+            data = np.array(read_log(tmp))
+            os.remove(tmp)
+            if base is None:
+                base = (data, elapsed)
+            sama = np.array_equal(data, base[0])
+            print(f"  {n} worker: {frames / elapsed:6.0f} fps, speedup {base[1] / elapsed:.2f}x, "
+                  f"hasil {'identik' if sama else 'BEDA'}")
+            n *= 2
+        sys.exit(0)
+
+    frames, elapsed = analyze(path, out_path, workers, chunk, max_frames, mask_first=mask_first)
+    print(f"{frames} frame dalam {elapsed:.1f} s ({frames / elapsed:.0f} fps, {workers} worker) → {out_path}")
+    if "--csv" in sys.argv:
+        csv_path, _ = to_csv(out_path)
+        print(f"CSV: {csv_path}")
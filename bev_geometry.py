@@ -0,0 +1,197 @@
+"""
+Geometry cache untuk Bird Eye View
+==================================
+
+`cv2.warpPerspective` menghitung ulang koordinat sumber untuk setiap pixel
+di setiap frame, padahal matrix BEV tidak pernah berubah. Di sini:
+- M_bev diubah sekali jadi map fixed-point (cv2.convertMaps → CV_16SC2)
+- map di-offset ke bounding box trapesium sumber, jadi remap cuma
+  membaca pixel di dalam ROI
+- ROI mask (view normal) + bounding box dihitung sekali
+- semuanya disimpan ke disk (.npz) dan di-load lagi saat startup
+
+Cara pakai:
+    geometry = BevGeometry(640, 360)
+    frame_bev = geometry.warp(frame)          # ~ cv2.warpPerspective(frame, M, (w, h))
+    mask = geometry.apply_roi_normal(mask)    # ~ bitwise_and dengan trapesium
+"""
+
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".geometry_cache")
+
+
+def default_points(width, height):
+    """src/dst points standar yang dipakai semua script (trapesium 0.2-0.8, top 0.3)"""
+    src_points = np.float32([
+        [0, height],
+        [width, height],
+        [int(width * 0.2), int(height * 0.3)],
+        [int(width * 0.8), int(height * 0.3)]
+    ])
+    dst_points = np.float32([
+        [0, height],
+        [width, height],
+        [0, 0],
+        [width, 0]
+    ])
+    return src_points, dst_points
+
+
+class BevGeometry:
+    """Semua data geometri per (resolusi, src_points, dst_points), dihitung sekali"""
+
+    def __init__(self, width, height, src_points=None, dst_points=None,
+                 cache_dir=DEFAULT_CACHE_DIR):
+        self.width = width
+        self.height = height
+        if src_points is None or dst_points is None:
+            src_points, dst_points = default_points(width, height)
+        self.src_points = np.float32(src_points)
+        self.dst_points = np.float32(dst_points)
+        self.M = cv2.getPerspectiveTransform(self.src_points, self.dst_points)
+
+        # ROI trapesium untuk view normal (tanpa BEV) = area yang dilihat BEV
+        self.polygon_normal = np.array([[
+            (0, height),
+            (width, height),
+            (int(width * 0.8), int(height * 0.3)),
+            (int(width * 0.2), int(height * 0.3))
+        ]], np.int32)
+
+        # ROI di BEV = seluruh frame, jadi bitwise_and tidak perlu
+        self.polygon_bev = np.array([[
+            (0, height),
+            (width, height),
+            (width, 0),
+            (0, 0)
+        ]], np.int32)
+
+        self.cache_path = None
+        if cache_dir:
+            self.cache_path = os.path.join(cache_dir, f"bev_{self._cache_key()}.npz")
+
+        if not self._load():
+            self._build()
+            self._save()
+        self._build_column_ranges()
+
+    def _cache_key(self):
+        h = hashlib.sha1()
+        h.update(np.int32([self.width, self.height]).tobytes())
+        h.update(self.src_points.tobytes())
+        h.update(self.dst_points.tobytes())
+        h.update(cv2.__version__.encode())
+        return h.hexdigest()[:16]
+
+    def _build(self):
+        w, h = self.width, self.height
+
+        # Bounding box sumber (+1 px margin untuk tetangga bilinear)
+        x, y, bw, bh = cv2.boundingRect(self.src_points)
+        x0, y0 = max(x - 1, 0), max(y - 1, 0)
+        x1, y1 = min(x + bw + 1, w), min(y + bh + 1, h)
+        self.src_bbox = np.int32([x0, y0, x1, y1])
+
+        # Koordinat sumber untuk tiap pixel tujuan (inverse mapping)
+        M_inv = np.linalg.inv(self.M)
+        xs, ys = np.meshgrid(np.arange(w, dtype=np.float64), np.arange(h, dtype=np.float64))
+        den = M_inv[2, 0] * xs + M_inv[2, 1] * ys + M_inv[2, 2]
+        map_x = (M_inv[0, 0] * xs + M_inv[0, 1] * ys + M_inv[0, 2]) / den - x0
+        map_y = (M_inv[1, 0] * xs + M_inv[1, 1] * ys + M_inv[1, 2]) / den - y0
+        map_x = map_x.astype(np.float32)
+        map_y = map_y.astype(np.float32)
+
+        self.map1, self.map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        self.map_nearest, _ = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2, nninterpolation=True)
+
+        self.roi_normal = np.zeros((h, w), np.uint8)
+        cv2.fillPoly(self.roi_normal, [self.polygon_normal], 255)
+        bx, by, bbw, bbh = cv2.boundingRect(self.polygon_normal)
+        self.roi_normal_bbox = np.int32([bx, by, min(bx + bbw, w), min(by + bbh, h)])
+
+    def _build_column_ranges(self):
+        """Rentang kolom sumber (koordinat crop) yang dibaca tiap kolom BEV"""
+        x0, y0, x1, y1 = self.src_bbox
+        lebar = int(x1 - x0)
+        lin = self.map1[..., 0].astype(np.int32)
+        near = self.map_nearest[..., 0].astype(np.int32)
+        # bilinear baca x dan x+1
+        self.col_src_min = np.clip(np.minimum(lin.min(axis=0), near.min(axis=0)), 0, lebar)
+        self.col_src_max = np.clip(np.maximum(lin.max(axis=0) + 2, near.max(axis=0) + 1), 0, lebar)
+
+    def source_columns(self, x0, x1):
+        """Kolom crop (sx0, sx1) yang cukup untuk menghasilkan kolom BEV x0:x1"""
+        return int(self.col_src_min[x0:x1].min()), int(self.col_src_max[x0:x1].max())
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path) as data:
+                self.src_bbox = data["src_bbox"]
+                self.map1 = data["map1"]
+                self.map2 = data["map2"]
+                self.map_nearest = data["map_nearest"]
+                self.roi_normal = data["roi_normal"]
+                self.roi_normal_bbox = data["roi_normal_bbox"]
+            return True
+        except Exception as e:
+            print(f"Geometry cache rusak, hitung ulang: {e}")
+            return False
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            np.savez(
+                self.cache_path,
+                src_bbox=self.src_bbox, map1=self.map1, map2=self.map2,
+                map_nearest=self.map_nearest, roi_normal=self.roi_normal,
+                roi_normal_bbox=self.roi_normal_bbox
+            )
+        except OSError as e:
+            print(f"Geometry cache tidak bisa disimpan: {e}")
+
+    def crop(self, frame):
+        """View bounding box trapesium sumber (satu-satunya area yang dibaca warp)"""
+        x0, y0, x1, y1 = self.src_bbox
+        return frame[y0:y1, x0:x1]
+
+    def warp(self, frame, dst=None, nearest=False, cropped=False, columns=None):
+        """
+        Pengganti cv2.warpPerspective(frame, M, (w, h)).
+        Cuma bounding box trapesium sumber yang dibaca (view, bukan copy).
+        nearest=True untuk mask biner (tidak ada nilai abu-abu di tepi).
+        cropped=True kalau frame sudah hasil crop() (mis. mask camera-space).
+        columns=(x0, x1) cuma hitung kolom BEV x0:x1 (hasil selebar x1 - x0).
+        """
+        src = frame if cropped else self.crop(frame)
+        map1, map2, map_nearest = self.map1, self.map2, self.map_nearest
+        if columns is not None:
+            x0, x1 = columns
+            map1, map2, map_nearest = map1[:, x0:x1], map2[:, x0:x1], map_nearest[:, x0:x1]
+        if nearest:
+            return cv2.remap(src, map_nearest, None, cv2.INTER_NEAREST, dst=dst)
+        return cv2.remap(src, map1, map2, cv2.INTER_LINEAR, dst=dst)
+
+    def apply_roi_normal(self, mask, dst=None):
+        """bitwise_and dengan trapesium normal, baris di luar bounding box langsung nol"""
+        x0, y0, x1, y1 = self.roi_normal_bbox
+        if dst is None:
+            dst = np.zeros_like(mask)
+        else:
+            dst[:y0] = 0
+            dst[y1:] = 0
+            dst[:, :x0] = 0
+            dst[:, x1:] = 0
+        cv2.bitwise_and(
+            mask[y0:y1, x0:x1], self.roi_normal[y0:y1, x0:x1],
+            dst=dst[y0:y1, x0:x1]
+        )
+        return dst
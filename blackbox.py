@@ -0,0 +1,366 @@
+"""
+Black box: N detik frame mentah terakhir di ring memory-mapped
+==============================================================
+
+Rekam sesi penuh pakai cv2.VideoWriter makan CPU encode terus-menerus,
+padahal yang biasanya dibutuhkan cuma beberapa detik sekitar garis hilang.
+Di sini pipeline live cuma np.copyto frame mentah ke slot ring (tanpa
+encode). Ring ada di file memory-mapped (/dev/shm kalau ada, jadi di RAM
+dan tidak menulis SD card), dan tetap ada walau proses crash.
+
+Trigger (salah satu):
+- |offset| > offset_threshold (sekali tiap kali melewati batas)
+- arah == "N/A" selama `lost_frames` frame berturut-turut
+- manual: trigger("http"), mis. POST /api/blackbox/trigger di stream_server
+
+Saat trigger, thread dump menulis `pre_seconds` sebelum + `post_seconds`
+sesudah event ke out_dir/<jam>_<alasan>_<frame_id>/ dalam format rekaman
+capture_file.py (frames.bin mentah + meta.tlog dengan lux, sensor t_ns,
+plus gamma, brightness, offset, arah), jadi event bisa langsung di-replay:
+    python capture_file.py replay blackbox/<event>
+Slot yang keburu ditimpa sebelum sempat ditulis dihitung `lost`.
+
+Cara pakai:
+    box = BlackBox(seconds=10, fps=30, frame_shape=(360, 640, 3), lost_frames=15)
+    ... per frame:
+    box.push(captured.image, captured.frame_id, captured.wall_time, captured.sensor_ts)
+    box.observe(captured.frame_id, latest_data)     # telemetry + cek trigger
+    ...
+    box.close()
+
+Setelah crash (ring masih di /dev/shm):
+    python blackbox.py dump /dev/shm/blackbox.ring [out_dir]
+
+Benchmark biaya push vs VideoWriter.write + tes dump:
+    python blackbox.py
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from capture_file import CaptureWriter
+from telemetry_log import ARAH
+
+MAGIC = b"BBOX"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIIII")    # magic, versi, slots, h, w, c
+_HEAD_OFFSET = 64                     # u8: seq frame terakhir yang selesai ditulis
+_META_OFFSET = 4096
+
+# seq 0 = slot kosong / sedang ditulis
+SLOT_DTYPE = np.dtype([
+    ("seq", "<u8"), ("frame_id", "<u4"), ("t_ns", "<u8"), ("wall_time", "<f8"),
+    ("lux", "<f4"), ("gamma", "<f4"), ("brightness", "<f4"),
+    ("offset", "<i2"), ("arah", "i1"),
+])
+
+# Kolom tambahan meta.tlog hasil dump (selain kolom rekaman capture_file.py)
+EVENT_FIELDS = [
+    ("gamma", "f4"), ("brightness", "f4"), ("offset", "i2"), ("arah", "i1", ARAH),
+]
+
+# Dump menunggu telemetry frame (observe) paling lama selama ini (frame)
+_OBSERVE_LAG = 30
+
+
+def default_ring_path():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "blackbox.ring")
+
+
+class BlackBox:
+    """Ring frame mentah di file mmap + trigger + dump di background thread"""
+
+    def __init__(self, seconds=10, fps=30, frame_shape=(360, 640, 3), pre_seconds=5,
+                 post_seconds=3, out_dir="blackbox", path=None,
+                 offset_threshold=None, lost_frames=15, _attach=False):
+        self.path = path or default_ring_path()
+        self.out_dir = out_dir
+        self.offset_threshold = offset_threshold
+        self.lost_frames = lost_frames
+
+        if _attach:
+            with open(self.path, "rb") as f:
+                magic, version, slots, h, w, c = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path}: bukan ring black box")
+            frame_shape = (h, w, c)
+        else:
+            slots = int(seconds * fps)
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        self.pre_frames = int(pre_seconds * fps)
+        self.post_frames = int(post_seconds * fps)
+        if not _attach and self.pre_frames + self.post_frames >= slots:
+            raise ValueError("ring harus lebih panjang dari pre_seconds + post_seconds")
+
+        frame_bytes = int(np.prod(self.frame_shape))
+        frames_offset = _META_OFFSET + -(-slots * SLOT_DTYPE.itemsize // 4096) * 4096
+        total = frames_offset + slots * frame_bytes
+        self._mm = np.memmap(self.path, np.uint8, "r+" if _attach else "w+", shape=(total,))
+        if not _attach:
+            self._mm[:_HEADER.size] = np.frombuffer(
+                _HEADER.pack(MAGIC, VERSION, slots, *self.frame_shape), np.uint8)
+        self._head = self._mm[_HEAD_OFFSET:_HEAD_OFFSET + 8].view(np.uint64)
+        self.meta = self._mm[_META_OFFSET:_META_OFFSET + slots * SLOT_DTYPE.itemsize].view(SLOT_DTYPE)
+        self.frames = self._mm[frames_offset:].reshape((slots,) + self.frame_shape)
+
+        self._cond = threading.Condition()
+        self._recent = {}                 # frame_id → seq, untuk observe()
+        self._observed = 0
+        self._lost_run = 0
+        self._over = False
+        self._dump = None
+        self._closed = False
+
+        self.events = []
+        self.lost = 0
+        self.skipped = 0
+
+    @classmethod
+    def attach(cls, path, out_dir="blackbox"):
+        """Buka ring yang sudah ada (mis. sisa proses yang crash)"""
+        return cls(path=path, out_dir=out_dir, pre_seconds=0, post_seconds=0, _attach=True)
+
+    @property
+    def head(self):
+        return int(self._head[0])
+
+    # ---------- dipanggil pipeline live ----------
+
+    def push(self, image, frame_id, wall_time=None, t_ns=None):
+        """Copy frame ke slot berikutnya (tanpa encode). Returns seq."""
+        seq = self.head + 1
+        slot = (seq - 1) % self.slots
+        rec = self.meta[slot]
+        rec["seq"] = 0
+        np.copyto(self.frames[slot], image)
+        rec["frame_id"] = frame_id
+        rec["t_ns"] = t_ns if t_ns is not None else time.monotonic_ns()
+        rec["wall_time"] = wall_time if wall_time is not None else time.time()
+        rec["lux"] = rec["gamma"] = rec["brightness"] = np.nan
+        rec["offset"] = 0
+        rec["arah"] = -1
+        rec["seq"] = seq
+        with self._cond:
+            self._head[0] = seq
+            self._recent[frame_id] = seq
+            if len(self._recent) > _OBSERVE_LAG:
+                self._recent.pop(next(iter(self._recent)))
+            self._cond.notify_all()
+        return seq
+
+    def view(self, seq):
+        """Frame di slot ring (valid sampai ring memutar, ~`seconds` detik)"""
+        return self.frames[(seq - 1) % self.slots]
+
+    def observe(self, frame_id, data):
+        """Telemetry frame ini (dict latest_data) ke slot-nya + cek trigger"""
+        seq = self._recent.get(frame_id)
+        if seq is not None:
+            rec = self.meta[(seq - 1) % self.slots]
+            if rec["seq"] == seq:
+                rec["lux"] = data.get("lux", np.nan)
+                rec["gamma"] = data.get("gamma", np.nan)
+                rec["brightness"] = data.get("brightness", np.nan)
+                rec["offset"] = data.get("offset", 0)
+                arah = data.get("arah")
+                rec["arah"] = ARAH.index(arah) if arah in ARAH else -1
+            with self._cond:
+                self._observed = max(self._observed, seq)
+                self._cond.notify_all()
+
+        if data.get("arah") == "N/A":
+            self._lost_run += 1
+            if self._lost_run == self.lost_frames:
+                self.trigger("lost", seq)
+        else:
+            self._lost_run = 0
+
+        if self.offset_threshold is not None:
+            over = abs(data.get("offset", 0)) > self.offset_threshold
+            if over and not self._over:
+                self.trigger("offset", seq)
+            self._over = over
+
+    def trigger(self, reason="manual", seq=None):
+        """
+        Mulai dump sekitar frame `seq` (default: frame terakhir).
+        Returns: folder event, atau None kalau dump lain masih jalan.
+        """
+        with self._cond:
+            if self._dump is not None and self._dump.is_alive():
+                self.skipped += 1
+                return None
+            seq = seq or self.head
+            slot = (seq - 1) % self.slots
+            frame_id = int(self.meta[slot]["frame_id"])
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            folder = os.path.join(self.out_dir, f"{stamp}_{reason}_{frame_id}")
+            first = max(seq - self.pre_frames, 1)
+            event = {"folder": folder, "reason": reason, "frame_id": frame_id,
+                     "frames": 0, "lost": 0, "done": False}
+            self.events.append(event)
+            self._dump = threading.Thread(
+                target=self._run_dump, args=(event, first, seq + self.post_frames),
+                daemon=True, name="blackbox-dump")
+            self._dump.start()
+        return folder
+
+    # ---------- dump ----------
+
+    def _wait_for(self, seq):
+        """Tunggu frame seq masuk + (kalau bisa) telemetry-nya; False kalau berhenti"""
+        with self._cond:
+            while not self._closed:
+                head = self.head
+                if head >= seq and (self._observed >= seq or head >= seq + _OBSERVE_LAG):
+                    return True
+                if not self._cond.wait(2.0):
+                    # kamera berhenti: tulis yang sudah ada saja
+                    return self.head >= seq
+            return self.head >= seq
+
+    def _run_dump(self, event, first, last):
+        self._write_event(event, first, last, follow=True)
+
+    def _write_event(self, event, first, last, follow=False):
+        writer = CaptureWriter(event["folder"], self.frame_shape, "raw", fields=EVENT_FIELDS, meta={
+            "reason": event["reason"], "event_frame_id": event["frame_id"],
+        })
+        for seq in range(first, last + 1):
+            if follow and not self._wait_for(seq):
+                break
+            slot = (seq - 1) % self.slots
+            rec = self.meta[slot].copy()
+            data = self.frames[slot].tobytes()
+            # slot ditimpa pipeline sebelum / selagi di-copy → frame hilang
+            if rec["seq"] != seq or self.meta[slot]["seq"] != seq:
+                event["lost"] += 1
+                continue
+            arah = ARAH[rec["arah"]] if rec["arah"] >= 0 else None
+            writer.append(data, int(rec["frame_id"]), int(rec["t_ns"]), wall_time=float(rec["wall_time"]),
+                          lux=float(rec["lux"]),
+                          values=[rec["gamma"], rec["brightness"], rec["offset"], arah])
+            event["frames"] += 1
+        writer.close()
+        self.lost += event["lost"]
+        event["done"] = True
+        return event
+
+    def dump_all(self, reason="recover"):
+        """Tulis semua slot valid (urut seq), untuk ring yang ditinggal proses crash"""
+        valid = np.sort(self.meta["seq"][self.meta["seq"] > 0])
+        if len(valid) == 0:
+            return None
+        last = int(valid[-1])
+        slot = (last - 1) % self.slots
+        event = {"folder": os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{reason}"),
+                 "reason": reason, "frame_id": int(self.meta[slot]["frame_id"]),
+                 "frames": 0, "lost": 0, "done": False}
+        self.events.append(event)
+        event = self._write_event(event, int(valid[0]), last)
+        # seq yang tidak ada di ring (slot kosong) bukan frame hilang
+        event["lost"] -= (last - int(valid[0]) + 1) - len(valid)
+        return event
+
+    def stats(self):
+        return {
+            "slots": self.slots,
+            "frames": self.head,
+            "dumping": self._dump is not None and self._dump.is_alive(),
+            "events": [dict(e) for e in self.events[-10:]],
+            "lost": self.lost,
+            "skipped": self.skipped,
+        }
+
+    def close(self, wait=True):
+        """Tunggu dump yang sedang jalan (post window dipotong), lalu flush ring"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait and self._dump is not None:
+            self._dump.join()
+        self._mm.flush()
+
+
+# ===================== CLI / BENCHMARK =====================
+
+if __name__ == "__main__":
+    import shutil
+
+    import cv2
+
+    from capture_file import CaptureReader
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "dump":
+        path = sys.argv[2] if len(sys.argv) > 2 else default_ring_path()
+        box = BlackBox.attach(path, out_dir=sys.argv[3] if len(sys.argv) > 3 else "blackbox")
+        event = box.dump_all()
+        if event is None:
+            print(f"{path}: ring kosong")
+        else:
+            print(f"{event['frames']} frame → {event['folder']}")
+        sys.exit(0)
+
+    # frame asli (rekaman jalan) kalau ada, synthetic kalau tidak
+    cap = cv2.VideoCapture(sys.argv[1] if len(sys.argv) > 1 else "video 3 november.mp4")
+    inputs = []
+    while len(inputs) < 60:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        inputs.append(cv2.resize(frame, (640, 360)))
+    cap.release()
+    if not inputs:
+        from capture_ring import SyntheticSource
+        source = SyntheticSource(640, 360, fps=0)
+        inputs = [cv2.cvtColor(source.capture_array(), cv2.COLOR_RGB2BGR) for _ in range(60)]
+    out_dir = tempfile.mkdtemp()
+    ring_path = os.path.join(os.path.dirname(default_ring_path()), f"blackbox-bench-{os.getpid()}.ring")
+    n = 600
+
+    writer = cv2.VideoWriter(os.path.join(out_dir, "a.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 30, (640, 360))
+    t0 = time.perf_counter()
+    for i in range(n):
+        writer.write(inputs[i % len(inputs)])
+    ms_video = (time.perf_counter() - t0) / n * 1000
+    writer.release()
+
+    box = BlackBox(seconds=10, fps=30, pre_seconds=5, post_seconds=3, lost_frames=15,
+                   out_dir=out_dir, path=ring_path)
+    waktu = []
+    for i in range(1, n + 1):
+        t0 = time.perf_counter()
+        box.push(inputs[i % len(inputs)], i)
+        # garis hilang mulai frame 400 → trigger "lost" di frame 414
+        box.observe(i, {"lux": 300.0, "gamma": 1.1, "brightness": 90.0,
+                        "offset": 0, "arah": "TENGAH" if i < 400 else "N/A"})
+        if i > box.slots:
+            # putaran pertama ring kena page fault, yang diukur steady state
+            waktu.append((time.perf_counter() - t0) * 1000)
+        time.sleep(max(1 / 30 - (time.perf_counter() - t0), 0))
+    box.close()
+    os.remove(ring_path)
+    waktu = np.array(waktu)
+
+    event = box.events[0]
+    reader = CaptureReader(event["folder"])
+    log = reader.log
+    sama = all(np.array_equal(reader.image(k), inputs[int(fid) % len(inputs)])
+               for k, fid in enumerate(log["frame_id"]))
+
+    print(f"{n} frame 640x360, ring {box.slots} slot ({box.frames.nbytes / 1e6:.0f} MB di {box.path})")
+    print(f"  VideoWriter.write : {ms_video:.2f} ms/frame")
+    print(f"  BlackBox.push     : {waktu.mean():.3f} ms/frame (p99 {np.percentile(waktu, 99):.3f})")
+    print(f"  event '{event['reason']}' di frame {event['frame_id']}: {event['frames']} frame "
+          f"(frame_id {log['frame_id'][0]}..{log['frame_id'][-1]}), lost {event['lost']}, "
+          f"isi frame {'sama' if sama else 'BEDA'}")
+    del log, reader
+    shutil.rmtree(out_dir)
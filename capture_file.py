@@ -0,0 +1,429 @@
+"""
+Rekaman capture mentah + replay deterministik
+=============================================
+
+Bahan offline kita cuma mp4 lossy (`video 3 november.mp4`) tanpa lux,
+jadi core_vision_video.py terpaksa pakai lux palsu `brightness * 10.0`.
+Di sini satu rekaman = satu folder:
+    frames.bin  payload frame berurutan (BGR mentah, atau PNG lossless)
+    meta.tlog   satu record per frame (telemetry_log.py): frame_id,
+                t_ns (SensorTimestamp), wall_time, lux, lux_stale,
+                exposure_us, analogue_gain, colour_temp, data_offset,
+                data_size (+ kolom tambahan, mis. telemetry black box)
+Header meta.tlog menyimpan shape, codec dan properti kamera. Dump
+blackbox.py juga pakai format ini, jadi bisa langsung di-replay.
+
+Cara pakai:
+    # rekam di Pi (kamera + TSL2591 sama dengan stream server)
+    python capture_file.py record capture/jalan1 60 [--codec png]
+
+    # replay seperti kamera (kecepatan asli, speed=0 = secepatnya)
+    source = ReplaySource("capture/jalan1", speed=1.0)
+    detector = LaneDetector(source=source, lux_sampler=source.lux_sampler)
+
+    # replay deterministik: tiap frame diproses, lux persis per frame
+    for rec, views, offset, arah in replay(detector, "capture/jalan1"):
+        ...
+
+    python capture_file.py info capture/jalan1
+    python capture_file.py replay capture/jalan1     # 2x replay, hasil harus identik
+    python capture_file.py                           # benchmark raw vs png
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from lux_sampler import LuxReading
+from telemetry_log import TelemetryLog, read_header, read_log
+
+CODECS = ("raw", "png")
+
+FRAME_FIELDS = [
+    ("wall_time", "f8"), ("lux", "f4"), ("lux_stale", "u1"),
+    ("exposure_us", "u4"), ("analogue_gain", "f4"), ("colour_temp", "u2"),
+    ("data_offset", "u8"), ("data_size", "u4"),
+]
+
+
+class CaptureWriter:
+    """Tulis satu folder rekaman. Tidak thread-safe (pakai Recorder.add_capture untuk write-behind)"""
+
+    def __init__(self, folder, frame_shape, codec="raw", camera=None, fields=(), meta=None):
+        if codec not in CODECS:
+            raise ValueError(f"codec {codec!r} tidak dikenal, pilih salah satu {CODECS}")
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.codec = codec
+        header = {"shape": list(frame_shape), "codec": codec, "camera": camera or {}}
+        header.update(meta or {})
+        self.log = TelemetryLog(os.path.join(folder, "meta.tlog"), FRAME_FIELDS + list(fields), header)
+        self._data = open(os.path.join(folder, "frames.bin"), "wb")
+        self._offset = 0
+        self.frames = 0
+
+    def encode(self, image):
+        if self.codec == "png":
+            # kompresi 1: lossless, paling ringan
+            ok, buf = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            if not ok:
+                raise ValueError(f"encode PNG gagal untuk frame {image.shape} {image.dtype}")
+            return buf.tobytes()
+        return np.ascontiguousarray(image).tobytes()
+
+    def append(self, payload, frame_id, t_ns, wall_time=None, lux=None, lux_stale=False,
+               metadata=None, values=()):
+        """
+        Payload hasil encode() + record meta. Record di-pack dulu (nilai rusak
+        gagal di sini, sebelum apa pun ditulis), lalu data, baru record-nya.
+        """
+        metadata = metadata or {}
+        record = self.log.pack([
+            wall_time if wall_time is not None else time.time(), lux, int(bool(lux_stale)),
+            metadata.get("ExposureTime", 0), metadata.get("AnalogueGain"),
+            metadata.get("ColourTemperature", 0), self._offset, len(payload),
+        ] + list(values), frame_id=frame_id, t_ns=t_ns)
+        self._data.write(payload)
+        self.log.write(record)
+        self._offset += len(payload)
+        self.frames += 1
+
+    def write(self, image, frame_id, t_ns, **record):
+        self.append(self.encode(image), frame_id, t_ns, **record)
+
+    def flush(self, sync=False):
+        self._data.flush()
+        if sync:
+            os.fsync(self._data.fileno())
+        self.log.flush(sync)
+
+    def close(self):
+        self.flush(sync=True)
+        self._data.close()
+        self.log.close()
+
+
+class CaptureReader:
+    """
+    Baca folder rekaman. image(i) untuk akses acak; read() / get() / set()
+    meniru cv2.VideoCapture supaya player video lama bisa langsung pakai.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        tlog = os.path.join(folder, "meta.tlog")
+        self.header = read_header(tlog)
+        self.log = read_log(tlog, self.header)
+        meta = self.header["meta"]
+        self.shape = tuple(meta["shape"])
+        self.codec = meta.get("codec", "raw")
+        self.camera = meta.get("camera", {})
+
+        data_path = os.path.join(folder, "frames.bin")
+        size = os.path.getsize(data_path)
+        self._data = np.memmap(data_path, np.uint8, "r") if size else np.zeros(0, np.uint8)
+        # record yang datanya belum sempat ditulis (crash) diabaikan
+        end = self.log["data_offset"].astype(np.int64) + self.log["data_size"]
+        self.count = int(np.searchsorted(end, size, side="right"))
+        self.pos = 0
+        self.current = -1
+
+    def __len__(self):
+        return self.count
+
+    def image(self, i):
+        """Frame ke-i (BGR). Codec raw: view read-only ke file, tanpa copy"""
+        rec = self.log[i]
+        start = int(rec["data_offset"])
+        payload = self._data[start:start + int(rec["data_size"])]
+        if self.codec == "png":
+            return cv2.imdecode(payload, cv2.IMREAD_UNCHANGED)
+        return payload.reshape(self.shape)
+
+    def lux_at(self, i):
+        """(lux, stale) frame ke-i; NaN (tidak tercatat) dianggap stale"""
+        lux = float(self.log["lux"][i])
+        if np.isnan(lux):
+            return 0.0, True
+        return lux, bool(self.log["lux_stale"][i])
+
+    @property
+    def fps(self):
+        if self.count < 2:
+            return 30.0
+        dt = np.median(np.diff(self.log["t_ns"][:self.count].astype(np.int64)))
+        return 1e9 / dt if dt > 0 else 30.0
+
+    # ---------- meniru cv2.VideoCapture ----------
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.pos >= self.count:
+            return False, None
+        self.current = self.pos
+        self.pos += 1
+        return True, np.array(self.image(self.current))
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.count
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.pos
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.pos = int(np.clip(value, 0, self.count))
+            return True
+        return False
+
+    @property
+    def lux(self):
+        """Lux frame terakhir dari read() (None kalau tidak tercatat)"""
+        if self.current < 0 or np.isnan(self.log["lux"][self.current]):
+            return None
+        return float(self.log["lux"][self.current])
+
+    def release(self):
+        self._data = np.zeros(0, np.uint8)
+        self.count = 0
+
+
+class ReplayLux:
+    """Pengganti LuxSampler: lux rekaman frame yang sedang di-replay"""
+
+    def __init__(self):
+        self._latest = LuxReading(0.0, 0.0, True)
+
+    def set(self, lux, stale=False):
+        self._latest = LuxReading(lux, time.time(), stale)
+
+    def read(self):
+        return self._latest
+
+    @property
+    def lux(self):
+        return self._latest.lux
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+
+class ReplaySource:
+    """
+    Pengganti Picamera2 dari folder rekaman (untuk CaptureRing / LaneDetector).
+    speed=1.0: tempo asli dari t_ns, 2.0 = dua kali lebih cepat, 0 = secepatnya.
+    capture_array() RGB seperti Picamera2; lux frame itu masuk ke self.lux_sampler.
+    """
+
+    def __init__(self, folder, speed=1.0, loop=False):
+        self.reader = CaptureReader(folder)
+        self.speed = speed
+        self.loop = loop
+        self.lux_sampler = ReplayLux()
+        self.index = 0
+        self._start = None
+        self._metadata = {}
+
+    def capture_array(self):
+        if self.index >= len(self.reader):
+            if not self.loop or len(self.reader) == 0:
+                raise EOFError("rekaman habis")
+            self.index = 0
+            self._start = None
+        i = self.index
+        rec = self.reader.log[i]
+        if self.speed:
+            t_ns = int(rec["t_ns"])
+            if self._start is None:
+                self._start = (time.perf_counter(), t_ns)
+            target = self._start[0] + (t_ns - self._start[1]) / 1e9 / self.speed
+            delay = target - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        image = cv2.cvtColor(self.reader.image(i), cv2.COLOR_BGR2RGB)
+        self.lux_sampler.set(*self.reader.lux_at(i))
+        self._metadata = {
+            "SensorTimestamp": int(rec["t_ns"]),
+            "ExposureTime": int(rec["exposure_us"]),
+            "AnalogueGain": float(rec["analogue_gain"]),
+            "ColourTemperature": int(rec["colour_temp"]),
+        }
+        self.index = i + 1
+        return image
+
+    def capture_metadata(self):
+        return self._metadata
+
+
+def replay(detector, source, variants=()):
+    """
+    Deteksi tiap frame rekaman berurutan (tanpa CaptureRing, tanpa drop),
+    lux persis dari rekaman. Yields: (record meta, views, offset, arah).
+    """
+    reader = source if isinstance(source, CaptureReader) else CaptureReader(source)
+    lux = ReplayLux()
+    asli = detector.lux_sampler
+    detector.lux_sampler = lux
+    try:
+        for i in range(len(reader)):
+            lux.set(*reader.lux_at(i))
+            views, offset, arah = detector.detect_lane(reader.image(i), variants)
+            yield reader.log[i], views, offset, arah
+    finally:
+        detector.lux_sampler = asli
+
+
+def record_shared(pool, handles, folder, frame_shape, codec="raw", camera=None):
+    """
+    Consumer process untuk shm_frames.SharedFrameSink: frame dibaca langsung
+    dari slot shared memory (tanpa pickle), ditulis ke folder rekaman.
+    Item queue: (FrameHandle, {t_ns, lux, lux_stale, metadata}), None = selesai.
+    """
+    writer = CaptureWriter(folder, frame_shape, codec, camera)
+    last_sync = time.monotonic()
+    try:
+        while True:
+            item = handles.get()
+            if item is None:
+                break
+            handle, record = item
+            try:
+                writer.write(pool.view(handle), handle.frame_id, record.get("t_ns", 0),
+                             wall_time=handle.timestamp, lux=record.get("lux"),
+                             lux_stale=record.get("lux_stale", False),
+                             metadata=record.get("metadata"))
+            except Exception as e:
+                print(f"[REC] frame {handle.frame_id} gagal ditulis: {e}")
+            finally:
+                pool.release(handle)
+            if time.monotonic() - last_sync >= 1.0:
+                writer.flush(sync=True)
+                last_sync = time.monotonic()
+    finally:
+        writer.close()
+        pool.close()
+
+
+# ===================== CLI / BENCHMARK =====================
+
+def _record(folder, seconds, codec):
+    from lane_detector import LaneDetector
+    from recorder import Recorder
+
+    # hardware (Picamera2 + TSL2591, atau synthetic) disiapkan sama seperti stream server
+    detector = LaneDetector()
+    picam2 = getattr(detector, "picam2", None)
+    camera = {"size": [detector.frame_width, detector.frame_height], "format": "BGR"}
+    if picam2 is not None:
+        camera["model"] = picam2.camera_properties.get("Model")
+    rec = Recorder()
+    rec.add_capture("capture", folder, (detector.frame_height, detector.frame_width, 3),
+                    codec=codec, camera=camera)
+    print(f"Rekam {seconds} detik ke {folder} (codec {codec}), Ctrl+C untuk berhenti")
+    start = time.time()
+    try:
+        while time.time() - start < seconds:
+            captured = detector.capture.read()
+            if captured is None:
+                continue
+            lux = detector.lux_sampler.read()
+            rec.capture("capture", captured.image, frame_id=captured.frame_id,
+                        t_ns=captured.sensor_ts, wall_time=captured.wall_time,
+                        lux=lux.lux, lux_stale=lux.stale, metadata=captured.metadata)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rec.close()
+        detector.capture.stop()
+        detector.lux_sampler.stop()
+        if picam2 is not None:
+            picam2.stop()
+
+
+def _replay_check(folder):
+    from lane_detector import LaneDetector
+
+    hasil = []
+    for _ in range(2):
+        # tanpa capture thread, frame dari rekaman
+        detector = LaneDetector(source=False, tracking=True)
+        detector.lux_sampler.stop()
+        t0 = time.perf_counter()
+        out = []
+        for rec, _, offset, arah in replay(detector, folder):
+            out.append((int(rec["frame_id"]), offset, arah, detector.telemetry["gamma"]))
+        hasil.append((out, time.perf_counter() - t0))
+    (a, t_a), (b, t_b) = hasil
+    print(f"{len(a)} frame, replay {len(a) / t_a:.0f} / {len(b) / t_b:.0f} fps, "
+          f"hasil {'identik' if a == b else 'BEDA'}")
+    return a == b
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "record":
+        seconds = float(sys.argv[3]) if len(sys.argv) > 3 and not sys.argv[3].startswith("--") else 60
+        codec = sys.argv[sys.argv.index("--codec") + 1] if "--codec" in sys.argv else "raw"
+        _record(sys.argv[2], seconds, codec)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "info":
+        reader = CaptureReader(sys.argv[2])
+        lux = reader.log["lux"][:len(reader)]
+        print(f"{sys.argv[2]}: {len(reader)} frame {reader.shape} codec {reader.codec}, "
+              f"{reader.fps:.1f} fps, kamera {reader.camera}")
+        if len(reader):
+            print(f"  lux {np.nanmin(lux):.1f}..{np.nanmax(lux):.1f}, "
+                  f"data {os.path.getsize(os.path.join(sys.argv[2], 'frames.bin')) / len(reader) / 1e3:.0f} KB/frame")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "replay":
+        _replay_check(sys.argv[2])
+    else:
+        import shutil
+        import tempfile
+
+        # Rekaman buatan dari mp4 (lux dari brightness, cuma untuk mengisi kolom)
+        video = sys.argv[1] if len(sys.argv) > 1 else "video 3 november.mp4"
+        cap = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < 300:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.resize(frame, (640, 360)))
+        cap.release()
+        if not frames:
+            from capture_ring import SyntheticSource
+            source = SyntheticSource(640, 360, fps=0)
+            frames = [cv2.cvtColor(source.capture_array(), cv2.COLOR_RGB2BGR) for _ in range(300)]
+
+        out_dir = tempfile.mkdtemp()
+        t_ns = time.monotonic_ns()
+        for codec in CODECS:
+            folder = os.path.join(out_dir, codec)
+            writer = CaptureWriter(folder, frames[0].shape, codec=codec)
+            t0 = time.perf_counter()
+            for i, frame in enumerate(frames):
+                writer.write(frame, i + 1, t_ns + i * 33_333_333,
+                             lux=float(frame.mean()) * 10.0, metadata={"ExposureTime": 10000})
+            writer.close()
+            ms_write = (time.perf_counter() - t0) / len(frames) * 1000
+
+            reader = CaptureReader(folder)
+            t0 = time.perf_counter()
+            sama = all(np.array_equal(reader.image(i), frame) for i, frame in enumerate(frames))
+            ms_read = (time.perf_counter() - t0) / len(frames) * 1000
+            size = os.path.getsize(os.path.join(folder, "frames.bin")) / len(frames) / 1e3
+            print(f"  {codec:<4}: tulis {ms_write:.2f} ms/frame, baca {ms_read:.2f} ms/frame, "
+                  f"{size:.0f} KB/frame, lossless {'ya' if sama else 'TIDAK'}")
+
+        print("replay deterministik (LaneDetector + tracking, 2x):")
+        _replay_check(os.path.join(out_dir, "raw"))
+        shutil.rmtree(out_dir)
@@ -0,0 +1,228 @@
+"""
+Capture thread + ring buffer untuk Picamera2
+============================================
+
+Dulu `picam2.capture_array()` dipanggil di dalam loop proses, jadi capture
+dan proses jalan bergantian dan frame yang lambat bikin semua frame
+sesudahnya ikut basi. Di sini capture jalan di thread sendiri dan menulis
+ke ring buffer kecil yang dialokasi sekali; loop proses selalu dapat frame
+paling baru. Frame yang tidak sempat diambil dibuang ("drop old") dan
+dihitung.
+
+Cara pakai:
+    capture = CaptureRing(picam2).start()    # picam2 sudah configure + start
+    frame = capture.read()                   # CapturedFrame
+    frame.image                              # BGR, valid sampai read() berikutnya
+    capture.stats()                          # captured / delivered / dropped
+
+Tanpa kamera (test / laptop):
+    capture = CaptureRing(SyntheticSource(640, 360)).start()
+
+Demo consumer lambat:
+    python capture_ring.py
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# image: frame BGR di slot ring, frame_id: nomor urut capture (mulai 1),
+# sensor_ts: timestamp sensor (ns), wall_time: time.time() saat frame masuk ring,
+# metadata: dict metadata kamera frame ini (ExposureTime, AnalogueGain, ...)
+CapturedFrame = namedtuple("CapturedFrame", ["image", "frame_id", "sensor_ts", "wall_time", "metadata"],
+                           defaults=(None,))
+
+
+class SyntheticSource:
+    """
+    Pengganti Picamera2 untuk testing tanpa hardware.
+    Tiga garis putih yang bergeser pelan di atas aspal abu-abu,
+    output RGB seperti `capture_array()`, dibatasi ke `fps`.
+    """
+    def __init__(self, width=640, height=360, fps=30.0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.count = 0
+        self._next = time.perf_counter()
+        self._background = np.full((height, width, 3), 70, np.uint8)
+
+    def capture_array(self):
+        if self.fps:
+            self._next += 1.0 / self.fps
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self._next = time.perf_counter()
+        self.count += 1
+
+        frame = self._background.copy()
+        w, h = self.width, self.height
+        geser = int(40 * np.sin(self.count / 30.0))
+        for x in (int(w * 0.2), w // 2, int(w * 0.8)):
+            cv2.line(frame, (x + geser, h), (w // 2 + (x - w // 2) // 3 + geser, int(h * 0.3)),
+                     (255, 255, 255), 8)
+        return frame
+
+    def capture_metadata(self):
+        return {"SensorTimestamp": time.monotonic_ns()}
+
+
+class CaptureRing:
+    """
+    Capture terus-menerus di daemon thread ke `slots` buffer yang dialokasi sekali.
+    - read() mengembalikan frame terbaru yang belum pernah diambil
+    - slot yang sedang dipegang consumer tidak pernah ditimpa, jadi
+      image valid sampai read() berikutnya (satu consumer per ring)
+    - frame yang tertimpa sebelum diambil dihitung di `dropped`
+    """
+    def __init__(self, source, slots=3, convert=cv2.COLOR_RGB2BGR):
+        if slots < 3:
+            raise ValueError("CaptureRing butuh minimal 3 slot (tulis, terbaru, dipegang)")
+        self.source = source
+        self.n_slots = slots
+        self.convert = convert
+        self._slots = None
+        self._meta = [None] * slots       # (frame_id, sensor_ts, wall_time, metadata) per slot
+
+        self._cond = threading.Condition()
+        self._latest = -1                 # slot frame terbaru
+        self._held = -1                   # slot yang sedang dipakai consumer
+        self._write = 0
+        self._frame_id = 0
+        self._delivered_id = 0
+
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _grab(self):
+        """Satu frame + timestamp sensor + metadata kamera dari source"""
+        if hasattr(self.source, "capture_request"):
+            # Picamera2: array dan metadata dari request yang sama
+            req = self.source.capture_request()
+            try:
+                image = req.make_array("main")
+                metadata = req.get_metadata()
+            finally:
+                req.release()
+            return image, metadata.get("SensorTimestamp", time.monotonic_ns()), metadata
+        image = self.source.capture_array()
+        metadata = {}
+        if hasattr(self.source, "capture_metadata"):
+            metadata = self.source.capture_metadata()
+        return image, metadata.get("SensorTimestamp", time.monotonic_ns()), metadata
+
+    def _next_slot(self):
+        """Slot berikutnya yang bukan frame terbaru dan bukan yang dipegang consumer"""
+        with self._cond:
+            for i in range(self.n_slots):
+                idx = (self._write + i) % self.n_slots
+                if idx != self._latest and idx != self._held:
+                    self._write = idx + 1
+                    return idx
+
+    def _run(self):
+        while self._running:
+            try:
+                image, sensor_ts, metadata = self._grab()
+            except EOFError:
+                # source habis (mis. ReplaySource): berhenti, read() → None
+                with self._cond:
+                    self._running = False
+                    self._cond.notify_all()
+                return
+            except Exception:
+                self.errors += 1
+                time.sleep(0.01)
+                continue
+
+            if self._slots is None:
+                shape = image.shape if self.convert is None else image.shape[:2] + (3,)
+                self._slots = [np.empty(shape, np.uint8) for _ in range(self.n_slots)]
+
+            idx = self._next_slot()
+            if self.convert is None:
+                np.copyto(self._slots[idx], image)
+            else:
+                cv2.cvtColor(image, self.convert, dst=self._slots[idx])
+
+            with self._cond:
+                self._frame_id += 1
+                self._meta[idx] = (self._frame_id, sensor_ts, time.time(), metadata)
+                self._latest = idx
+                self.captured += 1
+                self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Frame terbaru yang lebih baru dari read() sebelumnya (blocking sampai timeout).
+        Returns: CapturedFrame, atau None kalau timeout / sudah stop / source
+        habis (EOFError dari source).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._latest < 0 or self._meta[self._latest][0] <= self._delivered_id:
+                sisa = deadline - time.monotonic()
+                if sisa <= 0 or not self._running:
+                    return None
+                self._cond.wait(sisa)
+
+            idx = self._latest
+            frame_id, sensor_ts, wall_time, metadata = self._meta[idx]
+            self.dropped += frame_id - self._delivered_id - 1
+            self._delivered_id = frame_id
+            self._held = idx
+            self.delivered += 1
+        return CapturedFrame(self._slots[idx], frame_id, sensor_ts, wall_time, metadata)
+
+    def stats(self):
+        return {
+            "captured": self.captured,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+# ===================== DEMO =====================
+
+if __name__ == "__main__":
+    # Consumer 3x lebih lambat dari kamera: yang diproses selalu frame terbaru
+    capture = CaptureRing(SyntheticSource(640, 360, fps=30.0)).start()
+    umur = []
+    t_end = time.time() + 3.0
+    while time.time() < t_end:
+        frame = capture.read()
+        if frame is None:
+            break
+        umur.append((time.time() - frame.wall_time) * 1000)
+        time.sleep(0.1)
+    capture.stop()
+
+    s = capture.stats()
+    print(f"captured {s['captured']}, delivered {s['delivered']}, dropped {s['dropped']}")
+    print(f"umur frame saat diambil: median {np.median(umur):.1f} ms, max {max(umur):.1f} ms")
@@ -1,10 +1,66 @@
 import cv2
 import numpy as np
+import json
+import signal
+import socket
+import sys
 import time
 
 from picamera2 import Picamera2
 import board, busio, adafruit_tsl2591
 
+import gamma_lut
+from bev_geometry import BevGeometry
+from lux_sampler import LuxSampler
+from capture_ring import CaptureRing
+
+# ===================== 0. MODE =====================
+# python core_vision.py                         → 3 window imshow seperti biasa
+# python core_vision.py --headless              → tanpa anotasi / imshow / waitKey,
+#                                                 offset dikirim ke sink, Ctrl+C untuk berhenti
+# python core_vision.py --headless --sink 127.0.0.1:5600 --stats-every 5
+#   sink: HOST:PORT (UDP, satu JSON per frame) atau "-" (stdout, JSON lines)
+def _arg(name, default):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+HEADLESS = "--headless" in sys.argv
+SINK = _arg("--sink", "127.0.0.1:5600")
+STATS_EVERY = float(_arg("--stats-every", "5"))
+
+
+class OffsetSink:
+    """Kirim hasil per frame ke proses lain di Pi (kontrol motor, logger)"""
+
+    def __init__(self, target):
+        self.sock = None
+        self.addr = None
+        if target != "-":
+            host, port = target.rsplit(":", 1)
+            self.addr = (host, int(port))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+        self.dropped = 0
+
+    def send(self, data):
+        line = json.dumps(data, separators=(",", ":"))
+        if self.sock is None:
+            print(line, flush=True)
+            return
+        try:
+            self.sock.sendto(line.encode(), self.addr)
+        except (BlockingIOError, OSError):
+            # UDP non-blocking: kalau buffer penuh / penerima belum ada, frame ini di-skip
+            self.dropped += 1
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+
 # ===================== 1. SETUP SENSOR TSL2591 =====================
 i2c = busio.I2C(board.SCL, board.SDA)
 tsl = adafruit_tsl2591.TSL2591(i2c)
@@ -12,6 +68,9 @@ tsl = adafruit_tsl2591.TSL2591(i2c)
 tsl.integration_time = adafruit_tsl2591.INTEGRATIONTIME_300MS
 tsl.gain = adafruit_tsl2591.GAIN_MED
 
+# baca lux di thread sendiri supaya main loop tidak nunggu I2C 300 ms
+lux_sampler = LuxSampler(tsl).start()
+
 # ===================== 2. SETUP KAMERA =====================
 picam2 = Picamera2()
 frame_width = 640
@@ -22,6 +81,9 @@ picam2.configure(config)
 picam2.start()
 time.sleep(0.3)
 
+# capture di thread sendiri, main loop selalu dapat frame terbaru (BGR)
+capture = CaptureRing(picam2).start()
+
 # ===================== 3. FUZZY GAMMA FUNCTIONS =====================
 def fuzzy_gamma(lux, brightness):
     # versi dari kode #3/#5
@@ -42,9 +104,8 @@ def measure_brightness(frame_bgr):
     return float(np.mean(gray))
 
 def apply_gamma(frame_bgr, gamma):
-    inv = 1.0 / gamma
-    lut = np.array([((i / 255.0) ** inv) * 255 for i in np.arange(256)]).astype("uint8")
-    return cv2.LUT(frame_bgr, lut)
+    # LUT diambil dari bank (precomputed), gamma ~1.0 di-skip
+    return gamma_lut.apply_gamma(frame_bgr, gamma)
 
 # ===================== 4. BEV TRANSFORM (SAMA SEPERTI KODE BERHASIL) =====================
 src_points = np.float32([
@@ -64,20 +125,47 @@ dst_points = np.float32([
 # pakai nama lain supaya tidak bentrok
 M_bev = cv2.getPerspectiveTransform(src_points, dst_points)
 
+# map remap fixed-point + ROI dihitung sekali (di-cache ke disk)
+geometry = BevGeometry(frame_width, frame_height, src_points, dst_points)
+polygon = geometry.polygon_bev
+polygon_normal = geometry.polygon_normal
+
 lower_white = np.array([0, 0, 200])
 upper_white = np.array([180, 70, 255])
 kernel = np.ones((5, 5), np.uint8)
 
-print("Kamera siap dengan Gamma+TSL! Tekan 'q' untuk keluar")
+if HEADLESS:
+    sink = OffsetSink(SINK)
+    print(f"Kamera siap (headless), offset ke {SINK}. Ctrl+C untuk keluar")
+else:
+    print("Kamera siap dengan Gamma+TSL! Tekan 'q' untuk keluar")
+
+# Statistik headless per interval: waktu proses + latency capture → sink
+stat_start = time.perf_counter()
+stat_proses = []
+stat_latency = []
+
+# Ctrl+C (atau SIGTERM dari systemd) → keluar loop lalu cleanup seperti 'q'
+running = True
+
+def _stop(signum, frame):
+    global running
+    running = False
+
+signal.signal(signal.SIGINT, _stop)
+signal.signal(signal.SIGTERM, _stop)
 
 # ===================== 5. MAIN LOOP =====================
-while True:
+while running:
     # ---- Ambil frame dari kamera ----
-    frame_rgb = picam2.capture_array()
-    frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+    captured = capture.read()
+    if captured is None:
+        continue
+    frame = captured.image
+    t0 = time.perf_counter()
 
     # ---- Baca lux & hitung gamma ----
-    lux = tsl.lux or 0.0
+    lux = lux_sampler.read().lux
     brightness = measure_brightness(frame)
     gamma = fuzzy_gamma(lux, brightness)
 
@@ -85,45 +173,29 @@ while True:
     corrected = apply_gamma(frame, gamma)
 
     # ================== BEV PATH ==================
-    frame_bird_eye = cv2.warpPerspective(corrected, M_bev, (frame_width, frame_height))
+    frame_bird_eye = geometry.warp(corrected)
 
     hsv = cv2.cvtColor(frame_bird_eye, cv2.COLOR_BGR2HSV)
     mask = cv2.inRange(hsv, lower_white, upper_white)
 
     height, width = mask.shape
-
-    polygon = np.array([[
-        (0, height),
-        (width, height),
-        (width, 0),
-        (0, 0)
-    ]], np.int32)
-
-    roi = np.zeros_like(mask)
-    cv2.fillPoly(roi, [polygon], 255)
-    mask = cv2.bitwise_and(mask, roi)
+    # ROI BEV = seluruh frame, bitwise_and tidak perlu
 
     # ================== NORMAL PATH (TANPA BEV) ==================
-    hsv_normal = cv2.cvtColor(corrected, cv2.COLOR_BGR2HSV)
-    mask_normal = cv2.inRange(hsv_normal, lower_white, upper_white)
-
-    roi_normal = np.zeros_like(mask_normal)
-    polygon_normal = np.array([[
-        (0, height),
-        (width, height),
-        (int(width * 0.8), int(height * 0.3)),
-        (int(width * 0.2), int(height * 0.3))
-    ]], np.int32)
-    cv2.fillPoly(roi_normal, [polygon_normal], 255)
-    mask_normal = cv2.bitwise_and(mask_normal, roi_normal)
-    hasil_normal = corrected.copy()
+    # cuma untuk ditampilkan, headless tidak butuh
+    if not HEADLESS:
+        hsv_normal = cv2.cvtColor(corrected, cv2.COLOR_BGR2HSV)
+        mask_normal = cv2.inRange(hsv_normal, lower_white, upper_white)
+        mask_normal = geometry.apply_roi_normal(mask_normal, dst=mask_normal)
+        hasil_normal = corrected.copy()
 
     # ================== DETEKSI KONTOUR (BEV) ==================
     mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
     contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
 
-    hasil = frame_bird_eye.copy()
-    cv2.polylines(hasil, [polygon], True, (255, 0, 0), 3)
+    if not HEADLESS:
+        hasil = frame_bird_eye.copy()
+        cv2.polylines(hasil, [polygon], True, (255, 0, 0), 3)
 
     kiri_contours = []
     tengah_contours = []
@@ -143,7 +215,8 @@ while True:
                 else:
                     kanan_contours.append(contour)
 
-            cv2.drawContours(hasil, [contour], -1, (0, 255, 0), -1)
+            if not HEADLESS:
+                cv2.drawContours(hasil, [contour], -1, (0, 255, 0), -1)
 
     def hitung_posisi(contours_list):
         if len(contours_list) > 0:
@@ -162,9 +235,6 @@ while True:
 
     # ================== HITUNG OFFSET & ARAH ==================
     center_frame = width // 2
-    cv2.line(hasil, (center_frame, 0), (center_frame, height), (0, 255, 255), 2)
-    cv2.putText(hasil, "Posisi Kamera", (center_frame - 60, 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
 
     pos_referensi = None
     if pos_tengah is not None:
@@ -172,6 +242,9 @@ while True:
     elif pos_kiri is not None and pos_kanan is not None:
         pos_referensi = (pos_kiri + pos_kanan) // 2
 
+    offset = 0
+    arah = "N/A"
+    warna_offset = (0, 0, 255)    # Merah
     if pos_referensi is not None:
         offset = center_frame - pos_referensi
 
@@ -185,6 +258,39 @@ while True:
             arah = "TENGAH"
             warna_offset = (0, 255, 0)    # Hijau
 
+    # ================== HEADLESS: KIRIM KE SINK ==================
+    if HEADLESS:
+        now = time.time()
+        sink.send({
+            "frame_id": captured.frame_id,
+            "ts": round(now, 4),
+            "offset": int(offset),
+            "arah": arah,
+            "gamma": round(gamma, 2),
+            "lux": round(lux, 1),
+        })
+        stat_proses.append((time.perf_counter() - t0) * 1000)
+        stat_latency.append((now - captured.wall_time) * 1000)
+
+        elapsed = time.perf_counter() - stat_start
+        if elapsed >= STATS_EVERY:
+            proses = np.array(stat_proses)
+            cap_stats = capture.stats()
+            print(f"[headless] {len(proses) / elapsed:.1f} fps | proses {proses.mean():.2f} ms "
+                  f"(p95 {np.percentile(proses, 95):.2f}, ceiling {1000 / proses.mean():.0f} fps) | "
+                  f"capture→sink {np.mean(stat_latency):.1f} ms | "
+                  f"drop kamera {cap_stats['dropped']}, sink {sink.dropped}", file=sys.stderr)
+            stat_start = time.perf_counter()
+            stat_proses = []
+            stat_latency = []
+        continue
+
+    # ================== ANOTASI ==================
+    cv2.line(hasil, (center_frame, 0), (center_frame, height), (0, 255, 255), 2)
+    cv2.putText(hasil, "Posisi Kamera", (center_frame - 60, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+
+    if pos_referensi is not None:
         offset_text = f"Offset: {abs(offset)}px ke {arah}"
         cv2.putText(hasil, offset_text, (10, height - 20),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna_offset, 2)
@@ -212,5 +318,10 @@ while True:
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
+lux_sampler.stop()
+capture.stop()
 picam2.stop()
-cv2.destroyAllWindows()
+if HEADLESS:
+    sink.close()
+else:
+    cv2.destroyAllWindows()
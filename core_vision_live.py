@@ -8,6 +8,12 @@ from PIL import Image, ImageTk
 from picamera2 import Picamera2
 import board, busio, adafruit_tsl2591
 
+import gamma_lut
+from bev_geometry import BevGeometry
+from lane_localizer import make_localizer, hitung_offset
+from lux_sampler import LuxSampler
+from capture_ring import CaptureRing
+
 
 class LaneDetectionLiveApp:
     def __init__(self, root):
@@ -24,6 +30,7 @@ class LaneDetectionLiveApp:
         self.tsl = adafruit_tsl2591.TSL2591(i2c)
         self.tsl.integration_time = adafruit_tsl2591.INTEGRATIONTIME_300MS
         self.tsl.gain = adafruit_tsl2591.GAIN_MED
+        self.lux_sampler = LuxSampler(self.tsl).start()
 
         # ======== SETUP KAMERA PICAMERA2 ========
         self.picam2 = Picamera2()
@@ -34,6 +41,9 @@ class LaneDetectionLiveApp:
         self.picam2.start()
         time.sleep(0.3)
 
+        # capture di thread sendiri, update_frame selalu dapat frame terbaru (BGR)
+        self.capture = CaptureRing(self.picam2).start()
+
         # ======== BEV TRANSFORM (SAMA DENGAN KODE KAMU) ========
         self.src_points = np.float32([
             [0, self.frame_height],
@@ -50,11 +60,22 @@ class LaneDetectionLiveApp:
         ])
 
         self.M_bev = cv2.getPerspectiveTransform(self.src_points, self.dst_points)
+        self.geometry = BevGeometry(
+            self.frame_width, self.frame_height,
+            self.src_points, self.dst_points
+        )
 
         self.lower_white = np.array([0, 0, 200], dtype=np.uint8)
         self.upper_white = np.array([180, 70, 255], dtype=np.uint8)
         self.kernel = np.ones((5, 5), np.uint8)
 
+        # threshold sebelum warp: yang di-warp ke BEV cuma mask 1 channel.
+        # Off: aplikasi ini selalu menampilkan gambar BEV beranotasi
+        self.mask_first = False
+
+        # backend pencari posisi garis: "contours" / "components"
+        self.localizer = make_localizer("contours")
+
         # ================== UI KONTROL ==================
         option_frame = ttk.Frame(root)
         option_frame.pack(pady=5)
@@ -142,154 +163,97 @@ class LaneDetectionLiveApp:
         return float(np.mean(gray))
 
     def apply_gamma(self, frame_bgr, gamma):
-        inv = 1.0 / gamma
-        lut = np.array(
-            [((i / 255.0) ** inv) * 255 for i in np.arange(256)],
-            dtype="uint8"
-        )
-        return cv2.LUT(frame_bgr, lut)
-
-    def hitung_posisi(self, contours_list):
-        if len(contours_list) == 0:
-            return None
-        total_cx = 0
-        count = 0
-        for cnt in contours_list:
-            M = cv2.moments(cnt)
-            if M["m00"] != 0:
-                total_cx += int(M["m10"] / M["m00"])
-                count += 1
-        if count == 0:
-            return None
-        return total_cx // count
+        # LUT diambil dari bank (precomputed), gamma ~1.0 di-skip
+        return gamma_lut.apply_gamma(frame_bgr, gamma)
 
     # ===================== DETEKSI LANE =====================
 
-    def detect_lane(self, frame_input, with_bev=True):
+    def detect_lane(self, frame_input, with_bev=True, annotate=True):
         """
         Mengadopsi logika dari kode CLI:
-        - Jika with_bev: pakai warpPerspective -> ROI penuh
+        - Jika with_bev: BEV -> ROI penuh. Dengan self.mask_first, threshold
+          di camera space (area trapesium saja) lalu cuma mask 1 channel
+          yang di-warp (nearest)
         - Jika Normal : langsung di frame corrected, ROI trapesium
+        annotate=False: frame BGR tidak di-warp dan tidak digambar (hasil None)
         Return: hasil(BGR), mask(gray), offset(int), arah(str)
         """
         if with_bev:
-            frame_processed = cv2.warpPerspective(
-                frame_input, self.M_bev,
-                (self.frame_width, self.frame_height)
-            )
             height, width = self.frame_height, self.frame_width
 
-            hsv = cv2.cvtColor(frame_processed, cv2.COLOR_BGR2HSV)
-            mask = cv2.inRange(hsv, self.lower_white, self.upper_white)
+            if self.mask_first:
+                hsv = cv2.cvtColor(self.geometry.crop(frame_input), cv2.COLOR_BGR2HSV)
+                mask_cam = cv2.inRange(hsv, self.lower_white, self.upper_white)
+                mask = self.geometry.warp(mask_cam, nearest=True, cropped=True)
+
+                # warp BGR cuma kalau gambar BEV beranotasi memang ditampilkan
+                frame_processed = self.geometry.warp(frame_input) if annotate else None
+            else:
+                frame_processed = self.geometry.warp(frame_input)
+                hsv = cv2.cvtColor(frame_processed, cv2.COLOR_BGR2HSV)
+                mask = cv2.inRange(hsv, self.lower_white, self.upper_white)
 
-            polygon = np.array([[
-                (0, height),
-                (width, height),
-                (width, 0),
-                (0, 0)
-            ]], np.int32)
+            # ROI BEV = seluruh frame, tidak perlu masking
+            polygon = self.geometry.polygon_bev
 
         else:
-            frame_processed = frame_input.copy()
             frame_processed = cv2.resize(
-                frame_processed, (self.frame_width, self.frame_height)
+                frame_input, (self.frame_width, self.frame_height)
             )
             height, width, _ = frame_processed.shape
 
             hsv = cv2.cvtColor(frame_processed, cv2.COLOR_BGR2HSV)
             mask = cv2.inRange(hsv, self.lower_white, self.upper_white)
 
-            polygon = np.array([[
-                (0, height),
-                (width, height),
-                (int(width * 0.8), int(height * 0.3)),
-                (int(width * 0.2), int(height * 0.3))
-            ]], np.int32)
+            polygon = self.geometry.polygon_normal
 
-        # ROI masking
-        roi = np.zeros_like(mask)
-        cv2.fillPoly(roi, [polygon], 255)
-        mask = cv2.bitwise_and(mask, roi)
+            # ROI masking (mask + bounding box precomputed)
+            mask = self.geometry.apply_roi_normal(mask, dst=mask)
 
         # Morphology
         mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
 
-        # Kontur
-        contours, _ = cv2.findContours(
-            mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
-        )
+        # Posisi garis (backend contours / components)
+        posisi, blobs = self.localizer.locate(mask)
 
-        hasil = frame_processed.copy()
-        cv2.polylines(hasil, [polygon], True, (255, 0, 0), 2)
-
-        kiri_contours = []
-        tengah_contours = []
-        kanan_contours = []
-
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 300:
-                M = cv2.moments(contour)
-                if M["m00"] != 0:
-                    cx = int(M["m10"] / M["m00"])
-                    if cx < width * 0.33:
-                        kiri_contours.append(contour)
-                    elif cx < width * 0.67:
-                        tengah_contours.append(contour)
-                    else:
-                        kanan_contours.append(contour)
-                cv2.drawContours(hasil, [contour], -1, (0, 255, 0), -1)
-
-        pos_kiri = self.hitung_posisi(kiri_contours)
-        pos_tengah = self.hitung_posisi(tengah_contours)
-        pos_kanan = self.hitung_posisi(kanan_contours)
+        hasil = None
+        if annotate:
+            # frame_processed sudah array baru (hasil warp / resize), boleh digambar langsung
+            hasil = frame_processed
+            cv2.polylines(hasil, [polygon], True, (255, 0, 0), 2)
+            self.localizer.draw(hasil, blobs)
 
         center_frame = width // 2
-        cv2.line(
-            hasil, (center_frame, 0),
-            (center_frame, height), (0, 255, 255), 2
-        )
-        cv2.putText(
-            hasil, "Posisi Kamera", (center_frame - 60, 30),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2
-        )
-
-        pos_referensi = None
-        if pos_tengah is not None:
-            pos_referensi = pos_tengah
-        elif pos_kiri is not None and pos_kanan is not None:
-            pos_referensi = (pos_kiri + pos_kanan) // 2
+        if annotate:
+            cv2.line(
+                hasil, (center_frame, 0),
+                (center_frame, height), (0, 255, 255), 2
+            )
+            cv2.putText(
+                hasil, "Posisi Kamera", (center_frame - 60, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2
+            )
 
-        offset = 0
-        arah = "N/A"
+        pos_referensi, offset, arah = hitung_offset(posisi, width)
 
         if pos_referensi is not None:
-            offset = center_frame - pos_referensi
-
-            if offset > 5:
-                arah = "KIRI"
-                warna_offset = (0, 165, 255)
-            elif offset < -5:
-                arah = "KANAN"
-                warna_offset = (0, 165, 255)
-            else:
-                arah = "TENGAH"
-                warna_offset = (0, 255, 0)
-
-            offset_text = f"Offset: {abs(offset)}px ke {arah}"
-            cv2.putText(
-                hasil, offset_text, (10, height - 20),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna_offset, 2
-            )
+            warna_offset = (0, 255, 0) if arah == "TENGAH" else (0, 165, 255)
 
-            if abs(offset) > 5:
-                arrow_start = (center_frame, height - 60)
-                arrow_end = (pos_referensi, height - 60)
-                cv2.arrowedLine(
-                    hasil, arrow_start, arrow_end,
-                    warna_offset, 3, tipLength=0.3
+            if annotate:
+                offset_text = f"Offset: {abs(offset)}px ke {arah}"
+                cv2.putText(
+                    hasil, offset_text, (10, height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna_offset, 2
                 )
-        else:
+
+                if abs(offset) > 5:
+                    arrow_start = (center_frame, height - 60)
+                    arrow_end = (pos_referensi, height - 60)
+                    cv2.arrowedLine(
+                        hasil, arrow_start, arrow_end,
+                        warna_offset, 3, tipLength=0.3
+                    )
+        elif annotate:
             cv2.putText(
                 hasil, "Offset: N/A", (10, height - 20),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2
@@ -300,8 +264,8 @@ class LaneDetectionLiveApp:
     # ===================== PIPELINE PER FRAME =====================
 
     def process_frame(self, frame_bgr):
-        # baca lux dari sensor
-        lux = self.tsl.lux or 0.0
+        # baca lux terakhir dari sampler (non-blocking)
+        lux = self.lux_sampler.read().lux
 
         # hitung brightness dan gamma
         brightness = self.measure_brightness(frame_bgr)
@@ -311,7 +275,12 @@ class LaneDetectionLiveApp:
         # mode view (BEV / Normal)
         with_bev = (self.view_mode.get() == "Bird Eye")
 
-        hasil, mask, offset, arah = self.detect_lane(corrected, with_bev=with_bev)
+        # mode "Mask Saja" tidak butuh gambar beranotasi
+        annotate = (self.display_option.get() != "Mask Saja")
+
+        hasil, mask, offset, arah = self.detect_lane(
+            corrected, with_bev=with_bev, annotate=annotate
+        )
 
         mode_txt = "BEV" if with_bev else "Normal"
         info_text = (
@@ -319,10 +288,11 @@ class LaneDetectionLiveApp:
             f"Gamma:{gamma:.2f} Off:{offset}px {arah}"
         )
 
-        cv2.putText(
-            hasil, info_text, (10, 25),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2
-        )
+        if hasil is not None:
+            cv2.putText(
+                hasil, info_text, (10, 25),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2
+            )
 
         return hasil, mask
 
@@ -334,9 +304,11 @@ class LaneDetectionLiveApp:
         # convert untuk Tkinter
         mask_rgb = cv2.cvtColor(mask, cv2.COLOR_GRAY2RGB)
         imgtk_mask = ImageTk.PhotoImage(image=Image.fromarray(mask_rgb))
-        imgtk_result = ImageTk.PhotoImage(
-            image=Image.fromarray(cv2.cvtColor(hasil, cv2.COLOR_BGR2RGB))
-        )
+        imgtk_result = None
+        if hasil is not None:
+            imgtk_result = ImageTk.PhotoImage(
+                image=Image.fromarray(cv2.cvtColor(hasil, cv2.COLOR_BGR2RGB))
+            )
 
         if mode == "Keduanya":
             self.mask_label.configure(image=imgtk_mask)
@@ -352,7 +324,7 @@ class LaneDetectionLiveApp:
             self.mask_label.grid(row=0, column=0)
             self.result_label.grid_forget()
 
-        elif mode == "Deteksi Saja":
+        elif mode == "Deteksi Saja" and imgtk_result is not None:
             self.result_label.configure(image=imgtk_result)
             self.result_label.imgtk = imgtk_result
             self.result_label.grid(row=0, column=0)
@@ -375,17 +347,18 @@ class LaneDetectionLiveApp:
             return
 
         # ambil frame dari kamera
-        frame_rgb = self.picam2.capture_array()
-        frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-
-        hasil, mask = self.process_frame(frame_bgr)
-        self.display_frame(mask, hasil)
+        captured = self.capture.read()
+        if captured is not None:
+            hasil, mask = self.process_frame(captured.image)
+            self.display_frame(mask, hasil)
 
         # jadwalkan frame berikutnya
         self.root.after(10, self.update_frame)
 
     def close(self):
         self.playing = False
+        self.lux_sampler.stop()
+        self.capture.stop()
         try:
             self.picam2.stop()
         except Exception:
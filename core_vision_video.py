@@ -1,15 +1,26 @@
+import os
+import sys
+
 import cv2
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 import numpy as np
 
+import gamma_lut
+from bev_geometry import BevGeometry
+from capture_file import CaptureReader
+
 class LaneDetectionApp:
     def __init__(self, root, video_path):
         self.root = root
         self.root.title("Lane Detection Player (BEV + Offset)")
         self.video_path = video_path
-        self.cap = cv2.VideoCapture(self.video_path)
+        # folder rekaman capture_file.py: frame mentah + lux asli per frame
+        if os.path.isdir(self.video_path):
+            self.cap = CaptureReader(self.video_path)
+        else:
+            self.cap = cv2.VideoCapture(self.video_path)
         self.playing = False
         self.seeking = False
 
@@ -39,6 +50,10 @@ class LaneDetectionApp:
         ])
 
         self.M = cv2.getPerspectiveTransform(self.src_points, self.dst_points)
+        self.geometry = BevGeometry(
+            self.frame_width, self.frame_height,
+            self.src_points, self.dst_points
+        )
 
         # ===== Area kontrol tampilan =====
         option_frame = ttk.Frame(root)
@@ -148,9 +163,8 @@ class LaneDetectionApp:
         return float(np.mean(gray))
 
     def apply_gamma(self, frame_bgr, gamma):
-        inv = 1.0 / gamma
-        lut = np.array([((i / 255.0) ** inv) * 255 for i in np.arange(256)]).astype("uint8")
-        return cv2.LUT(frame_bgr, lut)
+        # LUT diambil dari bank (precomputed), gamma ~1.0 di-skip
+        return gamma_lut.apply_gamma(frame_bgr, gamma)
 
     def hitung_posisi(self, contours_list):
         if len(contours_list) == 0:
@@ -172,9 +186,7 @@ class LaneDetectionApp:
         Mengembalikan: frame_hasil (BGR), mask (gray), offset (px), arah (str)
         """
         if with_bev:
-            frame_processed = cv2.warpPerspective(
-                frame_input, self.M, (self.frame_width, self.frame_height)
-            )
+            frame_processed = self.geometry.warp(frame_input)
         else:
             frame_processed = frame_input.copy()
 
@@ -262,10 +274,13 @@ class LaneDetectionApp:
         # Resize ke resolusi kerja
         frame = cv2.resize(frame, (self.frame_width, self.frame_height))
 
-        # Brightness dan gamma (adaptasi kode #3, lux disimulasikan)
+        # Brightness dan gamma (adaptasi kode #3)
         brightness = self.measure_brightness(frame)
-        lux_sim = brightness * 10.0  # dummy lux hanya untuk simulasi
-        gamma = self.fuzzy_gamma(lux_sim, brightness)
+        # lux asli kalau dari rekaman capture_file.py, mp4 tidak punya lux
+        lux = getattr(self.cap, "lux", None)
+        if lux is None:
+            lux = brightness * 10.0  # dummy lux hanya untuk simulasi
+        gamma = self.fuzzy_gamma(lux, brightness)
         corrected = self.apply_gamma(frame, gamma)
 
         # Pilih mode view: Bird Eye atau Normal
@@ -354,6 +369,8 @@ class LaneDetectionApp:
 # ===== Jalankan aplikasi =====
 if __name__ == "__main__":
     root = tk.Tk()
-    app = LaneDetectionApp(root, "video 3 november.mp4")  # ganti dengan path videomu
+    # path video mp4, atau folder rekaman capture_file.py
+    video = sys.argv[1] if len(sys.argv) > 1 else "video 3 november.mp4"
+    app = LaneDetectionApp(root, video)
     root.mainloop()
 
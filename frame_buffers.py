@@ -0,0 +1,106 @@
+"""
+Buffer pool untuk proses per frame
+==================================
+
+Tiap frame dulu bikin array baru untuk cvtColor, LUT, warp, threshold,
+morphology, dst. Di Pi itu berarti alokasi ~5 MB per frame, GC dan
+bandwidth memori terbuang. BufferPool menyimpan array per nama, jadi
+frame berikutnya cukup menulis ulang ke `dst=` yang sama.
+
+Cara pakai:
+    buffers = BufferPool()
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=buffers.get("gray", frame.shape[:2]))
+
+Array dari pool ditimpa frame berikutnya: jangan disimpan lewat dari satu
+frame (copy atau encode dulu kalau perlu).
+
+Beberapa frame diproses bersamaan (stage pipeline): satu BufferPool per
+frame yang sedang jalan, diambil dari BufferPoolRing dan dikembalikan
+setelah gambarnya di-encode.
+    ring = BufferPoolRing(8)
+    pool = ring.acquire()          # None kalau semua pool masih dipakai
+    ...prepare_frame(frame, variants, buffers=pool) ... freeze ...
+    ring.release(pool)
+"""
+
+import math
+import queue
+
+import numpy as np
+
+
+class BufferPool:
+    """
+    Array yang dipakai ulang antar frame, satu per nama.
+    Tiap nama punya satu blok memori yang cuma tumbuh: shape yang lebih kecil
+    (mis. pita kolom tracker yang lebarnya berubah-ubah) memakai awal blok.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Array contiguous (isi sembarang) dengan shape/dtype ini"""
+        dtype = np.dtype(dtype)
+        nbytes = math.prod(shape) * dtype.itemsize
+        block = self._blocks.get(name)
+        if block is None or block.nbytes < nbytes:
+            block = np.empty(nbytes, np.uint8)
+            self._blocks[name] = block
+            self.allocations += 1
+        return block[:nbytes].view(dtype).reshape(shape)
+
+    def zeros(self, name, shape, dtype=np.uint8):
+        arr = self.get(name, shape, dtype)
+        arr.fill(0)
+        return arr
+
+    def nbytes(self):
+        return sum(block.nbytes for block in self._blocks.values())
+
+
+class BufferPoolRing:
+    """
+    Sekumpulan BufferPool yang bergiliran dipakai frame-frame yang sedang
+    di-pipeline. Jumlahnya = batas frame in flight: kalau habis, acquire()
+    menunggu (backpressure ke capture), bukan alokasi baru.
+    """
+
+    def __init__(self, count):
+        self.pools = [BufferPool() for _ in range(count)]
+        # LIFO: pool yang baru dilepas dipakai lagi duluan (masih di cache),
+        # pool cadangan baru terisi kalau memang ada frame sebanyak itu in flight
+        self._free = queue.LifoQueue()
+        for pool in self.pools:
+            self._free.put(pool)
+
+    def acquire(self, timeout=1.0):
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, pool):
+        if pool is not None:
+            self._free.put(pool)
+
+    @property
+    def free(self):
+        return self._free.qsize()
+
+    @property
+    def allocations(self):
+        return sum(pool.allocations for pool in self.pools)
+
+    def nbytes(self):
+        return sum(pool.nbytes() for pool in self.pools)
+
+
+def get_buffer(buffers, name, shape, dtype=np.uint8):
+    """buffers.get(...) atau None (OpenCV alokasi sendiri) kalau tanpa pool"""
+    return None if buffers is None else buffers.get(name, shape, dtype)
+
+
+def zeros_buffer(buffers, name, shape, dtype=np.uint8):
+    return np.zeros(shape, dtype) if buffers is None else buffers.zeros(name, shape, dtype)
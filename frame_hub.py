@@ -0,0 +1,237 @@
+"""
+Broadcast hub untuk frame hasil deteksi
+=======================================
+
+Satu thread producer (capture + detect) publish frame ke hub,
+semua client MJPEG tinggal subscribe dan ambil frame terbaru.
+Jadi jumlah viewer tidak menambah jumlah pipeline deteksi.
+"""
+
+import threading
+import time
+
+import cv2
+
+from mask_codec import pack_mask
+from quality_ladder import encode_rung
+
+
+class HubFrame:
+    """
+    Satu frame hasil deteksi dengan beberapa variant gambar
+    (mis. "mask/bev", "detection/normal").
+    Hasil encode JPEG di-cache per frame, jadi client yang nonton
+    variant yang sama cuma memicu satu kali imencode.
+    """
+    def __init__(self, views, meta=None, jpeg_quality=85):
+        self.views = views
+        self.meta = meta or {}
+        self.jpeg_quality = jpeg_quality
+        # _lock cuma menjaga dict; encode-nya di bawah lock per key, jadi
+        # viewer variant / anak tangga lain tidak antri di belakang satu encode
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._encoded = {}
+
+    def _cached(self, key, variant, encode):
+        """encode(image) sekali per key, hasilnya di-cache (None kalau variant tidak ada)"""
+        with self._lock:
+            if key in self._encoded:
+                return self._encoded[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._encoded:
+                    return self._encoded[key]
+                image = self.views.get(variant)
+            if image is None:
+                return None
+            data = encode(image)
+            with self._lock:
+                self._encoded[key] = data
+            return data
+
+    def jpeg(self, variant, rung=None):
+        """
+        JPEG bytes untuk variant, None kalau variant tidak diproduksi.
+        rung (quality_ladder.Rung) = kualitas/resolusi lain, di-cache terpisah
+        supaya client di anak tangga yang sama berbagi satu encode.
+        """
+        if rung is not None and rung.quality == self.jpeg_quality and rung.scale == 1.0:
+            rung = None
+        if rung is not None:
+            return self._cached((variant, rung.name), variant, lambda image: encode_rung(image, rung))
+
+        def encode(image):
+            ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            return buffer.tobytes() if ret else None
+
+        return self._cached(variant, variant, encode)
+
+    def packed_mask(self, variant):
+        """Mask sebagai bit + keyframe (mask_codec.PackedMask) untuk /mask_feed, di-cache"""
+        return self._cached((variant, "mask"), variant, pack_mask)
+
+    def freeze(self, variants=None, rungs=(), masks=()):
+        """
+        Encode sekarang lalu lepas gambarnya.
+        Dipakai kalau gambar ada di buffer yang ditimpa frame berikutnya.
+        variants: variant yang di-encode JPEG (None = semua view)
+        rungs: pasangan (variant, rung) yang juga perlu di-encode (hub.wanted_rungs())
+        masks: variant yang di-pack untuk /mask_feed
+        """
+        for variant in (list(self.views) if variants is None else variants):
+            self.jpeg(variant)
+        for variant, rung in rungs:
+            self.jpeg(variant, rung)
+        for variant in masks:
+            self.packed_mask(variant)
+        with self._lock:
+            self.views = {}
+            key_locks = list(self._key_locks.values())
+        # tunggu encode lazy client lain yang masih membaca gambar lama
+        for key_lock in key_locks:
+            with key_lock:
+                pass
+
+
+class FrameHub:
+    """
+    Latest-frame broadcast: producer publish sekali, N subscriber baca.
+    Subscriber yang lambat langsung lompat ke frame terbaru (tidak antri).
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame_id = 0
+        self._payload = None
+        self._published_at = 0.0
+        self._viewers = {}
+        self._encodings = {}
+        self._rungs = {}
+        self._closed = False
+
+    def publish(self, payload):
+        """Simpan frame terbaru dan bangunkan semua subscriber"""
+        with self._cond:
+            self._frame_id += 1
+            self._payload = payload
+            self._published_at = time.time()
+            self._cond.notify_all()
+            return self._frame_id
+
+    def wait_for(self, last_id, timeout=1.0):
+        """
+        Tunggu frame dengan id > last_id.
+        Returns: (frame_id, payload), atau (last_id, None) kalau timeout / hub ditutup
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._frame_id > last_id or self._closed,
+                timeout=timeout
+            )
+            if self._closed or self._frame_id <= last_id:
+                return last_id, None
+            return self._frame_id, self._payload
+
+    def latest(self):
+        """Ambil frame terbaru tanpa menunggu"""
+        with self._cond:
+            return self._frame_id, self._payload
+
+    def subscribe(self, variant=None, encoding="jpeg"):
+        """
+        Context manager untuk menghitung viewer aktif per variant.
+        encoding: "jpeg" (/video_feed) atau "mask" (/mask_feed, bit mask)
+        """
+        return _Subscription(self, variant, encoding)
+
+    def wanted_variants(self, encoding=None):
+        """Variant yang sedang ditonton minimal satu subscriber (encoding None = apa saja)"""
+        with self._cond:
+            if encoding is None:
+                return {v for v, n in self._viewers.items() if n > 0 and v is not None}
+            return {v for (v, e), n in self._encodings.items()
+                    if n > 0 and v is not None and e == encoding}
+
+    def wanted_rungs(self):
+        """Pasangan (variant, rung) yang sedang dipakai subscriber ber-quality ladder"""
+        with self._cond:
+            return {key for key, n in self._rungs.items() if n > 0}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def viewers(self):
+        with self._cond:
+            return sum(self._viewers.values())
+
+    def stats(self):
+        with self._cond:
+            return {
+                "frame_id": self._frame_id,
+                "viewers": sum(self._viewers.values()),
+                "variants": {v: n for v, n in self._viewers.items() if n > 0},
+                "age_ms": round((time.time() - self._published_at) * 1000, 1)
+                if self._published_at else None,
+            }
+
+
+class _Subscription:
+    def __init__(self, hub, variant, encoding="jpeg"):
+        self.hub = hub
+        self.variant = variant
+        self.encoding = encoding
+        self.rung = None
+
+    def __enter__(self):
+        with self.hub._cond:
+            viewers = self.hub._viewers
+            viewers[self.variant] = viewers.get(self.variant, 0) + 1
+            encodings = self.hub._encodings
+            key = (self.variant, self.encoding)
+            encodings[key] = encodings.get(key, 0) + 1
+        return self
+
+    def set_rung(self, rung):
+        """Catat anak tangga quality subscriber ini (untuk hub.wanted_rungs())"""
+        if rung == self.rung:
+            return
+        with self.hub._cond:
+            rungs = self.hub._rungs
+            if self.rung is not None:
+                rungs[(self.variant, self.rung)] -= 1
+            if rung is not None:
+                rungs[(self.variant, rung)] = rungs.get((self.variant, rung), 0) + 1
+        self.rung = rung
+
+    def __exit__(self, exc_type, exc, tb):
+        self.set_rung(None)
+        with self.hub._cond:
+            self.hub._viewers[self.variant] -= 1
+            self.hub._encodings[(self.variant, self.encoding)] -= 1
+        return False
+
+
+class CpuMeter:
+    """
+    Ukur CPU proses (process_time) per interval wall-clock.
+    Dipakai untuk membuktikan CPU tetap flat walau viewer bertambah.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self.percent = 0.0
+
+    def sample(self):
+        with self._lock:
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            dt = wall - self._wall
+            if dt > 0:
+                self.percent = round(100.0 * (cpu - self._cpu) / dt, 1)
+            self._wall, self._cpu = wall, cpu
+            return self.percent
@@ -1,8 +1,14 @@
-import time, cv2, csv, os
+import time, cv2, os, sys
 import numpy as np
 from picamera2 import Picamera2
 import board, busio, adafruit_tsl2591
 
+# modul bersama ada di folder root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gamma_lut
+from lux_sampler import LuxSampler
+from recorder import Recorder
+
 durasi = int(input("Masukkan durasi logging (dalam detik): "))
 print(f"[INFO] Logging akan berjalan selama {durasi} detik\n")
 
@@ -13,6 +19,7 @@ i2c = busio.I2C(board.SCL, board.SDA)
 tsl = adafruit_tsl2591.TSL2591(i2c)
 tsl.integration_time = adafruit_tsl2591.INTEGRATIONTIME_300MS
 tsl.gain = adafruit_tsl2591.GAIN_MED
+lux_sampler = LuxSampler(tsl).start()
 
 # =====================================================================
 # 2. SETUP KAMERA PICAMERA2
@@ -42,7 +49,7 @@ out_dir = "/home/mbasis/output_gamma_video"
 os.makedirs(out_dir, exist_ok=True)
 
 timestamp = int(time.time())
-csv_file = os.path.join(out_dir, f"log_gamma_{timestamp}.csv")
+log_file = os.path.join(out_dir, f"log_gamma_{timestamp}.tlog")   # CSV: python telemetry_log.py to-csv
 video_file = os.path.join(out_dir, f"video_gamma_{timestamp}.mp4")
 
 # =====================================================================
@@ -69,16 +76,18 @@ def measure_brightness(frame):
     return np.mean(gray)
 
 def apply_gamma(frame, gamma):
-    inv = 1.0 / gamma
-    lut = np.array([((i / 255.0) ** inv) * 255 for i in np.arange(256)]).astype("uint8")
-    return cv2.LUT(frame, lut)
+    # LUT diambil dari bank (precomputed), gamma ~1.0 di-skip
+    return gamma_lut.apply_gamma(frame, gamma)
 
 # =====================================================================
 # 7. SETUP VIDEO WRITER
 # =====================================================================
 fps = 30  # bisa kamu ubah sesuai kebutuhan
-fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-writer = cv2.VideoWriter(video_file, fourcc, fps, (640, 480))
+# encode mp4v + log biner di thread writer sendiri (write-behind), loop capture
+# tidak menunggu SD card; log di-fsync tiap detik, bukan flush per baris
+rec = Recorder()
+rec.add_video("video", video_file, fps, (640, 480))
+rec.add_telemetry("log", log_file, [("lux", "f4"), ("brightness", "f4"), ("gamma", "f4")])
 
 print("[OK] VideoWriter aktif:", video_file)
 
@@ -87,14 +96,11 @@ print("[OK] VideoWriter aktif:", video_file)
 # =====================================================================
 start = time.time()
 
-with open(csv_file, "w", newline="") as f:
-    writer_csv = csv.writer(f)
-    writer_csv.writerow(["timestamp", "lux", "brightness", "gamma"])
-
-    print("[START] Recording + logging dimulai...\n")
+print("[START] Recording + logging dimulai...\n")
 
+try:
     while (time.time() - start) < durasi:
-        lux = tsl.lux or 0
+        lux = lux_sampler.read().lux
         frame = cam.capture_array()
 
         if is_rgb:
@@ -111,25 +117,24 @@ with open(csv_file, "w", newline="") as f:
         cv2.putText(corrected, text, (10, 25),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
 
-        # === SAVE VIDEO FRAME ===
-        writer.write(corrected)
+        # === SAVE VIDEO FRAME (antri ke recorder) ===
+        rec.write("video", corrected)
 
-        # === SAVE CSV DATA ===
-        writer_csv.writerow([
-            time.strftime("%H:%M:%S"), lux, brightness, gamma
-        ])
-        f.flush()
+        # === SAVE LOG (frame_id + t_ns otomatis) ===
+        rec.row("log", [lux, brightness, gamma])
 
         # === SHOW LIVE PREVIEW ===
         cv2.imshow("Recording Auto Gamma", corrected)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             print("[STOP] Dihentikan manual oleh user\n")
             break
-
-writer.release()
-cv2.destroyAllWindows()
-cam.stop()
+finally:
+    # tunggu sisa queue ditulis, lalu release video + fsync log
+    rec.close()
+    lux_sampler.stop()
+    cv2.destroyAllWindows()
+    cam.stop()
 
 print("\n[DONE] Logging selesai.")
-print("CSV  :", csv_file)
-print("Video:", video_file)
\ No newline at end of file
+print("Log  :", log_file)
+print("Video:", video_file)
@@ -0,0 +1,233 @@
+"""
+Gamma LUT bank
+==============
+
+Dulu tiap frame bikin ulang LUT 256 entry pakai list comprehension Python.
+Di sini semua LUT untuk gamma 0.40 - 2.50 (step 0.01) dihitung sekali
+pakai numpy, lookup per frame cuma indexing array.
+
+Cara pakai:
+    from gamma_lut import apply_gamma
+    corrected = apply_gamma(frame_bgr, gamma)
+
+Untuk deteksi saja (tanpa bikin frame corrected), threshold putih HSV
+bisa "dilipat" ke frame mentah karena gamma itu monoton:
+    white = FoldedWhiteThreshold(lower_white, upper_white)
+    mask = white.mask(frame_bgr, gamma)   # == inRange(HSV(apply_gamma(frame)))
+
+Microbenchmark (jalankan di Pi):
+    python gamma_lut.py
+
+Cek mask folded == mask lama di frame rekaman:
+    python gamma_lut.py "video 3 november.mp4"
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+
+def build_lut(gamma):
+    """LUT untuk satu nilai gamma, hasil sama persis dengan versi list comprehension"""
+    inv = 1.0 / gamma
+    return ((np.arange(256) / 255.0) ** inv * 255).astype(np.uint8)
+
+
+class GammaLUTBank:
+    """
+    Tabel LUT untuk gamma yang dikuantisasi ke `step`.
+    Gamma di luar range dihitung vectorized lalu di-cache.
+    """
+    def __init__(self, gamma_min=0.4, gamma_max=2.5, step=0.01):
+        self.gamma_min = gamma_min
+        self.step = step
+        self.size = int(round((gamma_max - gamma_min) / step)) + 1
+
+        gammas = np.round(gamma_min + np.arange(self.size) * step, 6)
+        inv = 1.0 / gammas[:, None]
+        self.tables = ((np.arange(256)[None, :] / 255.0) ** inv * 255).astype(np.uint8)
+        self._extra = {}
+
+    def quantize(self, gamma):
+        return round(round((gamma - self.gamma_min) / self.step) * self.step + self.gamma_min, 6)
+
+    def lut(self, gamma):
+        """LUT (256,) uint8 untuk gamma, O(1) kalau dalam range"""
+        idx = int(round((gamma - self.gamma_min) / self.step))
+        if 0 <= idx < self.size:
+            return self.tables[idx]
+        key = self.quantize(gamma)
+        table = self._extra.get(key)
+        if table is None:
+            table = build_lut(key)
+            self._extra[key] = table
+        return table
+
+    def is_identity(self, gamma):
+        """Gamma ~1.0 → LUT identitas, tidak perlu cv2.LUT sama sekali"""
+        return abs(gamma - 1.0) < self.step / 2
+
+    def apply(self, frame, gamma, dst=None):
+        """
+        Gamma correction pakai LUT dari bank.
+        Kalau gamma ~1.0 frame dikembalikan apa adanya (bukan copy).
+        """
+        if self.is_identity(gamma):
+            return frame
+        return cv2.LUT(frame, self.lut(gamma), dst=dst)
+
+
+# Bank bersama untuk semua script
+default_bank = GammaLUTBank()
+
+
+def apply_gamma(frame, gamma, dst=None):
+    return default_bank.apply(frame, gamma, dst=dst)
+
+
+# ===================== THRESHOLD TANPA GAMMA =====================
+
+class FoldedWhiteThreshold:
+    """
+    inRange(HSV(LUT(frame)), lower, upper) tanpa LUT dan tanpa HSV.
+
+    Dengan H penuh (0-180), S >= 0 dan V <= 255, mask putih cuma bergantung
+    pada max dan min channel BGR: V = LUT[max], S = f(LUT[max], LUT[min]).
+    Karena LUT monoton, untuk tiap max ada batas bawah min:
+        pixel putih  <=>  min >= min_table[max]
+    Tabel dibangun dengan cvtColor OpenCV sendiri, jadi pembulatannya
+    identik dengan jalur lama.
+    """
+    def __init__(self, lower, upper, bank=None):
+        lower = [int(v) for v in lower]
+        upper = [int(v) for v in upper]
+        if lower[0] > 0 or upper[0] < 180 or lower[1] > 0 or upper[2] < 255:
+            raise ValueError("FoldedWhiteThreshold butuh H 0-180, S_min 0, V_max 255")
+        self.lower = np.array(lower, dtype=np.uint8)
+        self.upper = np.array(upper, dtype=np.uint8)
+        self.bank = bank or default_bank
+        self._tables = {}
+
+        # Semua pasangan (max, min): baris = max, kolom = min
+        m = np.arange(256)[:, None].repeat(256, axis=1)
+        n = np.arange(256)[None, :].repeat(256, axis=0)
+        self._pairs = (m, np.minimum(n, m))
+
+    def min_table(self, gamma):
+        """LUT (256,) uint8: nilai min channel terkecil supaya pixel dianggap putih"""
+        key = None if self.bank.is_identity(gamma) else self.bank.quantize(gamma)
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+
+        lut = np.arange(256, dtype=np.uint8) if key is None else self.bank.lut(gamma)
+        m, n = self._pairs
+        probe = np.dstack([lut[m], lut[n], lut[n]]).astype(np.uint8)
+        ok = cv2.inRange(cv2.cvtColor(probe, cv2.COLOR_BGR2HSV), self.lower, self.upper) > 0
+        ok &= n == np.arange(256)[None, :]  # hanya pasangan min <= max yang valid
+
+        # min terkecil yang lolos, atau max+1 (tidak mungkin) kalau tidak ada
+        first = np.where(ok.any(axis=1), ok.argmax(axis=1), np.arange(256) + 1)
+        table = np.minimum(first, 255).astype(np.uint8)
+        self._tables[key] = table
+        return table
+
+    def mask(self, frame_bgr, gamma, dst=None, buffers=None):
+        """
+        Mask putih (0/255) dari frame mentah, identik dengan jalur gamma + HSV.
+        buffers (frame_buffers.BufferPool) opsional: array sementara dipakai ulang.
+        """
+        if buffers is None:
+            b, g, r = cv2.split(frame_bgr)
+            mx = cv2.max(cv2.max(b, g), r)
+            mn = cv2.min(cv2.min(b, g), r)
+            limit = cv2.LUT(mx, self.min_table(gamma))
+            return cv2.compare(mn, limit, cv2.CMP_GE, dst=dst)
+
+        shape = frame_bgr.shape[:2]
+        b, g, r = cv2.split(frame_bgr, [buffers.get(f"fold/{c}", shape) for c in "bgr"])
+        mx = cv2.max(b, g, dst=buffers.get("fold/max", shape))
+        cv2.max(mx, r, dst=mx)
+        # b tidak dipakai lagi, jadi boleh jadi tempat min
+        mn = cv2.min(b, g, dst=b)
+        cv2.min(mn, r, dst=mn)
+        limit = cv2.LUT(mx, self.min_table(gamma), dst=buffers.get("fold/limit", shape))
+        return cv2.compare(mn, limit, cv2.CMP_GE, dst=dst)
+
+
+# ===================== MICROBENCHMARK =====================
+
+def _legacy_apply_gamma(frame, gamma):
+    inv = 1.0 / gamma
+    lut = np.array([((i / 255.0) ** inv) * 255 for i in np.arange(256)]).astype("uint8")
+    return cv2.LUT(frame, lut)
+
+
+def _bench(fn, frame, gammas):
+    t0 = time.perf_counter()
+    for g in gammas:
+        fn(frame, g)
+    return (time.perf_counter() - t0) * 1000 / len(gammas)
+
+
+def check_folded_video(video_path, gammas=(0.4, 0.7, 1.0, 1.3, 1.8, 2.5)):
+    """
+    Bandingkan FoldedWhiteThreshold dengan LUT + HSV + inRange di semua frame
+    video (camera space). Versi lewat detect_lane penuh (mask BEV + offset):
+    tests/test_fold_gamma.py
+    """
+    white = FoldedWhiteThreshold([0, 0, 200], [180, 70, 255])
+    cap = cv2.VideoCapture(video_path)
+    frames = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame = cv2.resize(frame, (640, 360))
+        for g in gammas:
+            hsv = cv2.cvtColor(apply_gamma(frame, g), cv2.COLOR_BGR2HSV)
+            ref = cv2.inRange(hsv, white.lower, white.upper)
+            if not np.array_equal(ref, white.mask(frame, g)):
+                raise AssertionError(f"Mask beda di frame {frames}, gamma {g}")
+        frames += 1
+    cap.release()
+    print(f"[OK] {frames} frame x {len(gammas)} gamma: mask folded identik")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        check_folded_video(sys.argv[1])
+        sys.exit(0)
+
+    frame = np.random.randint(0, 256, (360, 640, 3), dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    gammas = rng.uniform(0.4, 2.5, 500)
+
+    # hasil harus identik dengan cara lama pada gamma yang sudah terkuantisasi
+    for g in gammas[:50]:
+        q = default_bank.quantize(g)
+        assert np.array_equal(default_bank.lut(q), build_lut(q))
+
+    t_build_old = _bench(lambda f, g: np.array(
+        [((i / 255.0) ** (1.0 / g)) * 255 for i in np.arange(256)]).astype("uint8"), frame, gammas)
+    t_build_new = _bench(lambda f, g: default_bank.lut(g), frame, gammas)
+    t_old = _bench(_legacy_apply_gamma, frame, gammas)
+    t_new = _bench(apply_gamma, frame, gammas)
+    t_identity = _bench(apply_gamma, frame, [1.0] * 500)
+
+    print(f"Frame {frame.shape[1]}x{frame.shape[0]}, {len(gammas)} gamma acak")
+    print(f"LUT build  lama : {t_build_old:.3f} ms/frame")
+    print(f"LUT lookup bank : {t_build_new:.4f} ms/frame")
+    print(f"apply_gamma lama: {t_old:.3f} ms/frame")
+    print(f"apply_gamma bank: {t_new:.3f} ms/frame")
+    print(f"gamma = 1.0     : {t_identity:.4f} ms/frame (LUT di-skip)")
+    print(f"Hemat           : {t_old - t_new:.3f} ms/frame")
+
+    white = FoldedWhiteThreshold([0, 0, 200], [180, 70, 255])
+    t_hsv = _bench(lambda f, g: cv2.inRange(
+        cv2.cvtColor(apply_gamma(f, g), cv2.COLOR_BGR2HSV), white.lower, white.upper), frame, gammas)
+    t_fold = _bench(white.mask, frame, gammas)
+    print(f"gamma+HSV+inRange: {t_hsv:.3f} ms/frame")
+    print(f"folded threshold : {t_fold:.3f} ms/frame")
@@ -15,15 +15,21 @@ export default function Home() {
   // View controls state (sama seperti Tkinter version)
   const [displayMode, setDisplayMode] = useState<'both' | 'mask' | 'detection'>('both');
   const [viewMode, setViewMode] = useState<'bev' | 'normal'>('bev');
+  const [vectorOverlay, setVectorOverlay] = useState(false);
 
   useEffect(() => {
+    // Auto-detect protocol and port based on hostname
+    const isNgrok = piIp.includes('ngrok');
+    const protocol = isNgrok ? 'https' : 'http';
+    const port = isNgrok ? '' : ':5000';
+    const baseUrl = `${protocol}://${piIp}${port}`;
+
+    let interval: ReturnType<typeof setInterval> | null = null;
+
+    // Fallback: polling /api/status tiap 500ms (server lama / SSE diblokir)
     const fetchStatus = async () => {
       try {
-        // Auto-detect protocol and port based on hostname
-        const isNgrok = piIp.includes('ngrok');
-        const protocol = isNgrok ? 'https' : 'http';
-        const port = isNgrok ? '' : ':5000';
-        const res = await fetch(`${protocol}://${piIp}${port}/api/status`);
+        const res = await fetch(`${baseUrl}/api/status`);
         if (res.ok) {
           const data = await res.json();
           setStatus(data);
@@ -35,8 +41,33 @@ export default function Home() {
         setIsConnected(false);
       }
     };
-    const interval = setInterval(fetchStatus, 500);
-    return () => clearInterval(interval);
+    const startPolling = () => {
+      if (!interval) interval = setInterval(fetchStatus, 500);
+    };
+
+    // Push tiap hasil deteksi lewat Server-Sent Events
+    let events: EventSource | null = null;
+    if (typeof EventSource !== 'undefined') {
+      events = new EventSource(`${baseUrl}/api/events`);
+      events.addEventListener('telemetry', (e) => {
+        setStatus(JSON.parse((e as MessageEvent).data));
+        setIsConnected(true);
+      });
+      events.onerror = () => {
+        // EventSource reconnect sendiri; kalau tidak pernah terbuka, pakai polling
+        if (events && events.readyState === EventSource.CLOSED) {
+          setIsConnected(false);
+          startPolling();
+        }
+      };
+    } else {
+      startPolling();
+    }
+
+    return () => {
+      events?.close();
+      if (interval) clearInterval(interval);
+    };
   }, [piIp]);
 
   return (
@@ -65,6 +96,8 @@ export default function Home() {
         setDisplayMode={setDisplayMode}
         viewMode={viewMode}
         setViewMode={setViewMode}
+        vectorOverlay={vectorOverlay}
+        setVectorOverlay={setVectorOverlay}
       />
 
       {/* Bento Grid Layout */}
@@ -75,6 +108,7 @@ export default function Home() {
             isConnected={isConnected}
             displayMode={displayMode}
             viewMode={viewMode}
+            vectorOverlay={vectorOverlay}
           />
         </div>
 
@@ -0,0 +1,57 @@
+'use client';
+
+import { useEffect, useRef, useState } from 'react';
+import { MaskStreamDecoder, drawMask } from '@/lib/maskCodec';
+
+interface MaskCanvasProps {
+  baseUrl: string;
+  viewMode: 'bev' | 'normal';
+  fallbackSrc: string; // MJPEG /video_feed?type=mask kalau /mask_feed tidak ada
+  className?: string;
+}
+
+// Mask biner dari /mask_feed (bit/RLE, lossless) digambar ke canvas
+export default function MaskCanvas({ baseUrl, viewMode, fallbackSrc, className }: MaskCanvasProps) {
+  const canvasRef = useRef<HTMLCanvasElement>(null);
+  const [failed, setFailed] = useState(false);
+
+  useEffect(() => {
+    setFailed(false);
+    const controller = new AbortController();
+    const decoder = new MaskStreamDecoder();
+
+    const run = async () => {
+      const res = await fetch(`${baseUrl}/mask_feed?mode=${viewMode}`, {
+        signal: controller.signal,
+        headers: { 'ngrok-skip-browser-warning': '1' },
+      });
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+      const reader = res.body.getReader();
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        const masks = decoder.push(value);
+        const canvas = canvasRef.current;
+        if (!canvas || masks.length === 0) continue;
+        // cuma mask terakhir yang digambar, sisanya tetap di-decode (delta)
+        const mask = masks[masks.length - 1];
+        if (canvas.width !== mask.width || canvas.height !== mask.height) {
+          canvas.width = mask.width;
+          canvas.height = mask.height;
+        }
+        const ctx = canvas.getContext('2d');
+        if (ctx) drawMask(ctx, mask);
+      }
+    };
+
+    run().catch(() => {
+      if (!controller.signal.aborted) setFailed(true);
+    });
+    return () => controller.abort();
+  }, [baseUrl, viewMode]);
+
+  if (failed) {
+    return <img src={fallbackSrc} alt="Mask" className={className} />;
+  }
+  return <canvas ref={canvasRef} className={className} />;
+}
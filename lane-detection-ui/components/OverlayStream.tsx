@@ -0,0 +1,136 @@
+'use client';
+
+import { useEffect, useRef, useState } from 'react';
+
+interface OverlayGeometry {
+  size: [number, number];
+  center_x: number;
+  reference_x: number | null;
+  arrow: [number, number, number, number] | null;
+  contours: number[][];
+  roi_normal: number[] | null;
+}
+
+interface OverlayStreamProps {
+  baseUrl: string;
+  viewMode: 'bev' | 'normal';
+  fallbackSrc: string; // MJPEG beranotasi server kalau SSE / frame mentah gagal
+  className?: string;
+}
+
+// Tanpa event overlay selama ini → anggap gagal, pakai fallbackSrc
+const OVERLAY_TIMEOUT_MS = 3000;
+
+// Warna sama dengan anotasi server (overlay.py), sudah diubah dari BGR ke RGB
+const WARNA_TENGAH = 'rgb(0,255,0)';
+const WARNA_BELOK = 'rgb(255,165,0)';
+const WARNA_HILANG = 'rgb(255,0,0)';
+
+function drawOverlay(ctx: CanvasRenderingContext2D, data: any, viewMode: 'bev' | 'normal') {
+  const g: OverlayGeometry = data.overlay;
+  const [width, height] = g.size;
+  ctx.clearRect(0, 0, width, height);
+  const warna = g.reference_x === null ? WARNA_HILANG : data.arah === 'TENGAH' ? WARNA_TENGAH : WARNA_BELOK;
+
+  if (viewMode === 'normal' && g.roi_normal) {
+    ctx.strokeStyle = 'rgb(0,0,255)';
+    ctx.lineWidth = 2;
+    ctx.beginPath();
+    for (let i = 0; i < g.roi_normal.length; i += 2) ctx.lineTo(g.roi_normal[i], g.roi_normal[i + 1]);
+    ctx.closePath();
+    ctx.stroke();
+  }
+
+  ctx.strokeStyle = 'rgb(255,255,0)';
+  ctx.lineWidth = 2;
+  ctx.beginPath();
+  ctx.moveTo(g.center_x, 0);
+  ctx.lineTo(g.center_x, height);
+  ctx.stroke();
+
+  if (viewMode === 'bev') {
+    ctx.fillStyle = 'rgb(0,255,0)';
+    for (const c of g.contours) {
+      ctx.beginPath();
+      for (let i = 0; i < c.length; i += 2) ctx.lineTo(c[i], c[i + 1]);
+      ctx.closePath();
+      ctx.fill();
+    }
+    if (g.arrow) {
+      const [x0, y0, x1, y1] = g.arrow;
+      const tip = Math.abs(x1 - x0) * 0.3;
+      const arah = Math.sign(x1 - x0);
+      ctx.strokeStyle = warna;
+      ctx.lineWidth = 3;
+      ctx.beginPath();
+      ctx.moveTo(x0, y0);
+      ctx.lineTo(x1, y1);
+      ctx.moveTo(x1 - arah * tip * Math.cos(Math.PI / 4), y1 - tip * Math.sin(Math.PI / 4));
+      ctx.lineTo(x1, y1);
+      ctx.lineTo(x1 - arah * tip * Math.cos(Math.PI / 4), y1 + tip * Math.sin(Math.PI / 4));
+      ctx.stroke();
+    }
+  }
+
+  ctx.font = '18px monospace';
+  if (g.reference_x !== null || viewMode === 'normal') {
+    ctx.fillStyle = warna;
+    const text = g.reference_x !== null ? `Offset: ${Math.abs(data.offset)}px ${data.arah}` : 'Offset: N/A';
+    ctx.fillText(text, 10, height - 20);
+  }
+  ctx.fillStyle = 'white';
+  ctx.font = '16px monospace';
+  ctx.fillText(
+    `Lux:${data.lux?.toFixed(1)} Gamma:${data.gamma?.toFixed(2)} Bright:${data.brightness?.toFixed(1)}`,
+    10, 30
+  );
+}
+
+// Frame mentah (/video_feed?type=frame) + overlay vektor dari /api/events?overlay=1
+export default function OverlayStream({ baseUrl, viewMode, fallbackSrc, className }: OverlayStreamProps) {
+  const canvasRef = useRef<HTMLCanvasElement>(null);
+  const [failed, setFailed] = useState(false);
+
+  useEffect(() => {
+    setFailed(false);
+    const events = new EventSource(`${baseUrl}/api/events?overlay=1`);
+    let timer = setTimeout(() => setFailed(true), OVERLAY_TIMEOUT_MS);
+    events.addEventListener('telemetry', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      const canvas = canvasRef.current;
+      if (!canvas || !data.overlay) return;
+      clearTimeout(timer);
+      timer = setTimeout(() => setFailed(true), OVERLAY_TIMEOUT_MS);
+      const [width, height] = data.overlay.size;
+      if (canvas.width !== width || canvas.height !== height) {
+        canvas.width = width;
+        canvas.height = height;
+      }
+      const ctx = canvas.getContext('2d');
+      if (ctx) drawOverlay(ctx, data, viewMode);
+    });
+    // EventSource reconnect sendiri; CLOSED = server menolak (mis. endpoint tidak ada)
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED) setFailed(true);
+    };
+    return () => {
+      clearTimeout(timer);
+      events.close();
+    };
+  }, [baseUrl, viewMode]);
+
+  if (failed) {
+    return <img src={fallbackSrc} alt="Detection" className={`max-w-full max-h-full object-contain ${className ?? ''}`} />;
+  }
+  return (
+    <div className={`relative w-full h-full ${className ?? ''}`}>
+      <img
+        src={`${baseUrl}/video_feed?type=frame&mode=${viewMode}`}
+        alt="Detection"
+        onError={() => setFailed(true)}
+        className="absolute inset-0 w-full h-full object-contain"
+      />
+      <canvas ref={canvasRef} className="absolute inset-0 w-full h-full object-contain pointer-events-none" />
+    </div>
+  );
+}
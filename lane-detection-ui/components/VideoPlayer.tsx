@@ -1,21 +1,26 @@
 'use client';
 
 import { useState, useEffect } from 'react';
+import MaskCanvas from './MaskCanvas';
+import OverlayStream from './OverlayStream';
 
 interface VideoPlayerProps {
   piIp: string;
   isConnected: boolean;
   displayMode: 'both' | 'mask' | 'detection';
   viewMode: 'bev' | 'normal';
+  // true: frame mentah + overlay vektor di client (bisa telat ~1 frame dari gambar);
+  // false: MJPEG beranotasi server, frame + metadata selalu sejajar
+  vectorOverlay?: boolean;
 }
 
-export default function VideoPlayer({ piIp, isConnected, displayMode, viewMode }: VideoPlayerProps) {
+export default function VideoPlayer({ piIp, isConnected, displayMode, viewMode, vectorOverlay = false }: VideoPlayerProps) {
   const [isFullscreen, setIsFullscreen] = useState(false);
   const [key, setKey] = useState(0);
 
   useEffect(() => {
     setKey(prev => prev + 1);
-  }, [displayMode, viewMode]);
+  }, [displayMode, viewMode, vectorOverlay]);
 
   const toggleFullscreen = () => {
     const el = document.getElementById('video-container');
@@ -36,13 +41,13 @@ export default function VideoPlayer({ piIp, isConnected, displayMode, viewMode }
     );
   }
 
-  const getUrl = (type: string) => {
-    // Auto-detect protocol and port based on hostname
-    const isNgrok = piIp.includes('ngrok');
-    const protocol = isNgrok ? 'https' : 'http';
-    const port = isNgrok ? '' : ':5000';
-    return `${protocol}://${piIp}${port}/video_feed?type=${type}&mode=${viewMode}`;
-  };
+  // Auto-detect protocol and port based on hostname
+  const isNgrok = piIp.includes('ngrok');
+  const protocol = isNgrok ? 'https' : 'http';
+  const port = isNgrok ? '' : ':5000';
+  const baseUrl = `${protocol}://${piIp}${port}`;
+
+  const getUrl = (type: string) => `${baseUrl}/video_feed?type=${type}&mode=${viewMode}`;
 
   return (
     <div id="video-container" className="bento-card w-full h-full rounded-2xl overflow-hidden relative group flex flex-col">
@@ -62,14 +67,22 @@ export default function VideoPlayer({ piIp, isConnected, displayMode, viewMode }
         {displayMode === 'both' ? (
           <div className="grid grid-cols-2 gap-4 w-full h-full">
             <div className="relative flex items-center justify-center bg-black rounded-lg overflow-hidden">
-              <img key={`mask-${key}`} src={getUrl('mask')} alt="Mask" className="max-w-full max-h-full object-contain" />
+              <MaskCanvas key={`mask-${key}`} baseUrl={baseUrl} viewMode={viewMode} fallbackSrc={getUrl('mask')} className="max-w-full max-h-full object-contain" />
               <div className="absolute bottom-2 left-2 bg-black/60 px-2 py-1 rounded text-[10px] text-white/80">MASK</div>
             </div>
             <div className="relative flex items-center justify-center bg-black rounded-lg overflow-hidden">
-              <img key={`det-${key}`} src={getUrl('detection')} alt="Detection" className="max-w-full max-h-full object-contain" />
+              {vectorOverlay ? (
+                <OverlayStream key={`det-${key}`} baseUrl={baseUrl} viewMode={viewMode} fallbackSrc={getUrl('detection')} />
+              ) : (
+                <img key={`det-${key}`} src={getUrl('detection')} alt="Detection" className="max-w-full max-h-full object-contain" />
+              )}
               <div className="absolute bottom-2 left-2 bg-black/60 px-2 py-1 rounded text-[10px] text-white/80">DETECTION</div>
             </div>
           </div>
+        ) : displayMode === 'mask' ? (
+          <MaskCanvas key={`single-mask-${viewMode}-${key}`} baseUrl={baseUrl} viewMode={viewMode} fallbackSrc={getUrl('mask')} className="max-w-full max-h-full object-contain rounded-lg" />
+        ) : vectorOverlay ? (
+          <OverlayStream key={`single-${displayMode}-${viewMode}-${key}`} baseUrl={baseUrl} viewMode={viewMode} fallbackSrc={getUrl('detection')} className="rounded-lg overflow-hidden" />
         ) : (
           <img key={`single-${displayMode}-${viewMode}-${key}`} src={getUrl(displayMode)} alt="Stream" className="max-w-full max-h-full object-contain rounded-lg" />
         )}
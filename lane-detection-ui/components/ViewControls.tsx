@@ -5,6 +5,8 @@ interface ViewControlsProps {
   setDisplayMode: (mode: 'both' | 'mask' | 'detection') => void;
   viewMode: 'bev' | 'normal';
   setViewMode: (mode: 'bev' | 'normal') => void;
+  vectorOverlay: boolean;
+  setVectorOverlay: (on: boolean) => void;
 }
 
 export default function ViewControls({
@@ -12,6 +14,8 @@ export default function ViewControls({
   setDisplayMode,
   viewMode,
   setViewMode,
+  vectorOverlay,
+  setVectorOverlay,
 }: ViewControlsProps) {
   return (
     <div className="bento-card p-4 rounded-xl flex flex-wrap items-center gap-6">
@@ -73,6 +77,31 @@ export default function ViewControls({
           </button>
         </div>
       </div>
+
+      {/* Anotasi: server (MJPEG, sejajar metadata) atau vektor di client (hemat CPU Pi) */}
+      <div className="flex items-center gap-3">
+        <label className="text-xs text-[var(--text-subtle)] uppercase tracking-wider">Anotasi:</label>
+        <div className="flex gap-2">
+          <button
+            onClick={() => setVectorOverlay(false)}
+            className={`px-3 py-1.5 rounded-lg text-xs font-medium transition-all ${!vectorOverlay
+                ? 'bg-[var(--accent)] text-white'
+                : 'bg-[var(--background)] text-[var(--text-muted)] hover:bg-[var(--border)]'
+              }`}
+          >
+            Server
+          </button>
+          <button
+            onClick={() => setVectorOverlay(true)}
+            className={`px-3 py-1.5 rounded-lg text-xs font-medium transition-all ${vectorOverlay
+                ? 'bg-[var(--accent)] text-white'
+                : 'bg-[var(--background)] text-[var(--text-muted)] hover:bg-[var(--border)]'
+              }`}
+          >
+            Vektor
+          </button>
+        </div>
+      </div>
     </div>
   );
 }
@@ -0,0 +1,91 @@
+// Decoder stream /mask_feed (format sama dengan mask_codec.py)
+// Header 16 byte little-endian: "LM", codec u8, flags u8, width u16,
+// height u16, frame_id u32, panjang payload u32, lalu payload.
+
+const HEADER_SIZE = 16;
+const CODEC_BITS = 0;
+const CODEC_RLE = 1;
+const CODEC_DELTA = 2;
+
+export interface DecodedMask {
+  frameId: number;
+  width: number;
+  height: number;
+  bits: Uint8Array; // 0/1 per piksel
+  bytes: number;    // ukuran pesan di kabel
+}
+
+function rleDecode(payload: Uint8Array, n: number, out: Uint8Array, xor: boolean) {
+  const view = new DataView(payload.buffer, payload.byteOffset, payload.byteLength);
+  let value = payload[0];
+  let pos = 0;
+  for (let off = 1; off + 1 < payload.length; off += 2) {
+    const run = view.getUint16(off, true);
+    if (value) {
+      const end = Math.min(pos + run, n);
+      if (xor) for (let i = pos; i < end; i++) out[i] ^= 1;
+      else out.fill(1, pos, end);
+    } else if (!xor) {
+      out.fill(0, pos, Math.min(pos + run, n));
+    }
+    pos += run;
+    value ^= 1;
+  }
+  if (pos !== n) throw new Error(`RLE rusak: ${pos} piksel, seharusnya ${n}`);
+}
+
+export class MaskStreamDecoder {
+  private buffer = new Uint8Array(0);
+  private prev: Uint8Array | null = null;
+
+  // Tambah chunk dari fetch stream, kembalikan semua mask yang sudah lengkap
+  push(chunk: Uint8Array): DecodedMask[] {
+    const merged = new Uint8Array(this.buffer.length + chunk.length);
+    merged.set(this.buffer);
+    merged.set(chunk, this.buffer.length);
+    this.buffer = merged;
+
+    const hasil: DecodedMask[] = [];
+    while (this.buffer.length >= HEADER_SIZE) {
+      const view = new DataView(this.buffer.buffer, this.buffer.byteOffset, HEADER_SIZE);
+      if (this.buffer[0] !== 0x4c || this.buffer[1] !== 0x4d) throw new Error('Bukan stream mask');
+      const codec = this.buffer[2];
+      const width = view.getUint16(4, true);
+      const height = view.getUint16(6, true);
+      const frameId = view.getUint32(8, true);
+      const length = view.getUint32(12, true);
+      if (this.buffer.length < HEADER_SIZE + length) break;
+
+      const payload = this.buffer.subarray(HEADER_SIZE, HEADER_SIZE + length);
+      const n = width * height;
+      let bits: Uint8Array;
+      if (codec === CODEC_BITS) {
+        bits = new Uint8Array(n);
+        for (let i = 0; i < n; i++) bits[i] = (payload[i >> 3] >> (7 - (i & 7))) & 1;
+      } else if (codec === CODEC_RLE) {
+        bits = new Uint8Array(n);
+        rleDecode(payload, n, bits, false);
+      } else if (codec === CODEC_DELTA) {
+        if (!this.prev || this.prev.length !== n) throw new Error('DELTA tanpa keyframe');
+        bits = this.prev.slice();
+        rleDecode(payload, n, bits, true);
+      } else {
+        throw new Error(`Codec tidak dikenal: ${codec}`);
+      }
+      this.prev = bits;
+      hasil.push({ frameId, width, height, bits, bytes: HEADER_SIZE + length });
+      this.buffer = this.buffer.slice(HEADER_SIZE + length);
+    }
+    return hasil;
+  }
+}
+
+// Gambar mask ke canvas (putih = garis)
+export function drawMask(ctx: CanvasRenderingContext2D, mask: DecodedMask) {
+  const image = ctx.createImageData(mask.width, mask.height);
+  const data = new Uint32Array(image.data.buffer);
+  for (let i = 0; i < mask.bits.length; i++) {
+    data[i] = mask.bits[i] ? 0xffffffff : 0xff000000;
+  }
+  ctx.putImageData(image, 0, 0);
+}
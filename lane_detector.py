@@ -0,0 +1,475 @@
+"""
+Lane detector untuk stream server
+=================================
+
+Extract dari stream_server.py supaya bisa dipakai tanpa Flask dan tanpa
+hardware (source=SyntheticSource, sensor lux palsu). Hasil deteksi
+terakhir ada di `latest_data` (dict yang sama dipakai /api/status).
+
+Cara pakai:
+    detector = LaneDetector()                          # Picamera2 + TSL2591
+    detector = LaneDetector(source=SyntheticSource())  # tanpa kamera
+    source = ReplaySource("capture/")                  # rekaman capture_file.py
+    detector = LaneDetector(source=source, lux_sampler=source.lux_sampler)
+    views = detector.get_frame(("detection/bev",))
+    detector = LaneDetector(source=False, lux_sampler=lux)   # frame dari luar (batch)
+    views, offset, arah = detector.detect_lane(frame)
+    detector.telemetry["gamma"]                        # nilai frame terakhir
+
+Cek steady state tanpa alokasi numpy per frame:
+    python -m pytest tests/test_allocations.py
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# Hardware cuma ada di Raspberry Pi
+try:
+    from picamera2 import Picamera2
+except ImportError:
+    Picamera2 = None
+try:
+    import board
+    import busio
+    import adafruit_tsl2591
+except ImportError:
+    board = busio = adafruit_tsl2591 = None
+
+import gamma_lut
+from gamma_lut import FoldedWhiteThreshold
+from bev_geometry import BevGeometry
+from lane_localizer import make_localizer, hitung_offset
+from lane_tracker import LaneTracker
+from lux_sampler import LuxSampler, FakeLuxSensor
+from capture_ring import CaptureRing, SyntheticSource
+from frame_buffers import BufferPool, get_buffer, zeros_buffer
+from overlay import blob_contours, build_overlay
+
+# ============ GLOBAL VARIABLES ============
+# Untuk store latest detection results
+latest_data = {
+    "offset": 0,
+    "arah": "N/A",
+    "offset_smooth": 0,
+    "arah_smooth": "N/A",
+    "tracking_locked": False,
+    "gamma": 1.0,
+    "lux": 0.0,
+    "lux_stale": True,
+    "brightness": 0.0,
+    "fps": 0.0,
+    "timestamp": time.time()
+}
+
+# ============ LANE DETECTION CLASS ============
+class LaneDetector:
+    """
+    Extract dari core_vision_live.py
+    Simplified untuk streaming
+    """
+    def __init__(self, fold_gamma=True, mask_first=False, localizer="contours",
+                 tracking=False, source=None, reuse_buffers=True, lux_sampler=None):
+        self.frame_width = 640
+        self.frame_height = 360
+        
+        if lux_sampler is not None:
+            # Lux dari luar (mis. ReplaySource.lux_sampler: lux rekaman), TSL tidak dibuka
+            self.has_tsl = False
+            self.lux_sampler = lux_sampler
+        else:
+            # Setup TSL2591 sensor
+            try:
+                i2c = busio.I2C(board.SCL, board.SDA)
+                self.tsl = adafruit_tsl2591.TSL2591(i2c)
+                self.tsl.integration_time = adafruit_tsl2591.INTEGRATIONTIME_300MS
+                self.tsl.gain = adafruit_tsl2591.GAIN_MED
+                self.has_tsl = True
+            except:
+                print("TSL2591 sensor not found, using default lux")
+                self.has_tsl = False
+            
+            # Lux dibaca di thread sendiri, frame loop cuma ambil nilai terakhir
+            sensor = self.tsl if self.has_tsl else FakeLuxSensor(500.0)
+            self.lux_sampler = LuxSampler(sensor).start()
+        
+        # Setup PiCamera2 (atau source lain, mis. SyntheticSource untuk test).
+        # source=False: tanpa kamera dan capture thread, frame diberikan
+        # lewat detect_lane() (batch, replay, test); get_frame() tidak bisa
+        if source is False:
+            self.capture = None
+        else:
+            if source is None and Picamera2 is None:
+                print("Picamera2 not found, using synthetic source")
+                source = SyntheticSource(self.frame_width, self.frame_height)
+            if source is None:
+                self.picam2 = Picamera2()
+                config = self.picam2.create_preview_configuration(
+                    main={"size": (self.frame_width, self.frame_height)}
+                )
+                self.picam2.configure(config)
+                self.picam2.start()
+                time.sleep(0.3)
+                source = self.picam2
+            
+            # Capture di thread sendiri, proses selalu ambil frame terbaru
+            self.capture = CaptureRing(source).start()
+        
+        # BEV Transform
+        self.src_points = np.float32([
+            [0, self.frame_height],
+            [self.frame_width, self.frame_height],
+            [int(self.frame_width * 0.2), int(self.frame_height * 0.3)],
+            [int(self.frame_width * 0.8), int(self.frame_height * 0.3)]
+        ])
+        
+        self.dst_points = np.float32([
+            [0, self.frame_height],
+            [self.frame_width, self.frame_height],
+            [0, 0],
+            [self.frame_width, 0]
+        ])
+        
+        self.M_bev = cv2.getPerspectiveTransform(self.src_points, self.dst_points)
+        
+        # Remap map fixed-point + ROI, dihitung sekali (cache di disk)
+        self.geometry = BevGeometry(
+            self.frame_width, self.frame_height,
+            self.src_points, self.dst_points
+        )
+        
+        # Detection parameters
+        self.lower_white = np.array([0, 0, 200], dtype=np.uint8)
+        self.upper_white = np.array([180, 70, 255], dtype=np.uint8)
+        self.kernel = np.ones((5, 5), np.uint8)
+        
+        # mask_first=True: threshold di camera space lalu yang di-warp cuma
+        # mask 1 channel (nearest), warp BGR cuma untuk gambar BEV beranotasi.
+        # Default False: gambar BEV beranotasi tetap dari warp BGR + threshold
+        # seperti dulu. Nyalakan cuma kalau tidak ada yang butuh gambar BEV
+        # (headless, /mask_feed, overlay saja, batch --mask-first)
+        self.mask_first = mask_first
+        
+        # fold_gamma=True: mask dihitung dari frame mentah dengan threshold
+        # yang sudah "dilipat" gamma-nya, LUT cuma jalan kalau ada yang
+        # nonton gambar corrected. Cuma identik kalau threshold membaca pixel
+        # kamera asli (mask_first): warp linear dulu lalu LUT != LUT lalu warp,
+        # jadi tanpa mask_first jalur gamma + HSV yang dipakai
+        # (tests/test_fold_gamma.py)
+        self.fold_gamma = fold_gamma and mask_first
+        self.white = FoldedWhiteThreshold(self.lower_white, self.upper_white)
+        
+        # Backend pencari posisi garis: "contours" (lama) / "components"
+        self.localizer = make_localizer(localizer)
+        
+        # Tracking: setelah lock cuma pita kolom sekitar prediksi Kalman yang diproses
+        self.tracker = LaneTracker(self.localizer, self.frame_width) if tracking else None
+        self._band_cam = None
+        
+        # reuse_buffers=True: detect_lane() menulis ke array yang sama tiap
+        # frame (dst=...), view hasilnya cuma valid sampai frame berikutnya
+        self.buffers = BufferPool() if reuse_buffers else None
+        
+        # ROI trapesium untuk view normal (tanpa BEV)
+        self.polygon_normal = self.geometry.polygon_normal
+        
+        # Geometri overlay frame terakhir (kalau variant "overlay" diminta)
+        self.overlay = None
+        # Telemetry frame terakhir (isi yang sama dengan latest_data)
+        self.telemetry = None
+    
+    def fuzzy_gamma(self, lux, brightness):
+        """Calculate optimal gamma correction"""
+        L = np.clip(lux / 1500.0, 0, 1)
+        B = np.clip(brightness / 100.0, 0, 1)
+        
+        dark = 1 - L
+        bright = L
+        too_dark = (dark ** 1.7) * (1 - B)
+        too_bright = bright * B
+        normal = 1 - np.abs(L - B)
+        
+        gamma = (2.2 * too_dark + 1.0 * normal + 0.4 * too_bright) / (
+            too_dark + normal + too_bright + 1e-6
+        )
+        
+        if L < 0.15:
+            gamma *= 1.3
+        
+        return float(np.clip(gamma, 0.4, 2.5))
+    
+    def measure_brightness(self, frame_bgr, buffers=None):
+        """Measure average brightness"""
+        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY,
+                            dst=get_buffer(buffers, "gray", frame_bgr.shape[:2]))
+        return float(cv2.mean(gray)[0])
+    
+    def apply_gamma(self, frame_bgr, gamma, dst=None):
+        """Apply gamma correction"""
+        # LUT diambil dari bank (precomputed), gamma ~1.0 di-skip
+        return gamma_lut.apply_gamma(frame_bgr, gamma, dst=dst)
+    
+    def _threshold(self, frame, gamma, dst=None, buffers=None):
+        """Mask putih; frame mentah kalau fold_gamma, kalau tidak frame corrected"""
+        if self.fold_gamma:
+            return self.white.mask(frame, gamma, dst=dst, buffers=buffers)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=get_buffer(buffers, "hsv", frame.shape))
+        return cv2.inRange(hsv, self.lower_white, self.upper_white, dst=dst)
+    
+    def _band_mask(self, base, gamma, bands, buffers=None):
+        """Mask BEV yang cuma dihitung di pita kolom (x0, x1) dari tracker"""
+        mask = zeros_buffer(buffers, "mask", (self.frame_height, self.frame_width))
+        if self.mask_first:
+            crop = self.geometry.crop(base)
+            if self._band_cam is None or self._band_cam.shape != crop.shape[:2]:
+                self._band_cam = np.zeros(crop.shape[:2], np.uint8)
+        for x0, x1 in bands:
+            if self.mask_first:
+                # Threshold cuma kolom camera-space yang dibaca pita ini
+                sx0, sx1 = self.geometry.source_columns(x0, x1)
+                self._threshold(crop[:, sx0:sx1], gamma,
+                                dst=self._band_cam[:, sx0:sx1], buffers=buffers)
+                band = self.geometry.warp(self._band_cam, nearest=True, cropped=True,
+                                          columns=(x0, x1),
+                                          dst=get_buffer(buffers, "band", (self.frame_height, x1 - x0)))
+            else:
+                band_bev = self.geometry.warp(
+                    base, columns=(x0, x1),
+                    dst=get_buffer(buffers, "band_bev", (self.frame_height, x1 - x0) + base.shape[2:]))
+                band = self._threshold(band_bev, gamma, buffers=buffers,
+                                       dst=get_buffer(buffers, "band", (self.frame_height, x1 - x0)))
+            cv2.morphologyEx(band, cv2.MORPH_OPEN, self.kernel, dst=mask[:, x0:x1])
+        return mask
+    
+    def detect_lane(self, frame_bgr, variants=("detection/bev",)):
+        """
+        Main detection function
+        Satu pass deteksi (di BEV), variant gambar lain cuma dibuat
+        kalau diminta: "mask/bev", "detection/bev", "mask/normal", "detection/normal",
+        "frame/bev", "frame/normal" (frame gamma tanpa anotasi), "overlay"
+        (geometri di self.overlay, bukan gambar; lihat overlay.py)
+        Returns: views (dict variant -> image), offset (int), direction (str)
+        """
+        bands = self.tracker.search_bands() if self.tracker else None
+        prep = self.prepare_frame(frame_bgr, variants, bands, buffers=self.buffers)
+        return self.analyze_frame(prep)
+    
+    def prepare_frame(self, frame_bgr, variants=("detection/bev",), bands=None, buffers=None):
+        """
+        Stage 1: lux, gamma, threshold + BEV → mask (tanpa state antar frame).
+        bands: pita kolom dari tracker, None = full frame
+        buffers: BufferPool untuk semua array hasil (None = alokasi baru,
+                 wajib kalau beberapa frame diproses bersamaan)
+        Returns: dict untuk analyze_frame()
+        """
+        frame_shape = frame_bgr.shape
+        mask_shape = (self.frame_height, self.frame_width)
+        variants = set(variants)
+        views = {}
+        
+        # Get lux from sensor (cached, non-blocking)
+        lux_reading = self.lux_sampler.read()
+        lux = lux_reading.lux
+        
+        # Brightness and gamma correction
+        brightness = self.measure_brightness(frame_bgr, buffers)
+        gamma = self.fuzzy_gamma(lux, brightness)
+        
+        annotate = "detection/bev" in variants or "frame/bev" in variants
+        
+        if self.fold_gamma:
+            # Frame corrected cuma dibuat untuk view normal yang ditonton,
+            # deteksi jalan di frame mentah (gamma sudah ada di dalam threshold)
+            corrected = None
+            if "detection/normal" in variants or "frame/normal" in variants:
+                corrected = self.apply_gamma(
+                    frame_bgr, gamma, dst=get_buffer(buffers, "corrected", frame_shape))
+            base = frame_bgr
+        else:
+            corrected = self.apply_gamma(
+                frame_bgr, gamma, dst=get_buffer(buffers, "corrected", frame_shape))
+            base = corrected
+        
+        bev_dst = get_buffer(buffers, "frame_bev", mask_shape + frame_shape[2:])
+        if bands:
+            # Tracker sudah lock: warp + threshold + morphology cuma di pita
+            # kolom sekitar prediksi, kolom lain tetap nol
+            mask = self._band_mask(base, gamma, bands, buffers)
+            frame_bev = self.geometry.warp(base, dst=bev_dst) if annotate else None
+        elif self.mask_first:
+            # Threshold di camera space (cuma area trapesium), warp mask 1 channel
+            crop = self.geometry.crop(base)
+            mask_cam = self._threshold(crop, gamma, dst=get_buffer(buffers, "mask_cam", crop.shape[:2]),
+                                       buffers=buffers)
+            mask = self.geometry.warp(mask_cam, nearest=True, cropped=True,
+                                      dst=get_buffer(buffers, "mask_raw", mask_shape))
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel,
+                                    dst=get_buffer(buffers, "mask", mask_shape))
+            frame_bev = self.geometry.warp(base, dst=bev_dst) if annotate else None
+        else:
+            # Bird Eye View transform, lalu white lane detection
+            frame_bev = self.geometry.warp(base, dst=bev_dst)
+            mask = self._threshold(frame_bev, gamma, dst=get_buffer(buffers, "mask_raw", mask_shape),
+                                   buffers=buffers)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel,
+                                    dst=get_buffer(buffers, "mask", mask_shape))
+        if "mask/bev" in variants:
+            views["mask/bev"] = mask
+        
+        height, width = self.frame_height, self.frame_width
+        # Normal view (tanpa BEV), sama seperti NORMAL PATH di core_vision.py
+        if "mask/normal" in variants:
+            # cuma baris di dalam bounding box ROI yang di-threshold
+            x0, y0, x1, y1 = self.geometry.roi_normal_bbox
+            mask_normal = get_buffer(buffers, "mask_normal", (height, width))
+            if mask_normal is None:
+                mask_normal = np.zeros((height, width), np.uint8)
+            # di luar bounding box dinolkan oleh apply_roi_normal(dst=...)
+            self._threshold(base[y0:y1, x0:x1], gamma, dst=mask_normal[y0:y1, x0:x1],
+                            buffers=buffers)
+            views["mask/normal"] = self.geometry.apply_roi_normal(mask_normal, dst=mask_normal)
+        
+        return {
+            "variants": variants, "views": views, "lux_reading": lux_reading,
+            "brightness": brightness, "gamma": gamma, "corrected": corrected,
+            "mask": mask, "frame_bev": frame_bev, "buffers": buffers
+        }
+    
+    def analyze_frame(self, prep):
+        """
+        Stage 2: cari posisi garis, anotasi, offset, update latest_data
+        Returns: views (dict variant -> image), offset (int), direction (str)
+        """
+        variants = prep["variants"]
+        views = prep["views"]
+        lux_reading = prep["lux_reading"]
+        lux = lux_reading.lux
+        brightness = prep["brightness"]
+        gamma = prep["gamma"]
+        corrected = prep["corrected"]
+        mask = prep["mask"]
+        frame_bev = prep["frame_bev"]
+        buffers = prep["buffers"]
+        annotate = "detection/bev" in variants
+        
+        # Cari posisi garis (contours / connected components / tracking)
+        if self.tracker:
+            track = self.tracker.update(mask)
+            posisi, blobs = track.posisi, track.blobs
+        else:
+            track = None
+            posisi, blobs = self.localizer.locate(mask)
+        
+        # Annotate frame (cuma kalau ada yang nonton)
+        hasil = None
+        if frame_bev is not None:
+            # fold mode: frame_bev masih mentah, gamma baru dipasang untuk tampilan
+            # (frame_bev tidak dipakai lagi, jadi boleh digambari langsung)
+            hasil = self.apply_gamma(frame_bev, gamma, dst=frame_bev) if self.fold_gamma else frame_bev
+        if "frame/bev" in variants:
+            views["frame/bev"] = hasil
+            if annotate:
+                # anotasi di copy, frame mentah tetap untuk client overlay vektor
+                salinan = get_buffer(buffers, "hasil_bev", hasil.shape)
+                if salinan is None:
+                    salinan = hasil.copy()
+                else:
+                    np.copyto(salinan, hasil)
+                hasil = salinan
+        height, width = self.frame_height, self.frame_width
+        center_frame = width // 2
+        
+        # Draw center line + blob garis
+        if annotate:
+            cv2.line(hasil, (center_frame, 0), (center_frame, height), (0, 255, 255), 2)
+            if self.tracker:
+                self.tracker.draw(hasil, blobs)
+            else:
+                self.localizer.draw(hasil, blobs)
+        
+        # Calculate offset
+        pos_referensi, offset, arah = hitung_offset(posisi, width)
+        if track is not None:
+            _, offset_smooth, arah_smooth = hitung_offset(track.smooth, width)
+        else:
+            offset_smooth, arah_smooth = offset, arah
+        
+        warna = (0, 0, 255)
+        if pos_referensi is not None:
+            warna = (0, 255, 0) if arah == "TENGAH" else (0, 165, 255)
+            
+            if annotate:
+                # Draw arrow
+                if abs(offset) > 5:
+                    arrow_start = (center_frame, height - 60)
+                    arrow_end = (pos_referensi, height - 60)
+                    cv2.arrowedLine(hasil, arrow_start, arrow_end, warna, 3, tipLength=0.3)
+                
+                # Draw offset text
+                offset_text = f"Offset: {abs(offset)}px {arah}"
+                cv2.putText(hasil, offset_text, (10, height - 20),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna, 2)
+        
+        # Draw info overlay
+        info_text = f"Lux:{lux:.1f} Gamma:{gamma:.2f} Bright:{brightness:.1f}"
+        if annotate:
+            cv2.putText(hasil, info_text, (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            views["detection/bev"] = hasil
+        
+        if "detection/normal" in variants:
+            hasil_normal = get_buffer(buffers, "hasil_normal", corrected.shape)
+            if hasil_normal is None:
+                hasil_normal = corrected.copy()
+            else:
+                np.copyto(hasil_normal, corrected)
+            cv2.polylines(hasil_normal, [self.polygon_normal], True, (255, 0, 0), 2)
+            cv2.line(hasil_normal, (center_frame, 0), (center_frame, height), (0, 255, 255), 2)
+            offset_text = f"Offset: {abs(offset)}px {arah}" if pos_referensi is not None else "Offset: N/A"
+            cv2.putText(hasil_normal, offset_text, (10, height - 20),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna, 2)
+            cv2.putText(hasil_normal, info_text, (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            views["detection/normal"] = hasil_normal
+        if "frame/normal" in variants:
+            views["frame/normal"] = corrected
+        
+        # Geometri untuk overlay di client (tanpa menggambar apa pun di sini)
+        self.overlay = None
+        if "overlay" in variants:
+            if self.tracker:
+                # tracker: list blob per pencarian, digabung jadi list kontur
+                blobs = [c for found in blobs for c in blob_contours(found)]
+            self.overlay = build_overlay(blobs, posisi, pos_referensi, offset, width, height,
+                                         roi_normal=self.polygon_normal)
+        
+        # Telemetry frame ini (juga untuk pemakai tanpa global, mis. batch)
+        self.telemetry = {
+            "offset": int(offset),
+            "arah": arah,
+            "offset_smooth": int(offset_smooth),
+            "arah_smooth": arah_smooth,
+            "tracking_locked": bool(self.tracker and self.tracker.locked),
+            "gamma": round(gamma, 2),
+            "lux": round(lux, 1),
+            "lux_stale": lux_reading.stale,
+            "brightness": round(brightness, 1),
+            "timestamp": time.time()
+        }
+        
+        # Update global data
+        global latest_data
+        latest_data.update(self.telemetry)
+        
+        return views, offset, arah
+    
+    def get_frame(self, variants=("detection/bev",)):
+        """Capture and process one frame, returns dict variant -> image"""
+        if self.capture is None:
+            raise RuntimeError("LaneDetector dibuat tanpa source (source=False)")
+        captured = self.capture.read()
+        if captured is None:
+            raise RuntimeError("Kamera tidak mengirim frame")
+        views, offset, arah = self.detect_lane(captured.image, variants)
+        return views
@@ -0,0 +1,227 @@
+"""
+Lane localizer: cari posisi garis kiri / tengah / kanan dari mask BEV
+=====================================================================
+
+Dua backend dengan output sama:
+- "contours"  : cara lama (findContours + contourArea + moments per kontur)
+- "components": satu panggilan connectedComponentsWithStats, luas + centroid
+                semua blob sekaligus, bucketing kiri/tengah/kanan pakai numpy
+
+Cara pakai:
+    localizer = make_localizer("components")
+    posisi, blobs = localizer.locate(mask)
+    pos_referensi, offset, arah = hitung_offset(posisi, width)
+    localizer.draw(hasil, blobs)              # opsional, untuk anotasi
+    x, blobs = localizer.locate_band(mask, x0, x1)   # satu pita kolom (LaneTracker)
+
+Benchmark + cek kesamaan offset/arah antar backend:
+    python lane_localizer.py "video 3 november.mp4"
+"""
+
+import sys
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# posisi x rata-rata tiap kelompok garis (None kalau tidak ada)
+LanePositions = namedtuple("LanePositions", ["kiri", "tengah", "kanan"])
+
+MIN_AREA = 300
+BATAS_KIRI = 0.33
+BATAS_KANAN = 0.67
+
+
+def hitung_offset(posisi, width):
+    """
+    Logika offset yang sama dengan semua script:
+    pakai garis tengah, kalau tidak ada pakai rata-rata kiri + kanan.
+    Returns: pos_referensi (int/None), offset (int), arah (str)
+    """
+    pos_referensi = None
+    if posisi.tengah is not None:
+        pos_referensi = posisi.tengah
+    elif posisi.kiri is not None and posisi.kanan is not None:
+        pos_referensi = (posisi.kiri + posisi.kanan) // 2
+
+    if pos_referensi is None:
+        return None, 0, "N/A"
+
+    offset = width // 2 - pos_referensi
+    if offset > 5:
+        arah = "KIRI"
+    elif offset < -5:
+        arah = "KANAN"
+    else:
+        arah = "TENGAH"
+    return pos_referensi, offset, arah
+
+
+class ContourLocalizer:
+    """Backend lama: findContours(RETR_TREE) + moments per kontur"""
+    name = "contours"
+
+    def __init__(self, min_area=MIN_AREA):
+        self.min_area = min_area
+
+    def locate(self, mask):
+        width = mask.shape[1]
+        contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+
+        kelompok = ([], [], [])
+        terpakai = []
+        for contour in contours:
+            if cv2.contourArea(contour) > self.min_area:
+                M = cv2.moments(contour)
+                if M["m00"] != 0:
+                    cx = int(M["m10"] / M["m00"])
+                    if cx < width * BATAS_KIRI:
+                        kelompok[0].append(cx)
+                    elif cx < width * BATAS_KANAN:
+                        kelompok[1].append(cx)
+                    else:
+                        kelompok[2].append(cx)
+                terpakai.append(contour)
+
+        posisi = LanePositions(*[sum(k) // len(k) if k else None for k in kelompok])
+        return posisi, terpakai
+
+    def locate_band(self, mask, x0, x1):
+        """Centroid rata-rata blob di pita kolom [x0, x1), koordinat full frame"""
+        contours, _ = cv2.findContours(
+            mask[:, x0:x1], cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, 0)
+        )
+        cxs = []
+        terpakai = []
+        for contour in contours:
+            if cv2.contourArea(contour) > self.min_area:
+                M = cv2.moments(contour)
+                if M["m00"] != 0:
+                    cxs.append(int(M["m10"] / M["m00"]))
+                terpakai.append(contour)
+        return (sum(cxs) // len(cxs) if cxs else None), terpakai
+
+    def draw(self, hasil, blobs, color=(0, 255, 0)):
+        if blobs:
+            cv2.drawContours(hasil, blobs, -1, color, -1)
+
+
+class ComponentLocalizer:
+    """Backend baru: connectedComponentsWithStats, tanpa loop Python per blob"""
+    name = "components"
+
+    def __init__(self, min_area=MIN_AREA, connectivity=8):
+        self.min_area = min_area
+        self.connectivity = connectivity
+
+    def _components(self, mask):
+        """Label + index blob > min_area + centroid x (int) blob itu"""
+        height, width = mask.shape
+        # label 16-bit cukup selama jumlah blob maksimum (8-connected) < 65535
+        ltype = cv2.CV_32S
+        if self.connectivity == 8 and ((height + 1) // 2) * ((width + 1) // 2) < 65535:
+            ltype = cv2.CV_16U
+        n, labels, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+            mask, self.connectivity, ltype, cv2.CCL_DEFAULT
+        )
+
+        # label 0 = background
+        keep = np.flatnonzero(stats[1:, cv2.CC_STAT_AREA] > self.min_area) + 1
+        return n, labels, keep, centroids[keep, 0].astype(np.int64)
+
+    def locate(self, mask):
+        width = mask.shape[1]
+        n, labels, keep, cx = self._components(mask)
+
+        # 0 = kiri, 1 = tengah, 2 = kanan
+        bucket = (cx >= width * BATAS_KIRI).astype(np.int64) + (cx >= width * BATAS_KANAN)
+        total = np.bincount(bucket, weights=cx, minlength=3).astype(np.int64)
+        count = np.bincount(bucket, minlength=3)
+
+        posisi = LanePositions(*[
+            int(total[i] // count[i]) if count[i] else None for i in range(3)
+        ])
+        # x0: kolom kiri labels di frame (0 = full frame, >0 = pita)
+        return posisi, (labels, keep, n, 0)
+
+    def locate_band(self, mask, x0, x1):
+        """Centroid rata-rata blob di pita kolom [x0, x1), koordinat full frame"""
+        n, labels, keep, cx = self._components(mask[:, x0:x1])
+        x = int(cx.sum() // len(cx)) + x0 if len(cx) else None
+        return x, (labels, keep, n, x0)
+
+    def draw(self, hasil, blobs, color=(0, 255, 0)):
+        labels, keep, n, x0 = blobs
+        if len(keep) == 0:
+            return
+        lut = np.zeros(n, dtype=bool)
+        lut[keep] = True
+        hasil[:, x0:x0 + labels.shape[1]][lut[labels]] = color
+
+
+LOCALIZERS = {
+    ContourLocalizer.name: ContourLocalizer,
+    ComponentLocalizer.name: ComponentLocalizer,
+}
+
+
+def make_localizer(name="contours", **kwargs):
+    if name not in LOCALIZERS:
+        raise ValueError(f"Localizer tidak dikenal: {name} (pilih {', '.join(LOCALIZERS)})")
+    return LOCALIZERS[name](**kwargs)
+
+
+# ===================== BENCHMARK =====================
+
+def benchmark_video(video_path, max_frames=None):
+    """Bandingkan kecepatan dan hasil offset/arah kedua backend di mask BEV video"""
+    from bev_geometry import BevGeometry
+
+    geometry = BevGeometry(640, 360)
+    lower_white = np.array([0, 0, 200], dtype=np.uint8)
+    upper_white = np.array([180, 70, 255], dtype=np.uint8)
+    kernel = np.ones((5, 5), np.uint8)
+    backends = [ContourLocalizer(), ComponentLocalizer()]
+
+    waktu = {b.name: 0.0 for b in backends}
+    frames = sama_arah = 0
+    selisih = []
+
+    cap = cv2.VideoCapture(video_path)
+    while max_frames is None or frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame = cv2.resize(frame, (640, 360))
+        hsv = cv2.cvtColor(geometry.warp(frame), cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, lower_white, upper_white)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+        hasil = []
+        for b in backends:
+            t0 = time.perf_counter()
+            posisi, _ = b.locate(mask)
+            hasil.append(hitung_offset(posisi, mask.shape[1]))
+            waktu[b.name] += time.perf_counter() - t0
+
+        (_, off_a, arah_a), (_, off_b, arah_b) = hasil
+        sama_arah += arah_a == arah_b
+        selisih.append(abs(off_a - off_b))
+        frames += 1
+    cap.release()
+
+    if frames == 0:
+        print("Video kosong / tidak bisa dibuka")
+        return
+    selisih = np.array(selisih)
+    print(f"{frames} frame")
+    for name, t in waktu.items():
+        print(f"  {name:<10}: {t / frames * 1000:.3f} ms/frame")
+    print(f"  arah sama     : {100.0 * sama_arah / frames:.1f}%")
+    print(f"  |offset| beda : median {np.median(selisih):.0f}px, "
+          f"p95 {np.percentile(selisih, 95):.0f}px, max {selisih.max()}px")
+
+
+if __name__ == "__main__":
+    benchmark_video(sys.argv[1] if len(sys.argv) > 1 else "video 3 november.mp4")
@@ -0,0 +1,198 @@
+"""
+Temporal lane tracker
+=====================
+
+Tiap garis (kiri / tengah / kanan) punya Kalman filter constant-velocity
+di sumbu x BEV. Setelah "lock", frame berikutnya cuma mencari blob di pita
+kolom sempit sekitar posisi prediksi, bukan di seluruh mask (lewat
+localizer yang sama, jadi backend "components" tetap dipakai). Pita dua
+track yang berdekatan dipotong di titik tengah antar prediksi, jadi satu
+blob cuma diukur oleh satu track (garis yang konvergen tidak direbut dua
+track sekaligus). Kalau garis yang dipakai untuk offset hilang beberapa
+frame berturut-turut, atau garis pindah kelompok (lewat batas 0.33 / 0.67), tracker kembali ke
+pencarian full-frame supaya kiri/tengah/kanan tetap sama dengan localizer.
+
+Cara pakai:
+    tracker = LaneTracker(make_localizer("contours"), width=640)
+    bands = tracker.search_bands()          # None = full frame
+    result = tracker.update(mask)
+    result.posisi / result.smooth / result.locked
+    tracker.draw(hasil, result.blobs)
+
+Pita cuma mempersempit kerja threshold/warp kalau search_bands() dibaca
+sebelum mask frame berikutnya dibuat (LaneDetector.detect_lane). Di
+pipeline bertahap stream_server mask dibuat full frame, tracker tetap
+mengukur per pita tapi tidak menghemat prepare.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from lane_localizer import LanePositions, BATAS_KIRI, BATAS_KANAN
+
+# posisi: hasil ukur frame ini, smooth: posisi hasil Kalman,
+# blobs: untuk digambar, list blob format localizer (satu per pencarian:
+# full frame atau tiap pita), locked: mode pita
+TrackResult = namedtuple("TrackResult", ["posisi", "smooth", "blobs", "locked"])
+
+LANES = ("kiri", "tengah", "kanan")
+
+
+class LaneKalman:
+    """Kalman 1D constant-velocity: state [x, v], ukuran = x"""
+
+    def __init__(self, x, process_var=4.0, measure_var=16.0):
+        self.x = np.array([float(x), 0.0])
+        self.P = np.diag([measure_var, 100.0])
+        self.Q = process_var * np.array([[0.25, 0.5], [0.5, 1.0]])
+        self.R = measure_var
+        self.hits = 1
+        self.misses = 0
+
+    def predict(self):
+        F = np.array([[1.0, 1.0], [0.0, 1.0]])
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + self.Q
+        return self.x[0]
+
+    def update(self, z):
+        S = self.P[0, 0] + self.R
+        K = self.P[:, 0] / S
+        self.x = self.x + K * (z - self.x[0])
+        self.P = self.P - np.outer(K, self.P[0, :])
+        self.hits += 1
+        self.misses = 0
+
+    @property
+    def position(self):
+        return int(round(self.x[0]))
+
+
+class LaneTracker:
+    """
+    Tracking posisi garis antar frame.
+    - band       : setengah lebar pita pencarian (px) di sekitar prediksi
+    - lock_after : jumlah frame berturut-turut terdeteksi sebelum mode pita
+    - max_miss   : frame hilang sebelum track dibuang
+    - refresh    : paksa full-frame tiap N frame supaya garis baru ketemu
+    """
+
+    def __init__(self, localizer, width, band=40, lock_after=3, max_miss=3,
+                 refresh=10):
+        self.localizer = localizer
+        self.width = width
+        self.band = band
+        self.lock_after = lock_after
+        self.max_miss = max_miss
+        self.refresh = refresh
+        self.tracks = {}
+        self.frames_since_full = 0
+        self.locked = False
+
+    def reset(self):
+        self.tracks = {}
+        self.locked = False
+
+    def _kelompok(self, x):
+        if x < self.width * BATAS_KIRI:
+            return "kiri"
+        if x < self.width * BATAS_KANAN:
+            return "tengah"
+        return "kanan"
+
+    def _reference_ready(self):
+        """Semua track yang ada sudah stabil (garis baru dicari lagi saat refresh)"""
+        stabil = {
+            name for name, t in self.tracks.items()
+            if t.hits >= self.lock_after and t.misses == 0
+        }
+        return bool(stabil) and stabil == set(self.tracks)
+
+    def _bands(self, predictions):
+        """
+        {nama: (x0, x1)} pita sekitar tiap prediksi; pita yang bertetangga
+        dipotong di titik tengah antar prediksi supaya tidak tumpang tindih.
+        """
+        urut = sorted(predictions.items(), key=lambda item: item[1])
+        bands = {}
+        for i, (name, pred) in enumerate(urut):
+            x0 = max(pred - self.band, 0)
+            x1 = min(pred + self.band, self.width)
+            if i > 0:
+                x0 = max(x0, (urut[i - 1][1] + pred) / 2)
+            if i + 1 < len(urut):
+                x1 = min(x1, (pred + urut[i + 1][1]) / 2)
+            bands[name] = (int(x0), int(x1))
+        return bands
+
+    def search_bands(self):
+        """
+        Pita kolom (x0, x1) yang akan dicari di frame berikutnya,
+        atau None kalau frame berikutnya full-frame.
+        """
+        if not self.locked or self.frames_since_full >= self.refresh:
+            return None
+        bands = self._bands({name: t.x[0] + t.x[1] for name, t in self.tracks.items()})
+        return [(x0, x1) for x0, x1 in bands.values() if x1 > x0]
+
+    def update(self, mask):
+        bands = self.search_bands()
+        for t in self.tracks.values():
+            t.predict()
+
+        if bands is None:
+            # Full-frame: localizer biasa, lalu assign per kelompok
+            posisi, found = self.localizer.locate(mask)
+            blobs = [found]
+            self.frames_since_full = 0
+            for name in LANES:
+                z = getattr(posisi, name)
+                if z is None:
+                    continue
+                if name in self.tracks:
+                    self.tracks[name].update(z)
+                else:
+                    self.tracks[name] = LaneKalman(z)
+        else:
+            # Mode pita: cuma kolom sekitar prediksi yang disentuh
+            self.frames_since_full += 1
+            ukur = {}
+            blobs = []
+            pita = self._bands({name: t.x[0] for name, t in self.tracks.items()})
+            for name, t in self.tracks.items():
+                x0, x1 = pita[name]
+                if x1 <= x0:
+                    continue
+                z, found = self.localizer.locate_band(mask, x0, x1)
+                blobs.append(found)
+                if z is None:
+                    continue
+                if self._kelompok(z) != name:
+                    # Garis lewat batas kelompok: ulang full-frame frame berikutnya
+                    self.frames_since_full = self.refresh
+                    continue
+                t.update(z)
+                ukur[name] = z
+            posisi = LanePositions(*[ukur.get(name) for name in LANES])
+
+        # Track yang tidak ter-update frame ini dihitung miss
+        for name in list(self.tracks):
+            t = self.tracks[name]
+            if getattr(posisi, name) is None:
+                t.misses += 1
+                t.hits = 0
+                if t.misses > self.max_miss:
+                    del self.tracks[name]
+
+        self.locked = self._reference_ready()
+        smooth = LanePositions(*[
+            self.tracks[name].position if name in self.tracks else None
+            for name in LANES
+        ])
+        return TrackResult(posisi, smooth, blobs, bands is not None)
+
+    def draw(self, hasil, blobs, color=(0, 255, 0)):
+        """Gambar TrackResult.blobs (list blob format localizer)"""
+        for found in blobs:
+            self.localizer.draw(hasil, found, color)
@@ -0,0 +1,91 @@
+"""
+Background sampler untuk sensor TSL2591
+=======================================
+
+Baca `tsl.lux` di thread sendiri (integration time 300 ms + latency I2C),
+frame loop cukup ambil nilai terakhir tanpa blocking.
+
+Cara pakai:
+    sampler = LuxSampler(tsl)          # tsl = adafruit_tsl2591.TSL2591(i2c)
+    sampler.start()
+    reading = sampler.read()           # LuxReading(lux, timestamp, stale)
+
+Tanpa hardware (test / laptop):
+    sampler = LuxSampler(FakeLuxSensor(500.0))
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+# lux: nilai terakhir, timestamp: time.time() saat dibaca,
+# stale: True kalau nilai terlalu lama / sensor belum pernah berhasil dibaca
+LuxReading = namedtuple("LuxReading", ["lux", "timestamp", "stale"])
+
+
+class FakeLuxSensor:
+    """
+    Pengganti TSL2591 untuk testing tanpa hardware.
+    `lux` bisa angka tetap atau callable (mis. lambda: ramp berdasarkan waktu),
+    `delay` mensimulasikan integration time sensor asli.
+    """
+    def __init__(self, lux=500.0, delay=0.0):
+        self._lux = lux
+        self.delay = delay
+
+    @property
+    def lux(self):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._lux() if callable(self._lux) else self._lux
+
+
+class LuxSampler:
+    """
+    Poll sensor terus-menerus di daemon thread dan simpan hasil terakhir.
+    read() tidak pernah menyentuh I2C, jadi aman dipanggil tiap frame.
+    """
+    def __init__(self, sensor, interval=0.05, stale_after=2.0, default_lux=0.0):
+        self.sensor = sensor
+        self.interval = interval
+        self.stale_after = stale_after
+        self.errors = 0
+        # (lux, timestamp) disimpan sebagai satu tuple supaya swap-nya atomic
+        self._latest = (default_lux, 0.0)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            try:
+                # Driver adafruit bisa raise RuntimeError kalau sensor overflow
+                lux = self.sensor.lux or 0.0
+                self._latest = (float(lux), time.time())
+            except Exception:
+                self.errors += 1
+            time.sleep(self.interval)
+
+    def read(self):
+        """Nilai lux terakhir + timestamp + flag stale (non-blocking)"""
+        lux, ts = self._latest
+        stale = ts == 0.0 or (time.time() - ts) > self.stale_after
+        return LuxReading(lux, ts, stale)
+
+    @property
+    def lux(self):
+        """Shortcut supaya bisa dipakai seperti objek `tsl`"""
+        return self.read().lux
@@ -0,0 +1,293 @@
+"""
+Codec mask biner untuk /mask_feed
+=================================
+
+View mask isinya cuma 0/255 satu channel, tapi dulu dikirim sebagai JPEG:
+encode mahal, ukurannya besar, dan tepi garis jadi blur. Di sini mask
+dikirim sebagai bit:
+- BITS  : np.packbits, 1 bit per piksel (640x360 = 28.8 KB, tetap)
+- RLE   : panjang run 0/1 bergantian (uint16), kecil kalau garisnya sedikit
+- DELTA : RLE dari XOR dengan mask yang terakhir dikirim ke client ini
+
+Encoder memilih payload terkecil per frame. Bagian keyframe (BITS/RLE)
+di-cache di HubFrame dan dipakai bersama semua client, cuma DELTA yang
+dihitung per client (karena tiap client bisa melewatkan frame berbeda).
+
+Format stream (application/octet-stream, pesan berurutan):
+    header 16 byte little-endian: magic "LM", codec u8, flags u8,
+    width u16, height u16, frame_id u32, panjang payload u32
+    lalu payload
+
+Cara pakai:
+    # server (lihat stream_server.py /mask_feed)
+    encoder = MaskEncoder()
+    message = encoder.encode(pack_mask(mask), frame_id)
+
+    # client Python
+    python mask_codec.py --client http://<IP_PI>:5000/mask_feed?mode=bev
+
+Benchmark vs JPEG (video atau synthetic):
+    python mask_codec.py "video 3 november.mp4"
+"""
+
+import struct
+import sys
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+MAGIC = b"LM"
+HEADER = struct.Struct("<2sBBHHII")
+
+CODEC_BITS = 0
+CODEC_RLE = 1
+CODEC_DELTA = 2
+CODEC_NAMES = {CODEC_BITS: "bits", CODEC_RLE: "rle", CODEC_DELTA: "delta"}
+
+FLAG_KEYFRAME = 1
+
+MAX_RUN = 0xFFFF
+
+# Mask yang sudah di-pack + payload keyframe terkecil (dibagi antar client)
+PackedMask = namedtuple("PackedMask", ["width", "height", "bits", "codec", "payload"])
+
+
+# ===================== RLE =====================
+
+def rle_encode(flat):
+    """
+    flat: array 1D bool / 0-1.
+    Payload: 1 byte nilai awal, lalu run bergantian sebagai uint16.
+    Run > 65535 dipecah jadi 65535, 0, sisa (run 0 = nilai lawan kosong).
+    """
+    n = flat.size
+    if n == 0:
+        return b"\x00"
+    change = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    runs = np.diff(np.concatenate(([0], change, [n])))
+    if runs.max() > MAX_RUN:
+        pecah = []
+        for run in runs.tolist():
+            while run > MAX_RUN:
+                pecah += [MAX_RUN, 0]
+                run -= MAX_RUN
+            pecah.append(run)
+        runs = np.array(pecah)
+    return bytes([int(flat[0])]) + runs.astype("<u2").tobytes()
+
+
+def rle_decode(payload, n):
+    """Kebalikan rle_encode → array uint8 0/1 panjang n"""
+    runs = np.frombuffer(payload, "<u2", offset=1)
+    values = (np.arange(runs.size) + payload[0]) % 2
+    flat = np.repeat(values.astype(np.uint8), runs)
+    if flat.size != n:
+        raise ValueError(f"RLE rusak: {flat.size} piksel, seharusnya {n}")
+    return flat
+
+
+# ===================== ENCODE =====================
+
+def pack_mask(mask):
+    """Mask 0/255 (H x W) → PackedMask dengan keyframe terkecil (BITS atau RLE)"""
+    height, width = mask.shape[:2]
+    flat = mask.reshape(-1) != 0
+    bits = np.packbits(flat)
+    rle = rle_encode(flat)
+    if len(rle) < bits.nbytes:
+        return PackedMask(width, height, bits, CODEC_RLE, rle)
+    return PackedMask(width, height, bits, CODEC_BITS, bits.tobytes())
+
+
+def _message(codec, flags, width, height, frame_id, payload):
+    return HEADER.pack(MAGIC, codec, flags, width, height,
+                       frame_id & 0xFFFFFFFF, len(payload)) + payload
+
+
+class MaskEncoder:
+    """
+    Encoder untuk satu client: ingat mask terakhir yang dikirim supaya
+    frame berikutnya bisa dikirim sebagai DELTA (kalau lebih kecil).
+    Keyframe dipaksa tiap `keyframe_interval` pesan.
+    """
+    def __init__(self, delta=True, keyframe_interval=60):
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self._prev = None
+        self._since_key = 0
+        self.sent = {name: 0 for name in CODEC_NAMES.values()}
+        self.bytes = 0
+
+    def encode(self, packed, frame_id):
+        codec, payload, flags = packed.codec, packed.payload, FLAG_KEYFRAME
+        prev = self._prev
+        if (self.delta and prev is not None and self._since_key < self.keyframe_interval
+                and prev.bits.size == packed.bits.size):
+            n = packed.width * packed.height
+            xor = np.unpackbits(np.bitwise_xor(packed.bits, prev.bits), count=n)
+            delta = rle_encode(xor)
+            if len(delta) < len(payload):
+                codec, payload, flags = CODEC_DELTA, delta, 0
+
+        self._since_key = 0 if flags & FLAG_KEYFRAME else self._since_key + 1
+        self._prev = packed
+        message = _message(codec, flags, packed.width, packed.height, frame_id, payload)
+        self.sent[CODEC_NAMES[codec]] += 1
+        self.bytes += len(message)
+        return message
+
+    def stats(self):
+        total = sum(self.sent.values())
+        return {
+            "messages": total,
+            "codecs": dict(self.sent),
+            "bytes_per_frame": round(self.bytes / total, 1) if total else 0.0,
+        }
+
+
+# ===================== DECODE =====================
+
+class MaskDecoder:
+    """Decoder sisi client; menyimpan mask terakhir untuk pesan DELTA"""
+
+    def __init__(self):
+        self._prev = None
+
+    def decode(self, header, payload):
+        """
+        header: tuple hasil HEADER.unpack, payload: bytes.
+        Returns: (frame_id, mask uint8 0/255 H x W)
+        """
+        magic, codec, flags, width, height, frame_id, _ = header
+        if magic != MAGIC:
+            raise ValueError("Bukan pesan mask (magic salah)")
+        n = width * height
+        if codec == CODEC_BITS:
+            flat = np.unpackbits(np.frombuffer(payload, np.uint8), count=n)
+        elif codec == CODEC_RLE:
+            flat = rle_decode(payload, n)
+        elif codec == CODEC_DELTA:
+            if self._prev is None or self._prev.size != n:
+                raise ValueError("DELTA tanpa keyframe sebelumnya")
+            flat = self._prev ^ rle_decode(payload, n)
+        else:
+            raise ValueError(f"Codec tidak dikenal: {codec}")
+        self._prev = flat
+        return frame_id, (flat * 255).reshape(height, width)
+
+    def decode_message(self, message):
+        header = HEADER.unpack_from(message)
+        return self.decode(header, message[HEADER.size:HEADER.size + header[-1]])
+
+
+def _read_exact(stream, n):
+    data = b""
+    while len(data) < n:
+        chunk = stream.read(n - len(data))
+        if not chunk:
+            raise EOFError("Stream mask terputus")
+        data += chunk
+    return data
+
+
+def read_masks(stream):
+    """Generator (frame_id, mask) dari file-like stream /mask_feed"""
+    decoder = MaskDecoder()
+    while True:
+        header = HEADER.unpack(_read_exact(stream, HEADER.size))
+        yield decoder.decode(header, _read_exact(stream, header[-1]))
+
+
+# ===================== CLIENT / BENCHMARK =====================
+
+def run_client(url, show=True):
+    """Client Python: baca /mask_feed, tampilkan mask dan bytes per frame"""
+    from urllib.request import Request, urlopen
+
+    request = Request(url, headers={"ngrok-skip-browser-warning": "1"})
+    with urlopen(request) as response:
+        stream = _CountingReader(response)
+        n, t0 = 0, time.perf_counter()
+        for frame_id, mask in read_masks(stream):
+            n += 1
+            if show:
+                cv2.imshow("mask_feed", mask)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            if n % 30 == 0:
+                dt = time.perf_counter() - t0
+                print(f"frame {frame_id}: {n / dt:.1f} fps, {stream.count / n / 1024:.1f} KB/frame")
+    if show:
+        cv2.destroyAllWindows()
+
+
+class _CountingReader:
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def read(self, n):
+        data = self.raw.read(n)
+        self.count += len(data)
+        return data
+
+
+def _benchmark_masks(video, limit=300):
+    """Mask BEV asli dari LaneDetector (video), atau mask sintetis kalau video tidak ada"""
+    masks = []
+    cap = cv2.VideoCapture(video)
+    if cap.isOpened():
+        from lane_detector import LaneDetector
+        # cuma mask yang dipakai, gambar BEV beranotasi tidak perlu
+        detector = LaneDetector(source=False, mask_first=True)
+        while len(masks) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame = cv2.resize(frame, (detector.frame_width, detector.frame_height))
+            views, _, _ = detector.detect_lane(frame, ("mask/bev",))
+            masks.append(views["mask/bev"].copy())
+    cap.release()
+    if not masks:
+        for i in range(limit):
+            mask = np.zeros((360, 640), np.uint8)
+            for x in (160, 320, 480):
+                cv2.line(mask, (x + i % 40, 0), (x - 30 + i % 40, 359), 255, 12)
+            masks.append(mask)
+    return masks
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--client":
+        run_client(sys.argv[2], show="--no-show" not in sys.argv)
+        sys.exit(0)
+
+    masks = _benchmark_masks(sys.argv[1] if len(sys.argv) > 1 else "video 3 november.mp4")
+    print(f"{len(masks)} mask {masks[0].shape[1]}x{masks[0].shape[0]}")
+
+    def ukur(nama, fn):
+        t0 = time.perf_counter()
+        total = sum(fn(m, i) for i, m in enumerate(masks))
+        ms = (time.perf_counter() - t0) / len(masks) * 1000
+        print(f"  {nama:<18} {total / len(masks) / 1024:7.2f} KB/frame  encode {ms:.3f} ms")
+
+    ukur("jpeg q85", lambda m, i: len(cv2.imencode('.jpg', m, [cv2.IMWRITE_JPEG_QUALITY, 85])[1]))
+    ukur("bits", lambda m, i: HEADER.size + np.packbits(m.reshape(-1) != 0).nbytes)
+    ukur("rle", lambda m, i: HEADER.size + len(rle_encode(m.reshape(-1) != 0)))
+    def key_only(m, i):
+        p = pack_mask(m)
+        return len(_message(p.codec, FLAG_KEYFRAME, p.width, p.height, i, p.payload))
+
+    ukur("key (bits|rle)", key_only)
+    encoder = MaskEncoder()
+    ukur("key + delta", lambda m, i: len(encoder.encode(pack_mask(m), i)))
+    print(f"  codec terpilih: {encoder.stats()['codecs']}")
+
+    # Lossless: decode ulang harus sama persis
+    decoder, encoder = MaskDecoder(), MaskEncoder()
+    for i, m in enumerate(masks):
+        _, hasil = decoder.decode_message(encoder.encode(pack_mask(m), i))
+        assert np.array_equal(hasil, np.where(m != 0, 255, 0)), f"mask {i} beda"
+    print("  decode lossless: OK")
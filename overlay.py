@@ -0,0 +1,174 @@
+"""
+Overlay vektor: kirim geometri deteksi, bukan piksel beranotasi
+===============================================================
+
+Anotasi di server (drawContours terisi, arrowedLine, putText, polylines)
+makan waktu tiap frame lalu ikut di-encode JPEG. Di sini geometrinya
+dikirim sebagai JSON ringkas lewat SSE (/api/events?overlay=1) dan client
+yang menggambar di atas stream frame mentah (/video_feed?type=frame):
+- contours   : kontur blob yang dipakai, disederhanakan (approxPolyDP),
+               list [x0, y0, x1, y1, ...] di koordinat BEV
+- lanes      : centroid x kiri / tengah / kanan (None kalau tidak ada)
+- reference_x, arrow [x0, y0, x1, y1] : sama dengan panah di server
+- roi_normal : trapesium ROI di view normal [x0, y0, ...]
+
+Cara pakai:
+    geometry = build_overlay(blobs, posisi, pos_referensi, offset, width, height)
+    draw_overlay(frame_bev, geometry, telemetry)            # client Python
+
+Benchmark anotasi server vs geometri (ukuran JSON + waktu):
+    python overlay.py "video 3 november.mp4"
+"""
+
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Toleransi penyederhanaan kontur (piksel)
+EPSILON = 1.5
+
+WARNA_TENGAH = (0, 255, 0)
+WARNA_BELOK = (0, 165, 255)
+WARNA_HILANG = (0, 0, 255)
+
+
+def blob_contours(blobs):
+    """Kontur dari blob localizer / tracker (list kontur atau labels ComponentLocalizer)"""
+    if isinstance(blobs, tuple):
+        labels, keep, n, x0 = blobs
+        if len(keep) == 0:
+            return []
+        lut = np.zeros(n, np.uint8)
+        lut[keep] = 255
+        contours, _ = cv2.findContours(lut[labels], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                       offset=(x0, 0))
+        return list(contours)
+    return blobs
+
+
+def _flat(points):
+    return np.asarray(points, np.int32).reshape(-1).tolist()
+
+
+def build_overlay(blobs, posisi, pos_referensi, offset, width, height,
+                  roi_normal=None, epsilon=EPSILON):
+    """
+    Geometri satu frame (dict siap json.dumps).
+    Argumen sama dengan yang dipakai analyze_frame untuk menggambar.
+    """
+    contours = []
+    for contour in blob_contours(blobs):
+        simple = cv2.approxPolyDP(contour, epsilon, True)
+        if len(simple) >= 2:
+            contours.append(_flat(simple))
+
+    arrow = None
+    if pos_referensi is not None and abs(offset) > 5:
+        arrow = [width // 2, height - 60, int(pos_referensi), height - 60]
+
+    return {
+        "size": [width, height],
+        "center_x": width // 2,
+        "lanes": posisi._asdict(),
+        "reference_x": pos_referensi,
+        "arrow": arrow,
+        "contours": contours,
+        "roi_normal": _flat(roi_normal) if roi_normal is not None else None,
+    }
+
+
+def overlay_color(arah, pos_referensi):
+    """Warna BGR yang sama dengan anotasi server"""
+    if pos_referensi is None:
+        return WARNA_HILANG
+    return WARNA_TENGAH if arah == "TENGAH" else WARNA_BELOK
+
+
+def draw_overlay(image, geometry, telemetry=None, view="bev"):
+    """
+    Gambar overlay di atas frame mentah (BGR, ditimpa in-place).
+    telemetry: dict /api/events (offset, arah, lux, gamma, brightness) untuk teks.
+    """
+    telemetry = telemetry or {}
+    height = image.shape[0]
+    center_x = geometry["center_x"]
+    arah = telemetry.get("arah", "N/A")
+    warna = overlay_color(arah, geometry["reference_x"])
+
+    if view == "normal" and geometry["roi_normal"]:
+        roi = np.int32(geometry["roi_normal"]).reshape(-1, 1, 2)
+        cv2.polylines(image, [roi], True, (255, 0, 0), 2)
+    cv2.line(image, (center_x, 0), (center_x, height), (0, 255, 255), 2)
+    if view == "bev":
+        contours = [np.int32(c).reshape(-1, 1, 2) for c in geometry["contours"]]
+        if contours:
+            cv2.drawContours(image, contours, -1, (0, 255, 0), -1)
+        if geometry["arrow"]:
+            x0, y0, x1, y1 = geometry["arrow"]
+            cv2.arrowedLine(image, (x0, y0), (x1, y1), warna, 3, tipLength=0.3)
+
+    offset = telemetry.get("offset", 0)
+    if geometry["reference_x"] is not None:
+        cv2.putText(image, f"Offset: {abs(offset)}px {arah}", (10, height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna, 2)
+    elif view == "normal":
+        cv2.putText(image, "Offset: N/A", (10, height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna, 2)
+    if "lux" in telemetry:
+        info_text = (f"Lux:{telemetry['lux']:.1f} Gamma:{telemetry['gamma']:.2f} "
+                     f"Bright:{telemetry['brightness']:.1f}")
+        cv2.putText(image, info_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return image
+
+
+# ===================== BENCHMARK =====================
+
+if __name__ == "__main__":
+    from lane_detector import LaneDetector, latest_data
+
+    video = sys.argv[1] if len(sys.argv) > 1 else "video 3 november.mp4"
+    detector = LaneDetector()
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < 300:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (detector.frame_width, detector.frame_height)))
+    cap.release()
+    if not frames:
+        frames = [detector.capture.read().image.copy() for _ in range(100)]
+    detector.capture.stop()
+
+    def jalan(variants):
+        t0 = time.perf_counter()
+        hasil = []
+        for frame in frames:
+            views, _, _ = detector.detect_lane(frame, variants)
+            hasil.append((views, detector.overlay, dict(latest_data)))
+        return (time.perf_counter() - t0) / len(frames) * 1000, hasil
+
+    jalan(("detection/bev",))  # warm up
+    ms_server, _ = jalan(("detection/bev",))
+    ms_vector, hasil = jalan(("frame/bev", "overlay"))
+    ms_geometri, _ = jalan(("overlay",))
+    ms_headless, _ = jalan(())
+    json_bytes = sum(len(json.dumps(g, separators=(",", ":"))) for _, g, _ in hasil) / len(hasil)
+
+    print(f"{len(frames)} frame")
+    print(f"  detect + anotasi server   : {ms_server:.2f} ms/frame")
+    print(f"  detect + geometri (vektor): {ms_vector:.2f} ms/frame, JSON {json_bytes:.0f} B/frame")
+    print(f"  detect + geometri saja    : {ms_geometri:.2f} ms/frame (tanpa frame)")
+    print(f"  detect tanpa gambar       : {ms_headless:.2f} ms/frame")
+
+    # Gambar ulang dari geometri harus hampir sama dengan anotasi server
+    # (view ada di buffer detector, jadi dibandingkan langsung per frame)
+    beda = []
+    for frame in frames:
+        views, _, _ = detector.detect_lane(frame, ("detection/bev", "frame/bev", "overlay"))
+        client = draw_overlay(views["frame/bev"].copy(), detector.overlay, latest_data)
+        beda.append(np.mean(np.any(client != views["detection/bev"], axis=2)))
+    print(f"  piksel beda render client vs server: {np.mean(beda) * 100:.2f}% rata-rata")
@@ -0,0 +1,208 @@
+"""
+Quality ladder adaptif per client
+=================================
+
+Dulu semua client dapat JPEG kualitas 85 resolusi penuh, baik di LAN Pi
+maupun lewat ngrok. Di sini tiap client punya AdaptiveQuality yang
+mengukur berapa frame yang benar-benar terkirim dibanding yang tersedia,
+lalu naik/turun satu anak tangga (kualitas, resolusi, frame rate).
+
+Hasil encode disimpan per (variant, rung) di HubFrame, jadi client lain
+di anak tangga yang sama memakai bytes yang sama: CPU encode bertambah
+per anak tangga yang dipakai, bukan per client.
+
+Cara pakai:
+    quality = make_quality("auto")            # atau "high" / "medium" / "low" / "lowest"
+    quality.on_source()                       # tiap ada frame baru di hub
+    if quality.due():
+        data = frame.jpeg(variant, quality.rung)
+        ... kirim ...
+        quality.on_sent()
+
+Simulasi link lambat (tanpa jaringan):
+    python quality_ladder.py "video 3 november.mp4"
+"""
+
+import sys
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# quality: JPEG quality, scale: faktor resize, fps: frame rate maksimum ke client
+Rung = namedtuple("Rung", ["name", "quality", "scale", "fps"])
+
+LADDER = (
+    Rung("high", 85, 1.0, 30),
+    Rung("medium", 70, 1.0, 20),
+    Rung("low", 60, 0.75, 15),
+    Rung("lowest", 45, 0.5, 10),
+)
+RUNGS = {rung.name: rung for rung in LADDER}
+
+
+def encode_rung(image, rung):
+    """JPEG bytes untuk satu anak tangga (resize INTER_AREA kalau scale < 1)"""
+    if rung.scale != 1.0:
+        h, w = image.shape[:2]
+        size = (max(int(w * rung.scale), 1), max(int(h * rung.scale), 1))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, rung.quality])
+    return buffer.tobytes() if ret else None
+
+
+class AdaptiveQuality:
+    """
+    Pengatur anak tangga untuk satu client.
+    Tiap `window` detik: rasio = frame terkirim / frame yang seharusnya bisa
+    dikirim (min(fps anak tangga, fps source)).
+    - rasio < down_ratio                      → turun satu anak tangga
+    - rasio >= up_ratio selama up_windows kali → naik satu anak tangga
+    Setelah turun, tidak naik lagi selama `cooldown` detik (anti naik-turun).
+    """
+    def __init__(self, ladder=LADDER, start=0, adaptive=True, window=2.0,
+                 down_ratio=0.8, up_ratio=0.97, up_windows=3, cooldown=10.0):
+        self.ladder = ladder
+        self.index = start
+        self.adaptive = adaptive
+        self.window = window
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.up_windows = up_windows
+        self.cooldown = cooldown
+
+        self.changes = 0
+        self.last_ratio = 1.0
+        self.reset()
+
+    def reset(self, now=None):
+        """Mulai window baru (now bisa diisi untuk simulasi dengan jam sendiri)"""
+        now = time.monotonic() if now is None else now
+        self._window_start = now
+        self._next_due = now
+        self._source = 0
+        self._sent = 0
+        self._good = 0
+        self._last_down = now - self.cooldown
+
+    @property
+    def rung(self):
+        return self.ladder[self.index]
+
+    def on_source(self, n=1):
+        """Ada n frame baru di hub"""
+        self._source += n
+
+    def due(self, now=None):
+        """Boleh kirim frame sekarang? (batas fps anak tangga)"""
+        now = time.monotonic() if now is None else now
+        return now >= self._next_due
+
+    def on_sent(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._sent += 1
+        # jadwal berikutnya dari jadwal lama, supaya rata-ratanya tepat fps
+        self._next_due = max(self._next_due + 1.0 / self.rung.fps, now - 1.0 / self.rung.fps)
+        self._update(now)
+
+    def _update(self, now):
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+        expected = min(self.rung.fps * elapsed, self._source)
+        ratio = self._sent / expected if expected > 0 else 1.0
+        self.last_ratio = round(ratio, 2)
+
+        if self.adaptive:
+            if ratio < self.down_ratio and self.index < len(self.ladder) - 1:
+                self.index += 1
+                self._last_down = now
+                self._good = 0
+                self.changes += 1
+            elif ratio >= self.up_ratio:
+                self._good += 1
+                if (self._good >= self.up_windows and self.index > 0
+                        and now - self._last_down >= self.cooldown):
+                    self.index -= 1
+                    self._good = 0
+                    self.changes += 1
+            else:
+                self._good = 0
+
+        self._window_start = now
+        self._source = 0
+        self._sent = 0
+
+    def stats(self):
+        return {
+            "rung": self.rung.name,
+            "adaptive": self.adaptive,
+            "ratio": self.last_ratio,
+            "changes": self.changes,
+        }
+
+
+def make_quality(name="auto"):
+    """"auto" = adaptif mulai dari atas, nama anak tangga = tetap. None kalau tidak dikenal"""
+    if name == "auto":
+        return AdaptiveQuality()
+    for i, rung in enumerate(LADDER):
+        if rung.name == name:
+            return AdaptiveQuality(start=i, adaptive=False)
+    return None
+
+
+# ===================== SIMULASI =====================
+
+def simulate(sizes, bandwidth, duration=60.0, source_fps=30.0):
+    """
+    Client dengan link `bandwidth` byte/detik, frame source tiap 1/source_fps.
+    sizes: dict nama anak tangga -> ukuran rata-rata JPEG (byte).
+    Returns: (nama anak tangga akhir, fps terkirim 10 detik terakhir)
+    """
+    quality = AdaptiveQuality()
+    quality.reset(0.0)
+    busy_until = 0.0
+    terkirim = []
+    t = 0.0
+    while t < duration:
+        quality.on_source()
+        if t >= busy_until and quality.due(t):
+            busy_until = t + sizes[quality.rung.name] / bandwidth
+            quality.on_sent(busy_until)
+            terkirim.append(busy_until)
+        t += 1.0 / source_fps
+    akhir = sum(1 for x in terkirim if x > duration - 10.0) / 10.0
+    return quality.rung.name, akhir
+
+
+if __name__ == "__main__":
+    video = sys.argv[1] if len(sys.argv) > 1 else "video 3 november.mp4"
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < 60:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (640, 360)))
+    cap.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (360, 640, 3), dtype=np.uint8)]
+
+    sizes = {}
+    print("Anak tangga (rata-rata per frame):")
+    for rung in LADDER:
+        t0 = time.perf_counter()
+        total = sum(len(encode_rung(f, rung)) for f in frames)
+        ms = (time.perf_counter() - t0) / len(frames) * 1000
+        sizes[rung.name] = total / len(frames)
+        print(f"  {rung.name:<7} q{rung.quality} x{rung.scale} {rung.fps}fps: "
+              f"{sizes[rung.name] / 1024:6.1f} KB, encode {ms:.2f} ms, "
+              f"{sizes[rung.name] * rung.fps / 1024:6.0f} KB/s")
+
+    print("Simulasi link (60 detik, source 30 fps):")
+    for kbps in (1000, 300, 150, 60, 25):
+        name, fps = simulate(sizes, kbps * 1024)
+        print(f"  {kbps:5d} KB/s → {name:<7} {fps:.1f} fps")
@@ -0,0 +1,362 @@
+"""
+Recorder write-behind untuk video + CSV
+=======================================
+
+Script rekam (333.py, 1.py, gamma_correction.py) dulu memanggil
+writer.write() (encode mp4v) dan writerow() + f.flush() di loop capture
+untuk setiap frame. Di SD card Pi itu kadang macet ratusan ms, frame
+jadi drop dan offset yang tercatat salah.
+
+Di sini tiap output punya thread writer sendiri dengan queue terbatas:
+- loop capture cuma put() (copy frame, tidak pernah menunggu disk)
+- queue penuh → item di-drop dan dihitung (backpressure kelihatan di stats)
+- baris CSV ditulis per batch, flush + fsync tiap `fsync_interval` detik
+- close() menunggu semua queue habis lalu release / fsync terakhir
+- batch yang gagal ditulis (record rusak, disk error) dihitung di stats
+  sebagai `errors`, thread tetap jalan; close() tidak pernah macet
+
+Cara pakai:
+    rec = Recorder()
+    rec.add_video("lane", "lane.mp4", fps=30, size=(640, 480))
+    rec.add_csv("log", "log.csv", ["timestamp", "lux", "gamma"])
+    rec.add_telemetry("tlog", "log.tlog", [("lux", "f4"), ("gamma", "f4")])
+    ... per frame:
+    rec.write("lane", hasil)
+    rec.row("log", [time.time(), lux, gamma])
+    rec.row("tlog", [lux, gamma])   # biner, lihat telemetry_log.py
+    ...
+    rec.close()          # print ringkasan written / dropped per output
+
+Benchmark loop capture: tulis inline vs recorder:
+    python recorder.py
+"""
+
+import abc
+import csv
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from capture_file import CaptureWriter
+from telemetry_log import TelemetryLog
+
+_STOP = object()
+
+
+class _WriterThread(abc.ABC):
+    """Satu output = satu thread + satu queue terbatas"""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.max_write_ms = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"rec-{name}")
+        self._thread.start()
+
+    def put(self, item):
+        """Non-blocking: False (dan dihitung drop) kalau writer ketinggalan"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        selesai = False
+        while not selesai:
+            batch = [self.queue.get()]
+            # ambil semua yang sudah antri, tulis sekaligus
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            # cek identitas (bukan ==, item bisa array numpy)
+            for i, item in enumerate(batch):
+                if item is _STOP:
+                    del batch[i:]
+                    selesai = True
+                    break
+            if batch:
+                t0 = time.perf_counter()
+                try:
+                    ok = self._write_batch(batch)
+                    self.written += len(batch) if ok is None else ok
+                except Exception as e:
+                    self._error(e)
+                self.max_write_ms = max(self.max_write_ms, (time.perf_counter() - t0) * 1000)
+            try:
+                self._tick()
+            except Exception as e:
+                self._error(e)
+        try:
+            self._close()
+        except Exception as e:
+            self._error(e)
+
+    def _error(self, e):
+        """Satu batch gagal: catat, lanjut drain (thread tidak boleh mati diam-diam)"""
+        self.errors += 1
+        self.last_error = f"{type(e).__name__}: {e}"
+        if self.errors == 1:
+            print(f"[REC] {self.name}: gagal menulis ({self.last_error}), lanjut")
+
+    @abc.abstractmethod
+    def _write_batch(self, batch):
+        """Tulis list item (urut sesuai put). Return jumlah yang tertulis (None = semua)"""
+
+    def _each(self, batch, write):
+        """Tulis per item: item yang gagal dihitung error, sisa batch tetap ditulis"""
+        ok = 0
+        for item in batch:
+            try:
+                write(item)
+                ok += 1
+            except Exception as e:
+                self._error(e)
+        return ok
+
+    def _tick(self):
+        pass
+
+    def _close(self):
+        pass
+
+    def close(self, timeout=5.0):
+        """
+        Tunggu queue habis lalu tutup. Tidak pernah blok selamanya: kalau
+        thread sudah mati atau macet lebih dari `timeout` detik, menyerah.
+        """
+        deadline = time.monotonic() + timeout
+        # _STOP tidak boleh ikut di-drop, tapi put juga tidak boleh blok selamanya
+        while self._thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    break
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        return not self._thread.is_alive()
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queue": self.queue.qsize(),
+            "max_write_ms": round(self.max_write_ms, 1),
+        }
+
+
+class VideoOutput(_WriterThread):
+    """cv2.VideoWriter di thread sendiri (encode mp4v tidak di loop capture)"""
+
+    def __init__(self, name, path, fps, size, fourcc="mp4v", maxsize=30):
+        self.path = path
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        super().__init__(name, maxsize)
+
+    def _write_batch(self, batch):
+        return self._each(batch, self.writer.write)
+
+    def _close(self):
+        self.writer.release()
+
+
+class CsvOutput(_WriterThread):
+    """csv.writer per batch + flush/fsync berkala (bukan flush per baris)"""
+
+    def __init__(self, name, path, header=None, fsync_interval=1.0, maxsize=10000):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "w", newline="")
+        self._csv = csv.writer(self._file)
+        if header:
+            self._csv.writerow(header)
+        self._last_sync = time.monotonic()
+        super().__init__(name, maxsize)
+
+    def _write_batch(self, batch):
+        self._csv.writerows(batch)
+
+    def _tick(self):
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_interval:
+            self._sync()
+            self._last_sync = now
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _close(self):
+        self._sync()
+        self._file.close()
+
+
+class TelemetryOutput(_WriterThread):
+    """
+    Log biner .tlog (telemetry_log.py). Record di-pack + di-stempel
+    frame_id / t_ns saat row() dipanggil (di loop capture), ditulis per batch.
+    """
+
+    def __init__(self, name, path, fields, fsync_interval=1.0, maxsize=10000, meta=None):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.log = TelemetryLog(path, fields, meta)
+        self._last_sync = time.monotonic()
+        super().__init__(name, maxsize)
+
+    def put(self, item):
+        return super().put(self.log.pack(item))
+
+    def _write_batch(self, batch):
+        self.log.write(b"".join(batch))
+
+    def _tick(self):
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_interval:
+            self.log.flush(sync=True)
+            self._last_sync = now
+
+    def _close(self):
+        self.log.close()
+
+
+class CaptureOutput(_WriterThread):
+    """Rekaman capture_file.py (frame mentah / PNG + lux + metadata kamera) di thread sendiri"""
+
+    def __init__(self, name, folder, frame_shape, codec="raw", camera=None, fields=(),
+                 fsync_interval=1.0, maxsize=30):
+        self.path = folder
+        self.fsync_interval = fsync_interval
+        self.writer = CaptureWriter(folder, frame_shape, codec, camera, fields)
+        self._last_sync = time.monotonic()
+        super().__init__(name, maxsize)
+
+    def _write_batch(self, batch):
+        return self._each(batch, lambda item: self.writer.write(item[0], **item[1]))
+
+    def _tick(self):
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_interval:
+            self.writer.flush(sync=True)
+            self._last_sync = now
+
+    def _close(self):
+        self.writer.close()
+
+
+class Recorder:
+    """Kumpulan output bernama; loop capture cuma write() / row()"""
+
+    def __init__(self):
+        self.outputs = {}
+
+    def add_video(self, name, path, fps, size, fourcc="mp4v", maxsize=30):
+        self.outputs[name] = VideoOutput(name, path, fps, size, fourcc, maxsize)
+        return self.outputs[name]
+
+    def add_csv(self, name, path, header=None, fsync_interval=1.0, maxsize=10000):
+        self.outputs[name] = CsvOutput(name, path, header, fsync_interval, maxsize)
+        return self.outputs[name]
+
+    def add_telemetry(self, name, path, fields, fsync_interval=1.0, maxsize=10000, meta=None):
+        self.outputs[name] = TelemetryOutput(name, path, fields, fsync_interval, maxsize, meta)
+        return self.outputs[name]
+
+    def add_capture(self, name, folder, frame_shape, codec="raw", camera=None, fields=(), maxsize=30):
+        self.outputs[name] = CaptureOutput(name, folder, frame_shape, codec, camera, fields, maxsize=maxsize)
+        return self.outputs[name]
+
+    def write(self, name, frame, copy=True):
+        """Antri frame video; copy=True karena caller biasanya menimpa frame berikutnya"""
+        return self.outputs[name].put(frame.copy() if copy else frame)
+
+    def capture(self, name, frame, copy=True, **record):
+        """Frame + record (frame_id, t_ns, lux, metadata, ...) untuk add_capture"""
+        return self.outputs[name].put((frame.copy() if copy else frame, record))
+
+    def row(self, name, values):
+        return self.outputs[name].put(list(values))
+
+    def stats(self):
+        return {name: out.stats() for name, out in self.outputs.items()}
+
+    def close(self, verbose=True, timeout=5.0):
+        """Tunggu semua writer selesai menulis isi queue (maks `timeout` detik per output)"""
+        macet = [name for name, out in self.outputs.items() if not out.close(timeout)]
+        if verbose:
+            for name, s in self.stats().items():
+                print(f"[REC] {name}: {s['written']} ditulis, {s['dropped']} drop "
+                      f"(backpressure), {s['errors']} gagal, tulis terlama {s['max_write_ms']} ms")
+                if s["errors"]:
+                    print(f"[REC] {name}: error terakhir {self.outputs[name].last_error}")
+            for name in macet:
+                print(f"[REC] {name}: writer tidak selesai dalam {timeout} s, ditinggal")
+
+
+# ===================== BENCHMARK =====================
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    n_frames = 300
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(4)]
+    out_dir = tempfile.mkdtemp()
+
+    def loop(tulis):
+        """Loop capture 30 fps; return waktu per iterasi (ms)"""
+        waktu = []
+        for i in range(n_frames):
+            t0 = time.perf_counter()
+            tulis(i, frames[i % len(frames)])
+            waktu.append((time.perf_counter() - t0) * 1000)
+            time.sleep(max(1 / 30 - (time.perf_counter() - t0), 0))
+        return np.array(waktu)
+
+    # Inline: seperti script lama (2 video + CSV flush per frame)
+    w_lane = cv2.VideoWriter(os.path.join(out_dir, "a.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 30, (640, 480))
+    w_bev = cv2.VideoWriter(os.path.join(out_dir, "b.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 30, (640, 480))
+    with open(os.path.join(out_dir, "a.csv"), "w", newline="") as f:
+        log = csv.writer(f)
+
+        def inline(i, frame):
+            w_lane.write(frame)
+            w_bev.write(frame)
+            log.writerow([i, time.time()])
+            f.flush()
+
+        inline_ms = loop(inline)
+    w_lane.release()
+    w_bev.release()
+
+    rec = Recorder()
+    rec.add_video("lane", os.path.join(out_dir, "c.mp4"), 30, (640, 480))
+    rec.add_video("bev", os.path.join(out_dir, "d.mp4"), 30, (640, 480))
+    rec.add_csv("log", os.path.join(out_dir, "b.csv"), ["frame", "time"])
+
+    def behind(i, frame):
+        rec.write("lane", frame)
+        rec.write("bev", frame)
+        rec.row("log", [i, time.time()])
+
+    behind_ms = loop(behind)
+    rec.close()
+    shutil.rmtree(out_dir)
+
+    for nama, ms in (("inline", inline_ms), ("recorder", behind_ms)):
+        print(f"  {nama:<9}: loop {ms.mean():.2f} ms rata-rata, p99 {np.percentile(ms, 99):.2f} ms, "
+              f"max {ms.max():.2f} ms")
@@ -0,0 +1,294 @@
+"""
+Shared-memory frame pool antar proses
+=====================================
+
+Kalau capture, deteksi dan encode dipisah ke proses berbeda, frame
+640x360x3 yang di-pickle lewat multiprocessing.Queue jadi mahal. Di sini
+semua frame tinggal di satu blok `multiprocessing.shared_memory` yang
+dibagi jadi slot ukuran tetap. Yang lewat queue cuma FrameHandle kecil
+(slot, frame_id, timestamp, shape).
+
+Tiap slot punya refcount. Producer menulis frame dengan jumlah consumer
+(mis. mask stream + detection stream + recorder = 3), tiap consumer
+release() setelah selesai. Slot baru dipakai ulang setelah semua consumer
+melepasnya.
+
+Cara pakai:
+    pool = SharedFramePool(slots=8, frame_shape=(360, 640, 3))
+    # producer
+    handle = pool.write(frame, frame_id, refs=2)   # None kalau pool penuh
+    q_mask.put(handle); q_detect.put(handle)
+    # consumer (proses lain, pool dikirim sebagai argumen Process)
+    frame = pool.view(handle)                      # zero-copy, jangan ditulis
+    ...
+    pool.release(handle)
+    # selesai (proses pembuat)
+    pool.close(); pool.unlink()
+
+    # satu consumer process (mis. capture_file.record_shared di stream_server --record)
+    sink = SharedFrameSink(record_shared, args=("capture/jalan1", (360, 640, 3))).start()
+    sink.send(frame, frame_id, timestamp, lux=lux)  # False kalau consumer ketinggalan
+    sink.close()
+
+Benchmark vs multiprocessing.Queue biasa:
+    python shm_frames.py
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Pesan kecil yang lewat queue, bukan frame-nya
+FrameHandle = namedtuple("FrameHandle", ["slot", "frame_id", "timestamp", "shape"])
+
+
+def _attach_pool(name, lock, slots, frame_shape, dtype):
+    return SharedFramePool(slots, frame_shape, dtype, _attach=(name, lock))
+
+
+class SharedFramePool:
+    """
+    `slots` buffer frame di shared memory + refcount per slot (int64 di awal blok).
+    Objek ini boleh dikirim ke proses lain sebagai argumen Process.
+    """
+    def __init__(self, slots=8, frame_shape=(360, 640, 3), dtype=np.uint8, context=None,
+                 _attach=None):
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        header = -(-slots * 8 // 64) * 64   # refcount, dibulatkan ke 64 byte
+
+        if _attach is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=header + slots * self.slot_bytes)
+            # lock harus dari context yang sama dengan Process consumer-nya
+            self._lock = mp.get_context(context).Lock()
+            self.owner = True
+        else:
+            name, self._lock = _attach
+            self._shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        self._refs = np.ndarray((slots,), np.int64, buffer=self._shm.buf)
+        self._frames = np.ndarray(
+            (slots,) + self.frame_shape, self.dtype, buffer=self._shm.buf, offset=header
+        )
+        if self.owner:
+            self._refs[:] = 0
+        self._next = 0
+        self.dropped = 0
+
+    def __reduce__(self):
+        return _attach_pool, (self._shm.name, self._lock, self.slots,
+                              self.frame_shape, self.dtype.str)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def acquire(self, refs=1, timeout=0.0):
+        """
+        Ambil slot kosong dan set refcount = refs.
+        Returns: index slot, atau None kalau semua slot masih dipakai sampai timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                for i in range(self.slots):
+                    idx = (self._next + i) % self.slots
+                    if self._refs[idx] == 0:
+                        self._refs[idx] = refs
+                        self._next = idx + 1
+                        return idx
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.0005)
+
+    def write(self, frame, frame_id, timestamp=None, refs=1, timeout=0.0):
+        """
+        Copy frame ke slot kosong (satu-satunya copy di seluruh jalur).
+        Frame boleh lebih kecil dari slot, dtype harus sama (ValueError kalau tidak).
+        Returns: FrameHandle, atau None (frame di-drop) kalau pool penuh.
+        """
+        shape = frame.shape
+        if frame.dtype != self.dtype or len(shape) != len(self.frame_shape) or any(
+                n > m for n, m in zip(shape, self.frame_shape)):
+            raise ValueError(f"frame {shape} {frame.dtype} tidak muat di slot "
+                             f"{self.frame_shape} {self.dtype}")
+        idx = self.acquire(refs, timeout)
+        if idx is None:
+            self.dropped += 1
+            return None
+        self._frames[idx][tuple(slice(0, n) for n in shape)] = frame
+        if timestamp is None:
+            timestamp = time.time()
+        return FrameHandle(idx, frame_id, timestamp, shape)
+
+    def view(self, handle):
+        """Array numpy yang menunjuk langsung ke slot (tanpa copy)"""
+        return self._frames[handle.slot][tuple(slice(0, n) for n in handle.shape)]
+
+    def release(self, handle):
+        """Consumer selesai dengan frame ini; slot bebas kalau refcount jadi 0"""
+        with self._lock:
+            if self._refs[handle.slot] > 0:
+                self._refs[handle.slot] -= 1
+
+    def in_use(self):
+        with self._lock:
+            return int(np.count_nonzero(self._refs))
+
+    def close(self):
+        # view numpy harus dilepas dulu sebelum buffer shared memory ditutup
+        self._refs = None
+        self._frames = None
+        self._shm.close()
+
+    def unlink(self):
+        if self.owner:
+            self._shm.unlink()
+
+
+class SharedFrameSink:
+    """
+    Satu consumer process yang menerima frame lewat pool: send() cuma copy
+    ke slot + put handle (non-blocking). Pool / queue penuh → frame di-drop
+    dan dihitung, loop capture tidak pernah menunggu consumer.
+
+    target(pool, handles, *args) jalan di proses baru; tiap item queue
+    (FrameHandle, dict extra), None = selesai. target wajib release(handle).
+    context "spawn" menjalankan ulang top-level script pembuat (kalau script
+    itu langsung buka kamera, pakai "fork" dan start() sebelum ada thread).
+    """
+    def __init__(self, target, args=(), slots=8, frame_shape=(360, 640, 3),
+                 dtype=np.uint8, maxsize=None, name="shm-consumer", context="spawn"):
+        ctx = mp.get_context(context)
+        self.pool = SharedFramePool(slots, frame_shape, dtype, context)
+        # queue tidak lebih panjang dari slot: handle di queue selalu punya slot
+        self.handles = ctx.Queue(maxsize or slots)
+        self.process = ctx.Process(target=target, args=(self.pool, self.handles) + tuple(args),
+                                   daemon=True, name=name)
+        self.sent = 0
+        self.dropped = 0
+
+    def start(self):
+        self.process.start()
+        return self
+
+    def send(self, frame, frame_id, timestamp=None, **extra):
+        handle = self.pool.write(frame, frame_id, timestamp)
+        if handle is None:
+            self.dropped += 1
+            return False
+        try:
+            self.handles.put_nowait((handle, extra))
+        except queue.Full:
+            self.pool.release(handle)
+            self.dropped += 1
+            return False
+        self.sent += 1
+        return True
+
+    def stats(self):
+        return {"sent": self.sent, "dropped": self.dropped, "in_use": self.pool.in_use(),
+                "alive": self.process.is_alive()}
+
+    def close(self, timeout=10.0):
+        """Kirim tanda selesai, tunggu consumer, lalu hapus shared memory"""
+        if self.process.is_alive():
+            try:
+                self.handles.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.pool.close()
+        self.pool.unlink()
+
+
+# ===================== BENCHMARK =====================
+
+def _consumer_queue(q, done):
+    n = 0
+    total = 0.0
+    while True:
+        item = q.get()
+        if item is None:
+            break
+        frame, ts = item
+        int(frame[::8, ::8, 1].sum())
+        total += time.time() - ts
+        n += 1
+    done.put((n, total))
+
+
+def _consumer_shm(pool, q, done):
+    n = 0
+    total = 0.0
+    while True:
+        handle = q.get()
+        if handle is None:
+            break
+        frame = pool.view(handle)
+        int(frame[::8, ::8, 1].sum())
+        total += time.time() - handle.timestamp
+        pool.release(handle)
+        n += 1
+    done.put((n, total))
+    pool.close()
+
+
+def _run(mode, frames, n_frames, n_consumers):
+    queues = [mp.Queue(maxsize=4) for _ in range(n_consumers)]
+    done = mp.Queue()
+    pool = None
+    if mode == "shm":
+        pool = SharedFramePool(slots=8, frame_shape=frames[0].shape)
+        procs = [mp.Process(target=_consumer_shm, args=(pool, q, done)) for q in queues]
+    else:
+        procs = [mp.Process(target=_consumer_queue, args=(q, done)) for q in queues]
+    for p in procs:
+        p.start()
+
+    t0 = time.perf_counter()
+    for i in range(n_frames):
+        frame = frames[i % len(frames)]
+        if mode == "shm":
+            handle = pool.write(frame, i, refs=n_consumers, timeout=5.0)
+            for q in queues:
+                q.put(handle)
+        else:
+            ts = time.time()
+            for q in queues:
+                q.put((frame, ts))
+    for q in queues:
+        q.put(None)
+    hasil = [done.get() for _ in procs]
+    elapsed = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+    if pool is not None:
+        pool.close()
+        pool.unlink()
+
+    received = sum(n for n, _ in hasil)
+    latency = sum(t for _, t in hasil) / max(received, 1) * 1000
+    return n_frames / elapsed, latency, received
+
+
+if __name__ == "__main__":
+    n_frames = 600
+    n_consumers = 2
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (360, 640, 3), dtype=np.uint8) for _ in range(4)]
+
+    print(f"{n_frames} frame 640x360x3 ke {n_consumers} consumer process")
+    for mode in ("queue", "shm"):
+        fps, latency, received = _run(mode, frames, n_frames, n_consumers)
+        print(f"  {mode:<6}: {fps:7.1f} frame/s, latency rata-rata {latency:.2f} ms "
+              f"({received} frame diterima)")
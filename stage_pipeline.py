@@ -0,0 +1,264 @@
+"""
+Stage pipeline: capture → gamma/BEV → detect → encode paralel
+=============================================================
+
+Tiap stage jalan di thread sendiri (fungsi OpenCV melepas GIL, jadi
+stage benar-benar jalan bersamaan di core berbeda), antar stage ada
+queue terbatas. Throughput mendekati stage paling lambat, bukan jumlah
+semua stage. Urutan frame tetap dijaga walau satu stage punya beberapa
+worker.
+
+Cara pakai:
+    pipeline = StagePipeline([
+        Stage("capture", lambda: capture.read()),     # stage pertama: tanpa input
+        Stage("prepare", prepare, workers=2),
+        Stage("detect", detect),
+        Stage("encode", encode),                      # hasil stage terakhir dibuang
+    ]).start()
+    pipeline.stats()    # utilisasi per stage → stage dengan util ~1.0 = bottleneck
+
+Fungsi stage boleh return None untuk membuang item (mis. timeout kamera).
+
+Benchmark serial vs pipeline (workload sintetis mirip stream_server):
+    python stage_pipeline.py
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Penanda item yang dibuang, tetap diteruskan supaya urutan tidak macet
+_SKIP = object()
+
+
+class Stage:
+    """
+    Satu stage pipeline.
+    - fn         : fungsi(item) -> item baru / None; stage pertama fn() tanpa argumen
+    - workers    : jumlah thread; >1 cuma untuk stage tanpa state antar frame
+    - queue_size : kapasitas queue input stage ini
+    """
+    def __init__(self, name, fn, workers=1, queue_size=2):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self.inbox = None
+        self.busy = 0.0
+        self.items = 0
+        self.errors = 0
+        # _lock cuma untuk statistik, jangan dipegang selama put yang bisa blok
+        self._lock = threading.Lock()
+
+        # Reorder buffer untuk worker > 1: seq -> item. _emit_lock dipegang
+        # selama put ke stage berikutnya supaya urutan terjaga
+        self._emit_lock = threading.Lock()
+        self._pending = {}
+        self._next_seq = 0
+
+    def _account(self, elapsed, error=False):
+        with self._lock:
+            self.busy += elapsed
+            self.items += 1
+            if error:
+                self.errors += 1
+
+
+class StagePipeline:
+    """Rangkaian Stage dengan queue terbatas dan urutan frame terjaga"""
+
+    def __init__(self, stages):
+        if not stages:
+            raise ValueError("StagePipeline butuh minimal satu stage")
+        self.stages = stages
+        for stage in stages[1:]:
+            stage.inbox = queue.Queue(maxsize=stage.queue_size)
+        self._threads = []
+        self._running = False
+        self._started_at = 0.0
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._started_at = time.perf_counter()
+        for i, stage in enumerate(self.stages):
+            target = self._run_source if i == 0 else self._run_stage
+            for w in range(stage.workers if i > 0 else 1):
+                t = threading.Thread(
+                    target=target, args=(i,), daemon=True, name=f"{stage.name}-{w}"
+                )
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._running = False
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+
+    def _put(self, q, entry):
+        """put yang tetap bisa berhenti kalau pipeline di-stop"""
+        while self._running:
+            try:
+                q.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _emit(self, index, seq, item):
+        """Teruskan hasil stage ke stage berikutnya, urut berdasarkan seq"""
+        if index + 1 >= len(self.stages):
+            return
+        stage = self.stages[index]
+        out = self.stages[index + 1].inbox
+        if stage.workers == 1:
+            self._put(out, (seq, item))
+            return
+        with stage._emit_lock:
+            stage._pending[seq] = item
+            siap = []
+            while stage._next_seq in stage._pending:
+                siap.append((stage._next_seq, stage._pending.pop(stage._next_seq)))
+                stage._next_seq += 1
+            # put di dalam _emit_lock supaya dua worker tidak saling menyalip;
+            # stats() tetap jalan walau put menunggu queue penuh
+            for entry in siap:
+                self._put(out, entry)
+
+    def _call(self, stage, *args):
+        t0 = time.perf_counter()
+        error = False
+        try:
+            result = stage.fn(*args)
+        except Exception as e:
+            error = True
+            print(f"Error di stage {stage.name}: {e}")
+            result = None
+        stage._account(time.perf_counter() - t0, error)
+        return _SKIP if result is None else result
+
+    def _run_source(self, index):
+        stage = self.stages[index]
+        seq = 0
+        while self._running:
+            item = self._call(stage)
+            if item is _SKIP:
+                continue
+            self._emit(index, seq, item)
+            seq += 1
+
+    def _run_stage(self, index):
+        stage = self.stages[index]
+        while self._running:
+            try:
+                seq, item = stage.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not _SKIP:
+                item = self._call(stage, item)
+            self._emit(index, seq, item)
+
+    def stats(self):
+        """
+        Per stage: util (fraksi waktu worker sibuk), ms per item, jumlah item,
+        isi queue input. Stage dengan util tertinggi = bottleneck.
+        """
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        hasil = {}
+        for stage in self.stages:
+            with stage._lock:
+                busy, items, errors = stage.busy, stage.items, stage.errors
+            hasil[stage.name] = {
+                "util": round(busy / (elapsed * stage.workers), 3),
+                "ms": round(busy / items * 1000, 2) if items else 0.0,
+                "items": items,
+                "errors": errors,
+                "queue": stage.inbox.qsize() if stage.inbox is not None else 0,
+            }
+        return hasil
+
+    def bottleneck(self):
+        stats = self.stats()
+        return max(stats, key=lambda name: stats[name]["util"])
+
+
+# ===================== BENCHMARK =====================
+
+def _workload(width=640, height=360):
+    """Empat fungsi stage sintetis dengan operasi OpenCV yang sama seperti stream_server"""
+    from bev_geometry import BevGeometry
+    from gamma_lut import apply_gamma, FoldedWhiteThreshold
+
+    geometry = BevGeometry(width, height)
+    white = FoldedWhiteThreshold([0, 0, 200], [180, 70, 255])
+    kernel = np.ones((5, 5), np.uint8)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(8)]
+    counter = iter(range(10 ** 9))
+
+    def capture():
+        return frames[next(counter) % len(frames)]
+
+    def prepare(frame):
+        mask = geometry.warp(white.mask(geometry.crop(frame), 1.3), nearest=True, cropped=True)
+        return frame, mask, geometry.warp(frame)
+
+    def detect(item):
+        frame, mask, bev = item
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        hasil = apply_gamma(bev, 1.3)
+        cv2.drawContours(hasil, contours, -1, (0, 255, 0), -1)
+        return hasil, mask
+
+    def encode(item):
+        hasil, mask = item
+        cv2.imencode('.jpg', hasil, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        cv2.imencode('.jpg', mask, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return True
+
+    return capture, prepare, detect, encode
+
+
+if __name__ == "__main__":
+    cv2.setNumThreads(1)  # satu core per stage, supaya perbandingannya adil
+    capture, prepare, detect, encode = _workload()
+    durasi = 3.0
+
+    n = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < durasi:
+        encode(detect(prepare(capture())))
+        n += 1
+    fps_serial = n / (time.perf_counter() - t0)
+
+    selesai = [0]
+
+    def encode_count(item):
+        encode(item)
+        selesai[0] += 1
+        return True
+
+    pipeline = StagePipeline([
+        Stage("capture", capture),
+        Stage("prepare", prepare),
+        Stage("detect", detect),
+        Stage("encode", encode_count),
+    ]).start()
+    time.sleep(durasi)
+    fps_pipeline = selesai[0] / durasi
+    stats = pipeline.stats()
+    bottleneck = pipeline.bottleneck()
+    pipeline.stop()
+
+    print(f"serial   : {fps_serial:.1f} fps")
+    print(f"pipeline : {fps_pipeline:.1f} fps  ({fps_pipeline / fps_serial:.2f}x)")
+    for name, s in stats.items():
+        print(f"  {name:<8} util {s['util']:.2f}  {s['ms']:.2f} ms/item  queue {s['queue']}")
+    print(f"bottleneck: {bottleneck}")
@@ -12,312 +12,365 @@ Cara pakai:
 1. Copy file ini ke Raspberry Pi (folder /home/pi/capstone/)
 2. Install dependencies: pip install flask opencv-python
 3. Jalankan: python stream_server.py
+   (--mask-first kalau viewer cuma /mask_feed atau overlay, tanpa
+   gambar BEV beranotasi: threshold dulu, warp cuma mask 1 channel)
 4. Akses dari browser: http://<IP_PI>:5000/video_feed
 """
 
-from flask import Flask, Response, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import cv2
-import numpy as np
+import atexit
+import contextlib
+import json
+import sys
+import threading
 import time
-from picamera2 import Picamera2
-import board
-import busio
-import adafruit_tsl2591
+
+from lane_detector import LaneDetector, latest_data
+from frame_buffers import BufferPoolRing
+from frame_hub import FrameHub, HubFrame, CpuMeter
+from stage_pipeline import StagePipeline, Stage
+from async_stream import AsyncStreamServer
+from quality_ladder import make_quality
+from mask_codec import MaskEncoder
+from blackbox import BlackBox
+from shm_frames import SharedFrameSink
+from capture_file import record_shared
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS untuk akses dari Next.js
 
-# ============ GLOBAL VARIABLES ============
-# Untuk store latest detection results
-latest_data = {
-    "offset": 0,
-    "arah": "N/A",
-    "gamma": 1.0,
-    "lux": 0.0,
-    "brightness": 0.0,
-    "fps": 0.0,
-    "timestamp": time.time()
+# Statistik producer (untuk bukti CPU flat walau viewer bertambah)
+pipeline_stats = {
+    "frames": 0,
+    "process_ms": 0.0,
+    "cpu_percent": 0.0
 }
 
-# ============ LANE DETECTION CLASS ============
-class LaneDetector:
+# Rekam (--record DIR): frame mentah + lux + metadata kamera ke folder
+# capture_file.py, ditulis proses lain. Frame lewat shared memory
+# (shm_frames), yang di-pickle cuma handle kecil. Proses dibuat dengan fork
+# sebelum detector (kamera + thread) ada, supaya script ini tidak
+# dijalankan ulang di proses perekam.
+recorder_sink = None
+if "--record" in sys.argv:
+    record_dir = sys.argv[sys.argv.index("--record") + 1]
+    recorder_sink = SharedFrameSink(
+        record_shared, args=(record_dir, (360, 640, 3)), slots=16,
+        frame_shape=(360, 640, 3), name="recorder", context="fork"
+    ).start()
+    atexit.register(recorder_sink.close)
+
+# ============ INITIALIZE DETECTOR ============
+print("Initializing Lane Detector...")
+detector = LaneDetector(mask_first="--mask-first" in sys.argv)
+print("Lane Detector ready!")
+
+# Satu producer, banyak viewer
+hub = FrameHub()
+# Telemetry per frame (dict), di-push ke client /api/events
+telemetry = FrameHub()
+cpu_meter = CpuMeter()
+
+# Black box (--blackbox): 10 detik frame mentah terakhir di ring /dev/shm,
+# di-dump ke blackbox/ saat garis hilang 15 frame, |offset| > 150 px,
+# atau POST /api/blackbox/trigger
+blackbox = None
+if "--blackbox" in sys.argv:
+    blackbox = BlackBox(seconds=10, fps=30,
+                        frame_shape=(detector.frame_height, detector.frame_width, 3),
+                        offset_threshold=150, lost_frames=15)
+
+# ============ PRODUCER THREAD ============
+
+# True: capture → prepare (gamma/BEV) → detect → encode di thread terpisah
+# dengan queue terbatas; False: satu loop serial seperti sebelumnya
+STAGED_PIPELINE = True
+
+_fps_state = {"start": time.time(), "count": 0}
+
+def _record_frame(process_ms):
+    """Update FPS + statistik producer setelah satu frame di-publish"""
+    _fps_state["count"] += 1
+    pipeline_stats["frames"] += 1
+    pipeline_stats["process_ms"] = round(
+        0.9 * pipeline_stats["process_ms"] + 0.1 * process_ms, 2
+    )
+    if _fps_state["count"] >= 30:
+        fps = _fps_state["count"] / (time.time() - _fps_state["start"])
+        latest_data["fps"] = round(fps, 1)
+        pipeline_stats["cpu_percent"] = cpu_meter.sample()
+        _fps_state["count"] = 0
+        _fps_state["start"] = time.time()
+
+def _publish_telemetry(frame_id, capture_ts, t0):
+    """Snapshot latest_data untuk frame ini, di-push ke semua client SSE"""
+    data = dict(latest_data)
+    now = time.time()
+    data.update({
+        "frame_id": frame_id,
+        "capture_ts": capture_ts,
+        "publish_ts": now,
+        "latency_ms": round((time.perf_counter() - t0) * 1000, 2),
+        "age_ms": round((now - capture_ts) * 1000, 2)
+    })
+    if detector.overlay is not None:
+        data["overlay"] = detector.overlay
+    if blackbox is not None:
+        blackbox.observe(frame_id, data)
+    telemetry.publish(data)
+    return data
+
+def _share_frame(captured):
+    """Frame ke consumer process (recorder) lewat shared memory, non-blocking"""
+    if recorder_sink is None:
+        return
+    lux = detector.lux_sampler.read()
+    metadata = captured.metadata or {}
+    recorder_sink.send(
+        captured.image, captured.frame_id, captured.wall_time,
+        t_ns=captured.sensor_ts, lux=lux.lux, lux_stale=lux.stale,
+        metadata={k: metadata[k] for k in ("ExposureTime", "AnalogueGain", "ColourTemperature")
+                  if k in metadata}
+    )
+
+def detection_loop():
     """
-    Extract dari core_vision_live.py
-    Simplified untuk streaming
+    Satu-satunya loop capture + detect.
+    Hasilnya di-publish ke hub, semua client /video_feed baca dari situ.
+    Variant yang tidak ditonton siapa pun tidak digambar dan tidak di-encode.
     """
-    def __init__(self):
-        self.frame_width = 640
-        self.frame_height = 360
-        
-        # Setup TSL2591 sensor
+    while True:
         try:
-            i2c = busio.I2C(board.SCL, board.SDA)
-            self.tsl = adafruit_tsl2591.TSL2591(i2c)
-            self.tsl.integration_time = adafruit_tsl2591.INTEGRATIONTIME_300MS
-            self.tsl.gain = adafruit_tsl2591.GAIN_MED
-            self.has_tsl = True
-        except:
-            print("TSL2591 sensor not found, using default lux")
-            self.has_tsl = False
-        
-        # Setup PiCamera2
-        self.picam2 = Picamera2()
-        config = self.picam2.create_preview_configuration(
-            main={"size": (self.frame_width, self.frame_height)}
-        )
-        self.picam2.configure(config)
-        self.picam2.start()
-        time.sleep(0.3)
-        
-        # BEV Transform
-        self.src_points = np.float32([
-            [0, self.frame_height],
-            [self.frame_width, self.frame_height],
-            [int(self.frame_width * 0.2), int(self.frame_height * 0.3)],
-            [int(self.frame_width * 0.8), int(self.frame_height * 0.3)]
-        ])
-        
-        self.dst_points = np.float32([
-            [0, self.frame_height],
-            [self.frame_width, self.frame_height],
-            [0, 0],
-            [self.frame_width, 0]
-        ])
-        
-        self.M_bev = cv2.getPerspectiveTransform(self.src_points, self.dst_points)
-        
-        # Detection parameters
-        self.lower_white = np.array([0, 0, 200], dtype=np.uint8)
-        self.upper_white = np.array([180, 70, 255], dtype=np.uint8)
-        self.kernel = np.ones((5, 5), np.uint8)
-    
-    def fuzzy_gamma(self, lux, brightness):
-        """Calculate optimal gamma correction"""
-        L = np.clip(lux / 1500.0, 0, 1)
-        B = np.clip(brightness / 100.0, 0, 1)
-        
-        dark = 1 - L
-        bright = L
-        too_dark = (dark ** 1.7) * (1 - B)
-        too_bright = bright * B
-        normal = 1 - np.abs(L - B)
-        
-        gamma = (2.2 * too_dark + 1.0 * normal + 0.4 * too_bright) / (
-            too_dark + normal + too_bright + 1e-6
-        )
-        
-        if L < 0.15:
-            gamma *= 1.3
-        
-        return float(np.clip(gamma, 0.4, 2.5))
-    
-    def measure_brightness(self, frame_bgr):
-        """Measure average brightness"""
-        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
-        return float(np.mean(gray))
-    
-    def apply_gamma(self, frame_bgr, gamma):
-        """Apply gamma correction"""
-        inv = 1.0 / gamma
-        lut = np.array(
-            [((i / 255.0) ** inv) * 255 for i in np.arange(256)],
-            dtype="uint8"
-        )
-        return cv2.LUT(frame_bgr, lut)
-    
-    def detect_lane(self, frame_bgr):
-        """
-        Main detection function
-        Returns: annotated frame (BGR), offset (int), direction (str)
-        """
-        # Get lux from sensor
-        if self.has_tsl:
-            lux = self.tsl.lux or 0.0
-        else:
-            lux = 500.0  # default
-        
-        # Brightness and gamma correction
-        brightness = self.measure_brightness(frame_bgr)
-        gamma = self.fuzzy_gamma(lux, brightness)
-        corrected = self.apply_gamma(frame_bgr, gamma)
-        
-        # Bird Eye View transform
-        frame_bev = cv2.warpPerspective(
-            corrected, self.M_bev,
-            (self.frame_width, self.frame_height)
-        )
-        
-        # White lane detection
-        hsv = cv2.cvtColor(frame_bev, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, self.lower_white, self.upper_white)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
-        
-        # Find contours
-        contours, _ = cv2.findContours(
-            mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
-        )
-        
-        # Annotate frame
-        hasil = frame_bev.copy()
-        height, width = self.frame_height, self.frame_width
-        center_frame = width // 2
-        
-        # Draw center line
-        cv2.line(hasil, (center_frame, 0), (center_frame, height), (0, 255, 255), 2)
-        
-        # Process contours
-        kiri_contours = []
-        tengah_contours = []
-        kanan_contours = []
-        
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 300:
-                M = cv2.moments(contour)
-                if M["m00"] != 0:
-                    cx = int(M["m10"] / M["m00"])
-                    if cx < width * 0.33:
-                        kiri_contours.append(contour)
-                    elif cx < width * 0.67:
-                        tengah_contours.append(contour)
-                    else:
-                        kanan_contours.append(contour)
-                cv2.drawContours(hasil, [contour], -1, (0, 255, 0), -1)
-        
-        # Calculate offset
-        pos_tengah = self._hitung_posisi(tengah_contours)
-        pos_kiri = self._hitung_posisi(kiri_contours)
-        pos_kanan = self._hitung_posisi(kanan_contours)
-        
-        pos_referensi = None
-        if pos_tengah is not None:
-            pos_referensi = pos_tengah
-        elif pos_kiri is not None and pos_kanan is not None:
-            pos_referensi = (pos_kiri + pos_kanan) // 2
-        
-        offset = 0
-        arah = "N/A"
-        
-        if pos_referensi is not None:
-            offset = center_frame - pos_referensi
+            t0 = time.perf_counter()
+            captured = detector.capture.read()
+            if captured is None:
+                raise RuntimeError("Kamera tidak mengirim frame")
+            if blackbox is not None:
+                blackbox.push(captured.image, captured.frame_id, captured.wall_time, captured.sensor_ts)
+            _share_frame(captured)
+            views, offset, arah = detector.detect_lane(captured.image, hub.wanted_variants())
+            meta = _publish_telemetry(captured.frame_id, captured.wall_time, t0)
             
-            if offset > 5:
-                arah = "KIRI"
-                warna = (0, 165, 255)
-            elif offset < -5:
-                arah = "KANAN"
-                warna = (0, 165, 255)
-            else:
-                arah = "TENGAH"
-                warna = (0, 255, 0)
+            frame = HubFrame(views, meta)
+            if detector.buffers is not None:
+                # gambar ada di buffer detector yang ditimpa frame berikutnya
+                frame.freeze(hub.wanted_variants("jpeg"), hub.wanted_rungs(),
+                             hub.wanted_variants("mask"))
+            # Kalau tidak, encode JPEG dilakukan lazy oleh client (cache per frame id)
+            hub.publish(frame)
+            _record_frame((time.perf_counter() - t0) * 1000)
             
-            # Draw arrow
-            if abs(offset) > 5:
-                arrow_start = (center_frame, height - 60)
-                arrow_end = (pos_referensi, height - 60)
-                cv2.arrowedLine(hasil, arrow_start, arrow_end, warna, 3, tipLength=0.3)
-            
-            # Draw offset text
-            offset_text = f"Offset: {abs(offset)}px {arah}"
-            cv2.putText(hasil, offset_text, (10, height - 20),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, warna, 2)
-        
-        # Draw info overlay
-        info_text = f"Lux:{lux:.1f} Gamma:{gamma:.2f} Bright:{brightness:.1f}"
-        cv2.putText(hasil, info_text, (10, 30),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        
-        # Update global data
-        global latest_data
-        latest_data.update({
-            "offset": int(offset),
-            "arah": arah,
-            "gamma": round(gamma, 2),
-            "lux": round(lux, 1),
-            "brightness": round(brightness, 1),
-            "timestamp": time.time()
-        })
-        
-        return hasil, offset, arah
-    
-    def _hitung_posisi(self, contours_list):
-        """Calculate average x position of contours"""
-        if len(contours_list) == 0:
-            return None
-        total_cx = 0
-        count = 0
-        for cnt in contours_list:
-            M = cv2.moments(cnt)
-            if M["m00"] != 0:
-                total_cx += int(M["m10"] / M["m00"])
-                count += 1
-        if count == 0:
+        except Exception as e:
+            print(f"Error in detection_loop: {e}")
+            time.sleep(0.1)
+
+# ---- Stage pipeline: tiap fungsi jalan di thread sendiri ----
+
+def _stage_capture():
+    captured = detector.capture.read()
+    if captured is None:
+        return None
+    # copy: slot ring cuma valid sampai read() berikutnya, stage lain masih pakai
+    meta = (captured.frame_id, captured.wall_time, time.perf_counter())
+    _share_frame(captured)
+    if blackbox is not None:
+        # slot black box bertahan ~10 detik, jadi itu saja yang dipakai stage berikutnya
+        seq = blackbox.push(captured.image, captured.frame_id, captured.wall_time, captured.sensor_ts)
+        return blackbox.view(seq), hub.wanted_variants(), meta
+    return captured.image.copy(), hub.wanted_variants(), meta
+
+# Satu BufferPool per frame in flight (2 worker prepare + queue/worker detect
+# dan encode), dikembalikan setelah encode. Habis = prepare menunggu.
+buffer_ring = BufferPoolRing(10) if detector.buffers is not None else None
+
+def _stage_prepare(item):
+    frame, variants, meta = item
+    buffers = None
+    if buffer_ring is not None:
+        buffers = buffer_ring.acquire()
+        if buffers is None:
             return None
-        return total_cx // count
-    
-    def get_frame(self):
-        """Capture and process one frame"""
-        frame_rgb = self.picam2.capture_array()
-        frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-        hasil, offset, arah = self.detect_lane(frame_bgr)
-        return hasil
+    try:
+        # bands=None: tracker (kalau tracking=True) belum update frame
+        # sebelumnya saat stage ini jalan, jadi mask selalu full frame;
+        # pita tracker cuma menghemat kerja di detect_lane() non-bertahap
+        return detector.prepare_frame(frame, variants, buffers=buffers), meta
+    except Exception:
+        _release(buffers)
+        raise
 
-# ============ INITIALIZE DETECTOR ============
-print("Initializing Lane Detector...")
-detector = LaneDetector()
-print("Lane Detector ready!")
+def _stage_detect(item):
+    prep, meta = item
+    try:
+        views, offset, arah = detector.analyze_frame(prep)
+        data = _publish_telemetry(*meta)
+    except Exception:
+        _release(prep["buffers"])
+        raise
+    return HubFrame(views, data), prep["variants"], meta[2], prep["buffers"]
+
+def _stage_encode(item):
+    frame, variants, t0, buffers = item
+    try:
+        # Encode di sini supaya client cuma ambil bytes dari cache; gambar
+        # dilepas (freeze) karena buffer-nya dipakai frame lain setelah ini
+        frame.freeze(variants & hub.wanted_variants("jpeg"), hub.wanted_rungs(),
+                     variants & hub.wanted_variants("mask"))
+    finally:
+        _release(buffers)
+    hub.publish(frame)
+    _record_frame((time.perf_counter() - t0) * 1000)
+    return True
+
+def _release(buffers):
+    if buffer_ring is not None:
+        buffer_ring.release(buffers)
+
+stage_pipeline = None
+if STAGED_PIPELINE:
+    stage_pipeline = StagePipeline([
+        Stage("capture", _stage_capture),
+        Stage("prepare", _stage_prepare, workers=2),
+        Stage("detect", _stage_detect),
+        Stage("encode", _stage_encode),
+    ]).start()
+else:
+    producer_thread = threading.Thread(target=detection_loop, daemon=True)
+    producer_thread.start()
 
 # ============ FLASK ROUTES ============
 
-def generate_frames():
+# "frame" = frame tanpa anotasi, overlay digambar client dari /api/events?overlay=1
+STREAM_TYPES = ("mask", "detection", "frame")
+STREAM_MODES = ("bev", "normal")
+
+def _part_headers(frame, length, rung=None):
+    """Header satu part MJPEG: Content-Length + metadata deteksi frame ini"""
+    meta = frame.meta
+    lines = [
+        "Content-Type: image/jpeg",
+        f"Content-Length: {length}",
+    ]
+    if rung is not None:
+        lines.append(f"X-Quality: {rung.name}")
+    if meta:
+        lines += [
+            f"X-Frame-Id: {meta['frame_id']}",
+            f"X-Capture-Ts: {meta['capture_ts']:.6f}",
+            f"X-Latency-Ms: {meta['latency_ms']}",
+            f"X-Offset: {meta['offset']}",
+            f"X-Arah: {meta['arah']}",
+        ]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+def generate_frames(variant="detection/bev", quality=None):
     """
     Generator function untuk MJPEG streaming
     Kayak async generator di JavaScript
+    Tidak capture sendiri, cuma subscribe ke hub (frame terbaru saja)
+    quality: AdaptiveQuality client ini (anak tangga kualitas/resolusi/fps)
     """
-    fps_start = time.time()
-    frame_count = 0
+    quality = quality or make_quality("auto")
+    last_id = 0
     
-    while True:
-        try:
-            # Get processed frame
-            frame = detector.get_frame()
-            
-            # Calculate FPS
-            frame_count += 1
-            if frame_count >= 30:
-                fps = frame_count / (time.time() - fps_start)
-                latest_data["fps"] = round(fps, 1)
-                frame_count = 0
-                fps_start = time.time()
-            
-            # Encode ke JPEG
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ret:
+    with hub.subscribe(variant) as sub:
+        while True:
+            new_id, frame = hub.wait_for(last_id)
+            if frame is None:
+                continue
+            # frame id yang lompat = frame yang terlewat selagi kita mengirim
+            quality.on_source(new_id - last_id if last_id else 1)
+            last_id = new_id
+            if not quality.due():
                 continue
             
-            frame_bytes = buffer.tobytes()
-            
-            # Yield sebagai MJPEG format
-            # Format: --frame\r\nContent-Type: image/jpeg\r\n\r\n[JPEG_DATA]\r\n
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            # Encode sekali per frame per variant per anak tangga, di-share antar client
+            rung = quality.rung
+            sub.set_rung(rung)
+            frame_bytes = frame.jpeg(variant, rung)
+            if frame_bytes is None:
+                # Frame ini dibuat sebelum variant kita terdaftar
+                continue
             
-        except Exception as e:
-            print(f"Error in generate_frames: {e}")
-            time.sleep(0.1)
+            # Yield sebagai MJPEG format, metadata frame ikut di header part
+            # Format: --frame\r\nContent-Type: image/jpeg\r\nContent-Length: N\r\n
+            #         X-Frame-Id: ...\r\n\r\n[JPEG_DATA]\r\n
+            yield b'--frame\r\n' + _part_headers(frame, len(frame_bytes), rung) + frame_bytes + b'\r\n'
+            # yield kembali setelah server selesai menulis part ini ke socket
+            quality.on_sent()
+
+def parse_stream_variant(query):
+    """Query /video_feed (dict list dari parse_qs) → variant, None kalau tidak valid"""
+    stream_type = query.get('type', ['detection'])[0]
+    mode = query.get('mode', ['bev'])[0]
+    if stream_type not in STREAM_TYPES or mode not in STREAM_MODES:
+        return None
+    return f"{stream_type}/{mode}"
 
 @app.route('/video_feed')
 def video_feed():
     """
     Video streaming route
     Endpoint ini akan di-consume oleh <img> tag di Next.js
+    Query: ?type=mask|detection|frame&mode=bev|normal&quality=auto|high|medium|low|lowest
     """
+    stream_type = request.args.get('type', 'detection')
+    mode = request.args.get('mode', 'bev')
+    if stream_type not in STREAM_TYPES or mode not in STREAM_MODES:
+        return jsonify({"error": "type harus mask|detection|frame, mode harus bev|normal"}), 400
+    quality = make_quality(request.args.get('quality', 'auto'))
+    if quality is None:
+        return jsonify({"error": "quality harus auto|high|medium|low|lowest"}), 400
+    
     return Response(
-        generate_frames(),
+        generate_frames(f"{stream_type}/{mode}", quality),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
+def generate_masks(variant="mask/bev", encoder=None):
+    """
+    Stream mask biner (mask_codec): pesan header + payload BITS/RLE/DELTA.
+    Keyframe di-cache per frame (shared), DELTA dihitung per client.
+    """
+    encoder = encoder or MaskEncoder()
+    last_id = 0
+    
+    with hub.subscribe(variant, "mask"):
+        while True:
+            last_id, frame = hub.wait_for(last_id)
+            if frame is None:
+                continue
+            packed = frame.packed_mask(variant)
+            if packed is None:
+                continue
+            yield encoder.encode(packed, frame.meta.get("frame_id", last_id))
+
+def parse_mask_variant(query):
+    """Query /mask_feed → variant mask, None kalau tidak valid"""
+    mode = query.get('mode', ['bev'])[0]
+    if mode not in STREAM_MODES:
+        return None
+    return f"mask/{mode}"
+
+@app.route('/mask_feed')
+def mask_feed():
+    """
+    Mask biner tanpa JPEG (lossless, jauh lebih kecil).
+    Query: ?mode=bev|normal&delta=1|0
+    Decoder: mask_codec.py (Python), lane-detection-ui/lib/maskCodec.ts (UI)
+    """
+    mode = request.args.get('mode', 'bev')
+    if mode not in STREAM_MODES:
+        return jsonify({"error": "mode harus bev|normal"}), 400
+    encoder = MaskEncoder(delta=request.args.get('delta', '1') != '0')
+    
+    return Response(
+        generate_masks(f"mask/{mode}", encoder),
+        mimetype='application/octet-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/status')
 def api_status():
     """
@@ -326,6 +379,81 @@ def api_status():
     """
     return jsonify(latest_data)
 
+def event_payload(data, overlay=False):
+    """Event SSE telemetry; geometri overlay cuma untuk client yang minta"""
+    if not overlay and "overlay" in data:
+        data = {k: v for k, v in data.items() if k != "overlay"}
+    return f"id: {data['frame_id']}\nevent: telemetry\ndata: {json.dumps(data)}\n\n"
+
+def generate_events(overlay=False):
+    """
+    Server-Sent Events: satu event JSON per hasil deteksi (~30 Hz).
+    Client lambat tidak antri, langsung dapat snapshot terbaru
+    (frame_id yang lompat = event yang di-skip).
+    overlay=True: event ikut membawa geometri deteksi (overlay.py), dan
+    detector baru menghitung geometri selama ada subscriber seperti ini.
+    """
+    last_id = 0
+    with hub.subscribe("overlay", "json") if overlay else contextlib.nullcontext():
+        while True:
+            last_id, data = telemetry.wait_for(last_id, timeout=15.0)
+            if data is None:
+                # komentar SSE supaya koneksi (ngrok / proxy) tidak dianggap idle
+                yield ": keepalive\n\n"
+                continue
+            yield event_payload(data, overlay)
+
+@app.route('/api/events')
+def api_events():
+    """
+    Push telemetry (pengganti polling /api/status tiap 500 ms)
+    JS: new EventSource('/api/events').addEventListener('telemetry', ...)
+    Query: ?overlay=1 → tiap event ikut field "overlay" (geometri vektor)
+    """
+    return Response(
+        generate_events(request.args.get('overlay') == '1'),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/stats')
+def api_stats():
+    """
+    Statistik pipeline: jumlah viewer, CPU proses, waktu proses per frame.
+    Buka beberapa tab /video_feed lalu bandingkan cpu_percent → harus tetap flat.
+    """
+    stats = dict(pipeline_stats)
+    stats.update(hub.stats())
+    stats["capture"] = detector.capture.stats()
+    if stage_pipeline is not None:
+        # util ~1.0 = stage bottleneck
+        stats["stages"] = stage_pipeline.stats()
+        if buffer_ring is not None:
+            # allocations harus berhenti naik setelah warm-up
+            stats["buffers"] = {"free": buffer_ring.free, "allocations": buffer_ring.allocations,
+                                "bytes": buffer_ring.nbytes()}
+    if recorder_sink is not None:
+        stats["recorder"] = recorder_sink.stats()
+    stats["fps"] = latest_data["fps"]
+    return jsonify(stats)
+
+@app.route('/api/blackbox')
+def api_blackbox():
+    """Status black box: event yang sudah / sedang di-dump, frame hilang"""
+    if blackbox is None:
+        return jsonify({"error": "black box tidak aktif (jalankan dengan --blackbox)"}), 404
+    return jsonify(blackbox.stats())
+
+@app.route('/api/blackbox/trigger', methods=['POST'])
+def api_blackbox_trigger():
+    """Simpan N detik sebelum + sesudah sekarang ke disk (background)"""
+    if blackbox is None:
+        return jsonify({"error": "black box tidak aktif (jalankan dengan --blackbox)"}), 404
+    folder = blackbox.trigger(request.args.get('reason', 'http'))
+    if folder is None:
+        return jsonify({"error": "dump lain masih berjalan"}), 409
+    return jsonify({"folder": folder})
+
 @app.route('/api/health')
 def health():
     """Health check endpoint"""
@@ -343,17 +471,25 @@ def index():
         <div id="status" style="margin-top: 20px; font-size: 18px;"></div>
         
         <script>
-            // Fetch metadata every 500ms
-            setInterval(async () => {
-                const res = await fetch('/api/status');
-                const data = await res.json();
+            const show = (data) => {
                 document.getElementById('status').innerHTML = `
                     <strong>Offset:</strong> ${data.offset}px ${data.arah} | 
                     <strong>Gamma:</strong> ${data.gamma} | 
                     <strong>Lux:</strong> ${data.lux} | 
                     <strong>FPS:</strong> ${data.fps}
                 `;
-            }, 500);
+            };
+            
+            // Push tiap frame lewat SSE, fallback polling 500ms kalau tidak didukung
+            if (window.EventSource) {
+                const events = new EventSource('/api/events');
+                events.addEventListener('telemetry', (e) => show(JSON.parse(e.data)));
+            } else {
+                setInterval(async () => {
+                    const res = await fetch('/api/status');
+                    show(await res.json());
+                }, 500);
+            }
         </script>
     </body>
     </html>
@@ -366,10 +502,28 @@ if __name__ == '__main__':
     print("=" * 50)
     print("Access video stream at: http://<PI_IP>:5000/video_feed")
     print("Access metadata API at: http://<PI_IP>:5000/api/status")
+    print("Access telemetry push at: http://<PI_IP>:5000/api/events")
+    print("Access pipeline stats at: http://<PI_IP>:5000/api/stats")
+    if blackbox is not None:
+        print("Black box: GET /api/blackbox, POST /api/blackbox/trigger")
+    if recorder_sink is not None:
+        print(f"Recording to: {record_dir} (shared memory → recorder process)")
     print("Access test page at: http://<PI_IP>:5000/")
     print("=" * 50)
     
-    # Run Flask server
-    # host='0.0.0.0' → accessible dari network
-    # threaded=True → handle multiple connections
-    app.run(host='0.0.0.0', port=5000, threaded=True, debug=False)
+    if "--async" in sys.argv:
+        # Streaming (/video_feed, /api/events) di event loop asyncio, tiap client
+        # punya mailbox 1 frame → client lambat skip frame, tidak menahan yang lain.
+        # Route lain tetap Flask. Statistik per client: /api/clients
+        print("Async streaming mode (per-client stats at /api/clients)")
+        AsyncStreamServer(
+            hub, telemetry, wsgi_app=app,
+            parse_variant=parse_stream_variant, part_headers=_part_headers,
+            parse_mask=parse_mask_variant, event_payload=event_payload,
+            host='0.0.0.0', port=5000
+        ).run()
+    else:
+        # Run Flask server
+        # host='0.0.0.0' → accessible dari network
+        # threaded=True → handle multiple connections
+        app.run(host='0.0.0.0', port=5000, threaded=True, debug=False)
@@ -0,0 +1,297 @@
+"""
+Log telemetry biner (record tetap, append-only)
+===============================================
+
+Pengganti baris CSV per frame di 1.py / 333.py / gamma_correction.py.
+CSV lama: teks, jam "%H:%M:%S" (resolusi 1 detik, urutan frame hilang),
+lambat ditulis dan lambat di-parse. Di sini tiap frame = satu record
+struct-packed ukuran tetap:
+- frame_id (u4) + t_ns (u8, time.monotonic_ns) selalu ada di depan
+- kolom lain sesuai `fields` (float / int / enum string seperti "arah")
+- None di kolom float → NaN, di kolom int → -1 (unsigned: nilai maksimum,
+  mis. 255 untuk u1); label enum tidak dikenal juga dianggap None
+
+Format file (.tlog):
+    "TLOG" | versi u2 | panjang header u4 | header JSON | padding ke 8 byte | record...
+Header JSON menyimpan dtype record, label enum, dan jangkar jam
+(wall_ns + mono_ns saat file dibuka) supaya t_ns bisa diubah ke jam dinding.
+Record sisa crash (setengah record di akhir file) diabaikan saat dibaca.
+
+Cara pakai:
+    rec.add_telemetry("log", "log.tlog", [("lux", "f4"), ("gamma", "f4"),
+                                          ("arah", "i1", ARAH)])
+    rec.row("log", [lux, gamma, arah])          # frame_id + t_ns otomatis
+
+    log = read_log("log.tlog")                  # np.memmap structured array
+    log["gamma"].mean(), np.diff(log["t_ns"])   # langsung per kolom
+
+Konversi / info:
+    python telemetry_log.py to-csv log.tlog [log.csv]
+    python telemetry_log.py info log.tlog
+    python telemetry_log.py                     # benchmark CSV vs tlog
+"""
+
+import csv
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+MAGIC = b"TLOG"
+VERSION = 1
+_PREFIX = struct.Struct("<4sHI")
+
+# Label enum untuk kolom arah (dipakai semua script deteksi)
+ARAH = ["N/A", "KIRI", "TENGAH", "KANAN"]
+
+# dtype numpy → kode struct (little-endian, tanpa padding)
+_STRUCT_CODES = {
+    "u1": "B", "i1": "b", "u2": "H", "i2": "h",
+    "u4": "I", "i4": "i", "u8": "Q", "i8": "q",
+    "f4": "f", "f8": "d",
+}
+
+_STAMP = [("frame_id", "u4", None), ("t_ns", "u8", None)]
+
+
+def _normalize(fields):
+    """(nama, dtype) / (nama, dtype, labels) → list (nama, dtype, labels)"""
+    out = []
+    for field in fields:
+        name, dtype = field[0], field[1]
+        labels = list(field[2]) if len(field) > 2 and field[2] else None
+        if dtype not in _STRUCT_CODES:
+            raise ValueError(f"dtype {dtype!r} untuk kolom {name!r} tidak didukung")
+        if labels is not None and dtype[0] not in "iu":
+            raise ValueError(f"kolom enum {name!r} harus bertipe integer")
+        out.append((name, dtype, labels))
+    return out
+
+
+def _missing_value(dtype):
+    """Pengganti None per dtype: NaN (float), -1 (signed), maksimum (unsigned)"""
+    if dtype[0] == "f":
+        return float("nan")
+    if dtype[0] == "u":
+        return int(np.iinfo(np.dtype(dtype)).max)
+    return -1
+
+
+def record_dtype(fields):
+    return np.dtype([(name, "<" + dtype) for name, dtype, _ in fields])
+
+
+class TelemetryLog:
+    """
+    Penulis .tlog. pack() murah (struct.pack) dan bisa dipanggil di loop
+    capture; write() boleh di thread lain (lihat recorder.add_telemetry).
+    """
+
+    def __init__(self, path, fields, meta=None):
+        self.path = path
+        self.fields = _STAMP + _normalize(fields)
+        self.dtype = record_dtype(self.fields)
+        self._struct = struct.Struct("<" + "".join(_STRUCT_CODES[d] for _, d, _ in self.fields))
+        self._lookup = [
+            {label: i for i, label in enumerate(labels)} if labels else None
+            for _, _, labels in self.fields
+        ]
+        self._missing = [_missing_value(dtype) for _, dtype, _ in self.fields]
+        self.frame_id = 0
+        self.records = 0
+
+        header = {
+            "fields": [[name, dtype, labels] for name, dtype, labels in self.fields],
+            "wall_ns": time.time_ns(),
+            "mono_ns": time.monotonic_ns(),
+            "meta": meta or {},
+        }
+        blob = json.dumps(header, separators=(",", ":")).encode()
+        blob += b" " * (-(_PREFIX.size + len(blob)) % 8)
+        self._file = open(path, "wb")
+        self._file.write(_PREFIX.pack(MAGIC, VERSION, len(blob)) + blob)
+
+    def pack(self, values, frame_id=None, t_ns=None):
+        """Satu record (bytes). frame_id / t_ns otomatis kalau None"""
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+        if frame_id is None:
+            frame_id = self.frame_id
+        self.frame_id = frame_id + 1
+
+        row = [frame_id, t_ns]
+        for i, value in enumerate(values, 2):
+            lookup = self._lookup[i]
+            if lookup is not None:
+                value = lookup.get(value)
+            if value is None:
+                value = self._missing[i]
+            row.append(value)
+        return self._struct.pack(*row)
+
+    def write(self, data):
+        """Tulis bytes hasil pack() (satu atau beberapa record sekaligus)"""
+        self._file.write(data)
+        self.records += len(data) // self._struct.size
+
+    def append(self, values, frame_id=None, t_ns=None):
+        self.write(self.pack(values, frame_id, t_ns))
+
+    def flush(self, sync=False):
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self.flush(sync=True)
+        self._file.close()
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: bukan file .tlog")
+        if version != VERSION:
+            raise ValueError(f"{path}: versi .tlog {version} tidak didukung")
+        header = json.loads(f.read(length))
+    header["offset"] = _PREFIX.size + length
+    header["fields"] = [tuple(field) for field in header["fields"]]
+    return header
+
+
+def read_log(path, header=None):
+    """Seluruh log sebagai np.memmap structured array (read-only, tanpa copy)"""
+    header = header or read_header(path)
+    dtype = record_dtype(header["fields"])
+    count = (os.path.getsize(path) - header["offset"]) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=header["offset"], shape=(count,))
+
+
+def wall_time(log, header):
+    """t_ns monotonic → detik epoch (float64)"""
+    return (header["wall_ns"] + (log["t_ns"].astype(np.int64) - header["mono_ns"])) / 1e9
+
+
+def to_csv(path, out_path=None):
+    """Konversi .tlog → CSV (timestamp jam dinding ms + t relatif + semua kolom)"""
+    header = read_header(path)
+    log = read_log(path, header)
+    out_path = out_path or os.path.splitext(path)[0] + ".csv"
+    names = [name for name, _, _ in header["fields"]]
+    wall = wall_time(log, header)
+    t_rel = (log["t_ns"].astype(np.int64) - (int(log["t_ns"][0]) if len(log) else 0)) / 1e9
+
+    columns = []
+    for name, dtype, labels in header["fields"]:
+        col = log[name]
+        if labels:
+            lut = np.array(labels + [""], dtype=object)
+            col = lut[np.where((col >= 0) & (col < len(labels)), col, len(labels))]
+        elif dtype[0] == "f":
+            col = col.astype(str)   # repr terpendek float32, bukan 0.30000001192...
+        else:
+            col = col.tolist()
+        columns.append(col)
+
+    # strftime cuma sekali per detik, milidetik ditempel
+    jam = {}
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "t"] + names)
+        for i in range(len(log)):
+            detik = int(wall[i])
+            if detik not in jam:
+                jam[detik] = time.strftime("%H:%M:%S", time.localtime(detik))
+            stamp = f"{jam[detik]}.{int(wall[i] * 1000) % 1000:03d}"
+            writer.writerow([stamp, f"{t_rel[i]:.4f}"] + [col[i] for col in columns])
+    return out_path, len(log)
+
+
+def info(path):
+    header = read_header(path)
+    log = read_log(path, header)
+    print(f"{path}: {len(log)} record x {log.dtype.itemsize} B")
+    for name, dtype, labels in header["fields"]:
+        print(f"  {name:<14} {dtype}" + (f"  enum {labels}" if labels else ""))
+    if len(log) > 1:
+        dt = np.diff(log["t_ns"].astype(np.int64)) / 1e6
+        durasi = (int(log["t_ns"][-1]) - int(log["t_ns"][0])) / 1e9
+        lompat = int(np.sum(np.diff(log["frame_id"].astype(np.int64)) != 1))
+        print(f"  durasi {durasi:.1f} s, {len(log) / max(durasi, 1e-9):.1f} record/s, "
+              f"interval {dt.mean():.2f} ms (max {dt.max():.2f}), frame_id lompat {lompat}x")
+
+
+# ===================== CLI / BENCHMARK =====================
+
+def _benchmark(n=100_000):
+    import tempfile
+
+    fields = [("lux", "f4"), ("brightness", "f4"), ("gamma", "f4"),
+              ("offset_normal", "i2"), ("arah_normal", "i1", ARAH),
+              ("offset_bev", "i2"), ("arah_bev", "i1", ARAH)]
+    rng = np.random.default_rng(0)
+    rows = [[float(rng.uniform(0, 1500)), float(rng.uniform(0, 255)), float(rng.uniform(0.4, 1.6)),
+             int(rng.integers(-200, 200)), ARAH[int(rng.integers(4))],
+             int(rng.integers(-200, 200)), ARAH[int(rng.integers(4))]] for _ in range(n)]
+    out_dir = tempfile.mkdtemp()
+    csv_path = os.path.join(out_dir, "a.csv")
+    tlog_path = os.path.join(out_dir, "a.tlog")
+
+    t0 = time.perf_counter()
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp"] + [field[0] for field in fields])
+        for row in rows:
+            writer.writerow([time.strftime("%H:%M:%S")] + row)
+    csv_write = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    log = TelemetryLog(tlog_path, fields)
+    for row in rows:
+        log.append(row)
+    log.close()
+    tlog_write = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        gamma = np.array([float(r[3]) for r in reader])
+    csv_read = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    data = read_log(tlog_path)
+    gamma_t = np.asarray(data["gamma"], np.float64)
+    tlog_read = time.perf_counter() - t0
+    assert np.allclose(gamma, gamma_t, rtol=1e-6)
+
+    t0 = time.perf_counter()
+    to_csv(tlog_path, os.path.join(out_dir, "b.csv"))
+    convert = time.perf_counter() - t0
+
+    print(f"{n} record")
+    print(f"  CSV  : tulis {csv_write / n * 1e6:.2f} us/record, {os.path.getsize(csv_path) / n:.1f} B/record, "
+          f"baca kolom gamma {csv_read * 1000:.1f} ms")
+    print(f"  tlog : tulis {tlog_write / n * 1e6:.2f} us/record, {data.dtype.itemsize} B/record, "
+          f"baca kolom gamma {tlog_read * 1000:.2f} ms (memmap)")
+    print(f"  konversi tlog → CSV: {convert * 1000:.0f} ms")
+    del data
+    for name in os.listdir(out_dir):
+        os.remove(os.path.join(out_dir, name))
+    os.rmdir(out_dir)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "to-csv":
+        out, count = to_csv(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"{count} record → {out}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "info":
+        info(sys.argv[2])
+    else:
+        _benchmark()
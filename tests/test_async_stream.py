@@ -0,0 +1,32 @@
+import socket
+import time
+
+from async_stream import AsyncStreamServer
+from frame_hub import FrameHub
+
+
+def _request(port, data):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(data)
+        return sock.recv(4096)
+
+
+def test_async_request_rusak_dijawab():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = AsyncStreamServer(FrameHub(), host="127.0.0.1", port=port)
+    server.start_in_thread()
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    # header > 64 KB tanpa \r\n\r\n → LimitOverrunError
+    reply = _request(port, b"GET /api/clients HTTP/1.1\r\nX-Besar: " + b"a" * 70000)
+    assert reply.startswith(b"HTTP/1.1 431")
+    assert _request(port, b"RUSAK\r\n\r\n").startswith(b"HTTP/1.1 400")
+    # server tetap melayani request berikutnya
+    assert _request(port, b"GET /api/clients HTTP/1.1\r\n\r\n").startswith(b"HTTP/1.1 200")
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from capture_ring import CaptureRing, SyntheticSource
+
+
+def _baca(capture, n, jeda=0.0):
+    ids = []
+    while len(ids) < n:
+        frame = capture.read(timeout=2.0)
+        assert frame is not None
+        ids.append(frame.frame_id)
+        time.sleep(jeda)
+    return ids
+
+
+def test_consumer_lambat_drop_old():
+    capture = CaptureRing(SyntheticSource(64, 36, fps=500)).start()
+    try:
+        # consumer ~50 fps, kamera ~500 fps: sebagian besar frame dibuang
+        ids = _baca(capture, 10, jeda=0.02)
+        stats = capture.stats()
+    finally:
+        capture.stop()
+    assert all(b > a for a, b in zip(ids, ids[1:]))
+    assert stats["delivered"] == 10
+    # tiap frame yang dilompati read() dihitung tepat sekali
+    assert stats["dropped"] == ids[-1] - len(ids)
+    assert stats["dropped"] > 0
+    assert stats["captured"] >= ids[-1]
+
+
+def test_consumer_cepat_tanpa_duplikat():
+    capture = CaptureRing(SyntheticSource(64, 36, fps=100)).start()
+    try:
+        ids = _baca(capture, 20)
+    finally:
+        capture.stop()
+    # read() tidak pernah mengembalikan frame yang sama dua kali
+    assert ids == sorted(set(ids))
+
+
+def test_read_none_setelah_stop():
+    capture = CaptureRing(SyntheticSource(64, 36, fps=100)).start()
+    first = capture.read(timeout=2.0)
+    capture.stop()
+    # frame terakhir sebelum stop masih boleh diambil, sesudahnya None tanpa menunggu
+    t0 = time.monotonic()
+    last = capture.read(timeout=2.0)
+    assert last is None or last.frame_id > first.frame_id
+    assert capture.read(timeout=2.0) is None
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_minimal_tiga_slot():
+    with pytest.raises(ValueError):
+        CaptureRing(SyntheticSource(64, 36), slots=2)
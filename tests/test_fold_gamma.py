@@ -0,0 +1,72 @@
+"""
+fold_gamma=True (threshold dilipat, tanpa LUT) harus memberi mask dan
+offset yang identik dengan jalur gamma + HSV, lewat detect_lane penuh
+pada frame rekaman (video 3 november.mp4).
+
+Kesetaraan ini cuma berlaku untuk jalur mask_first (threshold di pixel
+kamera asli). Tanpa mask_first warp linear jalan sebelum threshold, dan
+warp lalu LUT != LUT lalu warp, jadi detector mematikan fold_gamma.
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from capture_file import ReplayLux
+from lane_detector import LaneDetector
+
+VIDEO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     "video 3 november.mp4")
+VARIANTS = ("mask/bev", "mask/normal", "overlay")
+
+
+def _recorded_frames(step=7, limit=120):
+    if not os.path.exists(VIDEO):
+        pytest.skip("video rekaman tidak ada")
+    cap = cv2.VideoCapture(VIDEO)
+    frames = []
+    i = 0
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if i % step == 0:
+            frames.append(cv2.resize(frame, (640, 360)))
+        i += 1
+    cap.release()
+    return frames
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return _recorded_frames()
+
+
+def test_fold_mati_tanpa_mask_first():
+    detector = LaneDetector(fold_gamma=True, mask_first=False, source=False, lux_sampler=ReplayLux())
+    assert detector.fold_gamma is False
+
+
+def test_fold_sama_dengan_gamma_hsv(frames):
+    lux = ReplayLux()
+    detectors = {}
+    for fold in (True, False):
+        detector = LaneDetector(fold_gamma=fold, mask_first=True, source=False, lux_sampler=lux)
+        detectors[fold] = detector
+
+    gammas = set()
+    # lux gelap → terang supaya gamma 0.4 .. 2.5 ikut teruji
+    for i, frame in enumerate(frames):
+        lux.set((0.0, 50.0, 400.0, 1500.0)[i % 4])
+        hasil = {}
+        for fold, detector in detectors.items():
+            views, offset, arah = detector.detect_lane(frame, VARIANTS)
+            hasil[fold] = ({k: views[k].copy() for k in ("mask/bev", "mask/normal")},
+                           offset, arah, detector.overlay["lanes"])
+        gammas.add(round(detector.fuzzy_gamma(lux.lux, detector.measure_brightness(frame)), 1))
+        for key in ("mask/bev", "mask/normal"):
+            assert np.array_equal(hasil[True][0][key], hasil[False][0][key]), f"{key} beda di frame {i}"
+        assert hasil[True][1:] == hasil[False][1:], f"offset beda di frame {i}"
+    assert len(gammas) > 3
@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+
+import frame_hub
+from frame_hub import HubFrame
+from quality_ladder import make_quality
+
+
+def test_encode_key_lain_tidak_menunggu(monkeypatch):
+    """Encode anak tangga yang lambat tidak menahan JPEG variant lain di frame yang sama"""
+    mulai = threading.Event()
+    lanjut = threading.Event()
+    asli = frame_hub.encode_rung
+
+    def encode_lambat(image, rung):
+        mulai.set()
+        lanjut.wait(5)
+        return asli(image, rung)
+
+    monkeypatch.setattr(frame_hub, "encode_rung", encode_lambat)
+    image = np.zeros((36, 64, 3), np.uint8)
+    frame = HubFrame({"detection/bev": image, "mask/bev": image[..., 0]})
+    rung = make_quality("low").rung
+
+    t = threading.Thread(target=frame.jpeg, args=("detection/bev", rung))
+    t.start()
+    assert mulai.wait(5)
+    # selagi encode rung "low" jalan, key lain tetap bisa di-encode
+    assert frame.jpeg("detection/bev")[:2] == b"\xff\xd8"
+    assert frame.packed_mask("mask/bev") is not None
+    lanjut.set()
+    t.join(5)
+    assert frame.jpeg("detection/bev", rung) is not None
+
+
+def test_encode_sekali_per_key():
+    calls = []
+    image = np.zeros((36, 64, 3), np.uint8)
+    frame = HubFrame({"detection/bev": image})
+    hasil = [frame._cached("k", "detection/bev", lambda img: calls.append(1) or b"x")
+             for _ in range(3)]
+    assert hasil == [b"x"] * 3 and len(calls) == 1
+
+
+def test_freeze_melepas_gambar():
+    frame = HubFrame({"detection/bev": np.zeros((36, 64, 3), np.uint8)})
+    frame.freeze(["detection/bev"])
+    assert frame.views == {}
+    assert frame.jpeg("detection/bev") is not None
+    assert frame.jpeg("mask/bev") is None
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from lane_localizer import make_localizer
+from lane_tracker import LaneTracker
+
+WIDTH, HEIGHT = 640, 360
+
+
+def _mask(*xs, half=4):
+    mask = np.zeros((HEIGHT, WIDTH), np.uint8)
+    for x in xs:
+        mask[:, x - half:x + half] = 255
+    return mask
+
+
+def _tracker(localizer="contours"):
+    return LaneTracker(make_localizer(localizer), WIDTH, band=40, refresh=1000)
+
+
+def test_pita_tidak_tumpang_tindih():
+    tracker = _tracker()
+    for _ in range(5):
+        tracker.update(_mask(180, 235))
+    bands = sorted(tracker.search_bands())
+    assert len(bands) == 2
+    # pita kiri berhenti di titik tengah antar prediksi, pita tengah mulai di situ
+    assert bands[0][1] == bands[1][0]
+    assert abs(bands[0][1] - (180 + 235) / 2) <= 2
+
+
+@pytest.mark.parametrize("localizer", ["contours", "components"])
+def test_garis_konvergen_tidak_diukur_dua_kali(localizer):
+    """Garis kiri dan tengah mendekat; tiap garis cuma diukur oleh track-nya sendiri"""
+    tracker = _tracker(localizer)
+    kiri, tengah = 120, 330
+    for _ in range(5):
+        tracker.update(_mask(kiri, tengah))
+    assert tracker.locked
+
+    band_frames = 0
+    for step in range(40):
+        # kiri → 205, tengah → 220 (tetap di kelompok masing-masing, batas 211)
+        kiri = min(kiri + 3, 205)
+        tengah = max(tengah - 4, 220)
+        result = tracker.update(_mask(kiri, tengah))
+        if not result.locked:
+            continue
+        band_frames += 1
+        posisi = result.posisi
+        if posisi.kiri is not None:
+            assert abs(posisi.kiri - kiri) <= 2, f"frame {step}: kiri {posisi.kiri} vs {kiri}"
+        if posisi.tengah is not None:
+            assert abs(posisi.tengah - tengah) <= 2, f"frame {step}: tengah {posisi.tengah} vs {tengah}"
+        assert posisi.kiri is None or posisi.kiri != posisi.tengah
+    assert band_frames > 20
+    # di akhir kedua track tetap di garisnya sendiri
+    assert abs(tracker.tracks["kiri"].position - 205) <= 3
+    assert abs(tracker.tracks["tengah"].position - 220) <= 3
+
+
+@pytest.mark.parametrize("localizer", ["contours", "components"])
+def test_mode_pita_pakai_localizer(localizer):
+    """Pencarian pita lewat backend localizer detector, blob tergambar di kolom aslinya"""
+    tracker = _tracker(localizer)
+    mask = _mask(150, 330, 500)
+    for _ in range(5):
+        tracker.update(mask)
+    result = tracker.update(mask)
+    assert result.locked
+    assert result.posisi == tracker.localizer.locate(mask)[0]
+
+    hasil = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    tracker.draw(hasil, result.blobs)
+    assert np.array_equal(hasil[:, :, 1], mask)
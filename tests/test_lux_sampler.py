@@ -0,0 +1,60 @@
+import time
+
+from lux_sampler import FakeLuxSensor, LuxSampler
+
+
+class _Rusak:
+    """Sensor yang berhasil `ok` kali lalu selalu raise (mis. overflow / I2C putus)"""
+
+    def __init__(self, ok=0):
+        self.ok = ok
+
+    @property
+    def lux(self):
+        if self.ok <= 0:
+            raise RuntimeError("sensor overflow")
+        self.ok -= 1
+        return 321.0
+
+
+def _tunggu(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_belum_pernah_terbaca_stale():
+    sampler = LuxSampler(_Rusak(), interval=0.01, default_lux=42.0).start()
+    try:
+        assert _tunggu(lambda: sampler.errors >= 3)
+        reading = sampler.read()
+        assert reading.stale
+        assert reading.lux == 42.0
+    finally:
+        sampler.stop()
+
+
+def test_sensor_mati_setelah_terbaca_jadi_stale():
+    sampler = LuxSampler(_Rusak(ok=1), interval=0.01, stale_after=0.2).start()
+    try:
+        assert _tunggu(lambda: sampler.read().lux == 321.0)
+        assert not sampler.read().stale
+        # nilai terakhir tetap dipakai, tapi ditandai stale setelah stale_after
+        assert _tunggu(lambda: sampler.read().stale)
+        assert sampler.read().lux == 321.0
+        assert sampler.errors > 0
+    finally:
+        sampler.stop()
+
+
+def test_sensor_sehat_tidak_stale():
+    sampler = LuxSampler(FakeLuxSensor(500.0), interval=0.01, stale_after=0.2).start()
+    try:
+        assert _tunggu(lambda: not sampler.read().stale)
+        time.sleep(0.3)
+        assert sampler.read()[:1] == (500.0,)
+        assert not sampler.read().stale
+        assert sampler.errors == 0
+    finally:
+        sampler.stop()
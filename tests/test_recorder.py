@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+
+from recorder import Recorder, _WriterThread
+
+
+class _Gagal(_WriterThread):
+    """Writer yang selalu error / selalu macet"""
+
+    def __init__(self, name, maxsize, macet=False):
+        self.macet = macet
+        self.items = []
+        super().__init__(name, maxsize)
+
+    def _write_batch(self, batch):
+        if self.macet:
+            time.sleep(60)
+        return self._each(batch, self._tulis)
+
+    def _tulis(self, item):
+        if item < 0:
+            raise ValueError("record rusak")
+        self.items.append(item)
+
+
+def test_record_rusak_tidak_mematikan_writer():
+    out = _Gagal("x", 100)
+    for item in (1, -1, 2, 3):
+        out.put(item)
+    assert out.close(timeout=5)
+    assert out.items == [1, 2, 3]
+    assert out.stats()["errors"] == 1
+    assert out.stats()["written"] == 3
+
+
+def test_close_tidak_blok_walau_writer_macet():
+    out = _Gagal("x", 2, macet=True)
+    for item in range(5):
+        out.put(item)
+    t0 = time.monotonic()
+    assert not out.close(timeout=0.5)
+    assert time.monotonic() - t0 < 2
+
+
+
+def test_capture_metadata_rusak(tmp_path):
+    from capture_file import CaptureReader
+
+    rec = Recorder()
+    rec.add_capture("cap", str(tmp_path / "cap"), (4, 4, 3))
+    for i in range(4):
+        img = np.full((4, 4, 3), i, np.uint8)
+        meta = {"ExposureTime": -5} if i == 1 else None
+        rec.capture("cap", img, frame_id=i, t_ns=i + 1, metadata=meta)
+    rec.close(verbose=False, timeout=5)
+    assert rec.stats()["cap"]["errors"] == 1
+
+    # frame rusak tidak tertulis, offset frame berikutnya tetap benar
+    reader = CaptureReader(str(tmp_path / "cap"))
+    assert list(reader.log["frame_id"]) == [0, 2, 3]
+    assert [int(reader.image(i)[0, 0, 0]) for i in range(len(reader))] == [0, 2, 3]
+
+
+def test_replay_habis_capture_ring_berhenti(tmp_path):
+    from capture_file import CaptureWriter, ReplaySource
+    from capture_ring import CaptureRing
+
+    writer = CaptureWriter(str(tmp_path / "cap"), (4, 4, 3))
+    for i in range(3):
+        writer.write(np.full((4, 4, 3), i, np.uint8), frame_id=i, t_ns=i + 1)
+    writer.close()
+
+    # EOFError dari source = akhir stream, bukan error yang di-retry
+    capture = CaptureRing(ReplaySource(str(tmp_path / "cap"), speed=0)).start()
+    capture._thread.join(timeout=5)
+    assert not capture._thread.is_alive()
+    t0 = time.monotonic()
+    while capture.read(timeout=5) is not None:
+        pass
+    assert time.monotonic() - t0 < 1
+    assert capture.stats()["errors"] == 0
+    assert capture.stats()["captured"] == 3
+    capture.stop()
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from capture_file import CaptureReader, record_shared
+from shm_frames import SharedFramePool, SharedFrameSink
+
+
+def test_write_frame_tidak_muat():
+    pool = SharedFramePool(slots=2, frame_shape=(4, 4, 3))
+    try:
+        with pytest.raises(ValueError):
+            pool.write(np.zeros((5, 4, 3), np.uint8), 0)
+        with pytest.raises(ValueError):
+            pool.write(np.zeros((4, 4, 3), np.float32), 0)
+        with pytest.raises(ValueError):
+            pool.write(np.zeros((4, 4), np.uint8), 0)
+        # gagal validasi tidak memakan slot
+        assert pool.in_use() == 0
+        handle = pool.write(np.ones((2, 4, 3), np.uint8), 1)
+        assert pool.view(handle).shape == (2, 4, 3)
+    finally:
+        pool.close()
+        pool.unlink()
+
+
+def test_sink_ke_recorder_process(tmp_path):
+    folder = str(tmp_path / "rec")
+    sink = SharedFrameSink(record_shared, args=(folder, (8, 8, 3)), slots=4,
+                           frame_shape=(8, 8, 3)).start()
+    for i in range(20):
+        frame = np.full((8, 8, 3), i, np.uint8)
+        # consumer lambat boleh drop, tapi yang terkirim harus tertulis utuh
+        sink.send(frame, i, t_ns=i * 1000, lux=float(i))
+    sent = sink.sent
+    sink.close()
+
+    reader = CaptureReader(folder)
+    assert len(reader) == sent > 0
+    for i in range(len(reader)):
+        frame_id = int(reader.log["frame_id"][i])
+        assert reader.image(i)[0, 0, 0] == frame_id
+        assert reader.lux_at(i) == (float(frame_id), False)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from telemetry_log import ARAH, TelemetryLog, read_log, to_csv
+
+FIELDS = [
+    ("lux", "f4"), ("offset", "i2"), ("blobs", "u2"),
+    ("arah", "i1", ARAH), ("arah_u", "u1", ARAH),
+]
+
+
+def test_none_dan_label_asing_per_dtype(tmp_path):
+    path = str(tmp_path / "a.tlog")
+    log = TelemetryLog(path, FIELDS)
+    log.append([1.5, -3, 7, "KIRI", "KANAN"])
+    log.append([None, None, None, None, None])
+    log.append([2.0, 4, 1, "NGACO", "NGACO"])
+    log.close()
+
+    data = read_log(path)
+    assert len(data) == 3
+    assert np.isnan(data["lux"][1])
+    assert data["offset"][1] == -1
+    assert data["blobs"][1] == 0xFFFF
+    assert list(data["arah"]) == [1, -1, -1]
+    assert list(data["arah_u"]) == [3, 255, 255]
+
+    # label tidak dikenal jadi sel kosong di CSV
+    csv_path, count = to_csv(path, str(tmp_path / "a.csv"))
+    rows = open(csv_path).read().splitlines()
+    assert count == 3
+    assert rows[2].endswith(",,")
+    assert rows[1].endswith(",KIRI,KANAN")